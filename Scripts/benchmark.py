@@ -0,0 +1,573 @@
+from datetime import datetime
+from os import path, makedirs, listdir, wait4, WIFEXITED, WEXITSTATUS, WTERMSIG
+from shutil import rmtree
+import configparser
+import csv
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from plumbum import cli
+import pandas as pd
+
+import prosper.common.prosper_logging as p_logging
+
+HERE = path.abspath(path.dirname(__file__))
+ROOT = path.dirname(HERE)
+if ROOT not in sys.path:    #run from a checkout without installing vincent_lexicon
+    sys.path.insert(0, ROOT)
+
+from vincent_lexicon.library_logging import route_library_logs
+from vincent_lexicon.news_decoder import decode_news, NewsDecodeError
+from vincent_lexicon.stories import process_stories
+import tablefy
+from fake_market import FakeMarketServer, synthetic_news_payload
+
+ME = 'benchmark'
+
+LOGGER = p_logging.DEFAULT_LOGGER   #load with null logger
+LOG_PATH = path.join(HERE, 'logs')
+makedirs(LOG_PATH, exist_ok=True)
+
+def synthetic_archive_entry(
+        ticker,
+        date,
+        article_count,
+        rng=random
+):
+    """build a fake tinyDB entry shaped like NewsScraper output
+
+    Args:
+        ticker (str): stock ticker
+        date (str): %Y-%m-%d of entry
+        article_count (int): number of articles in `news`
+        rng (:obj:`random.Random`, optional): source of randomness
+
+    Returns:
+        (:obj:`dict`): archive entry
+
+    """
+    news = []
+    for _ in range(article_count):
+        title_scores, blurb_scores = [{
+            'neg': round(rng.random(), 3),
+            'neu': round(rng.random(), 3),
+            'pos': round(rng.random(), 3),
+            'compound': round(rng.uniform(-1, 1), 4)
+        } for _ in range(2)]
+        news.append({
+            'source': 'source{0}'.format(rng.randint(0, 50)),
+            'datetime': date + ' 12:00:00',
+            'data': {'vader_title': title_scores, 'vader_blurb': blurb_scores}
+        })
+    return {
+        'ticker': ticker,
+        'datetime': date,
+        'news': news,
+        'price': {
+            'change_pct': round(rng.uniform(-5, 5), 2),
+            'close': round(rng.uniform(1, 500), 2),
+            'source': 'Yahoo'
+        }
+    }
+
+def synthetic_archive(article_total, articles_per_entry=10, seed=1234):
+    """build a fake archive of roughly `article_total` articles
+
+    Returns:
+        (:obj:`list` :obj:`dict`): archive entries
+
+    """
+    rng = random.Random(seed)
+    entries = []
+    articles = 0
+    indx = 0
+    while articles < article_total:
+        count = rng.randint(0, 2 * articles_per_entry)
+        entries.append(synthetic_archive_entry(
+            'T{0}'.format(indx % 6000),
+            '2017-{0:02d}-{1:02d}'.format(1 + (indx // 6000) % 12, 1 + (indx // 72000) % 28),
+            count,
+            rng
+        ))
+        articles += count
+        indx += 1
+    return entries
+
+def timed(func, *args, **kwargs):
+    """run func and report wall time
+
+    Returns:
+        (float): seconds elapsed
+        (any): func result
+
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+class Benchmark(cli.Application):
+    """Plumbum CLI application for vincent_lexicon performance checks"""
+
+    _log_builder = p_logging.ProsperLogger(
+        ME,
+        LOG_PATH
+    )
+
+    @cli.switch(
+        ['-v', '--verbose'],
+        help='Enable verbose messaging'
+    )
+    def enable_verbose(self):
+        """toggle verbose logger"""
+        self._log_builder.configure_debug_logger()
+
+    def main(self):
+        """Program Main flow"""
+        global LOGGER
+        LOGGER = self._log_builder.logger
+        route_library_logs(LOGGER)
+        if not self.nested_command:
+            print('choose a benchmark: ' + ', '.join(sorted(self._subcommands)))
+            return 1
+
+@Benchmark.subcommand('news_data')
+class BenchNewsData(cli.Application):
+    """loop vs vectorized best-article selection (tablefy.process_news_data)"""
+
+    articles = cli.SwitchAttr(
+        ['-a', '--articles'],
+        int,
+        default=1000000,
+        help='Number of synthetic articles to crunch'
+    )
+
+    def main(self):
+        """Program Main flow"""
+        print('--building synthetic archive: x{0} articles'.format(self.articles))
+        entries = synthetic_archive(self.articles)
+
+        def loop_version(entries):
+            rows = []
+            for entry in entries:
+                rows.extend(tablefy.build_news_rows(entry))
+            return pd.DataFrame(rows, columns=tablefy.NEWS_COLUMNS)
+
+        loop_time, loop_frame = timed(loop_version, entries)
+        vector_time, vector_frame = timed(tablefy.build_news_frame, entries)
+
+        matches = all(
+            loop_frame[column].tolist() == vector_frame[column].tolist()
+            for column in tablefy.NEWS_COLUMNS
+        )
+        print('entries={0} articles={1}'.format(len(entries), len(vector_frame)))
+        print('loop:       {0:8.3f}s'.format(loop_time))
+        print('vectorized: {0:8.3f}s ({1:.1f}x)'.format(
+            vector_time, loop_time / vector_time if vector_time else float('inf')))
+        print('outputs match: {0}'.format(matches))
+        return 0 if matches else 1
+
+def parse_importtime(stderr):
+    """parse `python -X importtime` output
+
+    Args:
+        stderr (str): captured stderr of the import
+
+    Returns:
+        (:obj:`list` :obj:`tuple`): (cumulative_us, self_us, module) per import
+
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+@Benchmark.subcommand('import_time')
+class BenchImportTime(cli.Application):
+    """startup cost of NewsScraper: `-X importtime` breakdown + `--help` wall time"""
+
+    top = cli.SwitchAttr(
+        ['-n', '--top'],
+        int,
+        default=15,
+        help='Number of slowest imports to list'
+    )
+    repeat = cli.SwitchAttr(
+        ['-r', '--repeat'],
+        int,
+        default=5,
+        help='Number of `--help` runs (best is reported)'
+    )
+
+    def main(self):
+        """Program Main flow"""
+        module_dir = path.join(ROOT, 'vincent_lexicon')
+
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import NewsScraper'],
+            cwd=module_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )   #-X importtime needs python>=3.7
+        if proc.returncode:
+            print(proc.stderr)
+            return proc.returncode
+
+        rows = parse_importtime(proc.stderr)
+        total = [row for row in rows if row[2].strip() == 'NewsScraper']
+        if total:
+            print('import NewsScraper: {0:8.1f}ms cumulative'.format(total[0][0] / 1000))
+        print('slowest imports (cumulative ms, self ms):')
+        for cumulative_us, self_us, module in sorted(rows, reverse=True)[:self.top]:
+            print('  {0:8.1f} {1:8.1f}  {2}'.format(
+                cumulative_us / 1000, self_us / 1000, module))
+
+        timings = []
+        for _ in range(self.repeat):
+            elapsed, _ = timed(
+                subprocess.run,
+                [sys.executable, 'NewsScraper.py', '--help'],
+                cwd=module_dir,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            timings.append(elapsed)
+        print('NewsScraper.py --help: {0:8.1f}ms (best of {1})'.format(
+            min(timings) * 1000, self.repeat))
+        return 0
+
+@Benchmark.subcommand('decode')
+class BenchDecode(cli.Application):
+    """demjson vs fast-path decoding of news payloads (news_decoder.decode_news)"""
+
+    payload_dir = None
+    @cli.switch(
+        ['-p', '--payloads'],
+        str,
+        help='Folder of recorded payloads (see `record_payloads`), DEFAULT: synthetic'
+    )
+    def override_payload_dir(self, payloads):
+        """validate path and update self.payload_dir"""
+        if path.isdir(payloads):
+            self.payload_dir = payloads
+        else:
+            raise FileNotFoundError
+
+    count = cli.SwitchAttr(
+        ['-n', '--count'],
+        int,
+        default=500,
+        help='Number of synthetic payloads (ignored with --payloads)'
+    )
+
+    def main(self):
+        """Program Main flow"""
+        import demjson
+        if self.payload_dir:
+            payloads = []
+            for name in sorted(listdir(self.payload_dir)):
+                with open(path.join(self.payload_dir, name), 'r') as payload_fh:
+                    payloads.append(payload_fh.read())
+            print('--loaded x{0} recorded payloads'.format(len(payloads)))
+        else:
+            rng = random.Random(1234)
+            payloads = [
+                synthetic_news_payload('T{0}'.format(indx), rng.randint(1, 30), rng)
+                for indx in range(self.count)
+            ]
+            print('--built x{0} synthetic payloads'.format(len(payloads)))
+
+        def decode_all(decoder):
+            results = []
+            for payload in payloads:
+                try:
+                    results.append(decoder(payload))
+                except (demjson.JSONDecodeError, NewsDecodeError):
+                    results.append(('JSONDecodeError',))   #messages differ between parsers
+            return results
+
+        slow_time, slow_results = timed(decode_all, demjson.decode)
+        fast_time, fast_results = timed(decode_all, decode_news)
+
+        matches = slow_results == fast_results
+        print('payloads={0} bytes={1}'.format(
+            len(payloads), sum(len(payload) for payload in payloads)))
+        print('demjson:    {0:8.3f}s'.format(slow_time))
+        print('fast path:  {0:8.3f}s ({1:.1f}x)'.format(
+            fast_time, slow_time / fast_time if fast_time else float('inf')))
+        print('outputs match: {0}'.format(matches))
+        return 0 if matches else 1
+
+def legacy_process_stories(clusters):
+    """pre-batch story crunching: parser per story, eager debug strings"""
+    from datetime import datetime
+    from html import unescape
+    from html.parser import HTMLParser
+    news_list = []
+    for block in clusters:
+        if int(block['id']) == -1:
+            continue
+        for indx, story in enumerate(block['a']):
+            LOGGER.debug('----Processing story_info: ' + story['u'])
+            HTMLParser()    #HTMLParser.unescape is gone in py3.9, keep the construction cost
+            info = {}
+            info['source']   = story['s']
+            info['url']      = story['u']
+            info['title']    = unescape(story['t'])
+            info['blurb']    = unescape(story['sp'])
+            info['usg']      = story['usg']
+            info['datetime'] = datetime.\
+                fromtimestamp(int(story['tt'])).\
+                strftime('%Y-%m-%d %H:%M:%S')
+            info['primary'] = indx == 0
+            news_list.append(info)
+    return news_list
+
+@Benchmark.subcommand('story_info')
+class BenchStoryInfo(cli.Application):
+    """per-story vs batch normalization of news clusters (stories.process_stories)"""
+
+    count = cli.SwitchAttr(
+        ['-n', '--count'],
+        int,
+        default=2000,
+        help='Number of synthetic feeds to normalize'
+    )
+
+    def main(self):
+        """Program Main flow"""
+        rng = random.Random(1234)
+        feeds = [
+            decode_news(synthetic_news_payload('T{0}'.format(indx % 500), rng.randint(1, 30), rng))
+            for indx in range(self.count)
+        ]
+        articles = sum(len(block.get('a', [])) for feed in feeds for block in feed['clusters'])
+        print('--built x{0} feeds, x{1} articles'.format(len(feeds), articles))
+
+        def run_all(func):
+            return [func(feed['clusters']) for feed in feeds]
+
+        legacy_time, legacy_results = timed(run_all, legacy_process_stories)
+        batch_time, batch_results = timed(run_all, process_stories)
+
+        matches = legacy_results == batch_results
+        print('legacy: {0:8.3f}s {1:8.2f}us/article'.format(
+            legacy_time, legacy_time / articles * 1e6))
+        print('batch:  {0:8.3f}s {1:8.2f}us/article ({2:.1f}x)'.format(
+            batch_time, batch_time / articles * 1e6,
+            legacy_time / batch_time if batch_time else float('inf')))
+        print('outputs match: {0}'.format(matches))
+        return 0 if matches else 1
+
+def run_measured(command, cwd, log_file, env=None):
+    """run a command, reporting wall time and peak memory
+
+    Note:
+        peak memory comes from wait4() rusage, so POSIX only
+    Args:
+        command (:obj:`list` str): argv
+        cwd (str): working directory
+        log_file (str): path to capture stdout/stderr
+        env (:obj:`dict`, optional): environment
+
+    Returns:
+        (int): exit code
+        (float): wall seconds
+        (float): peak RSS in MB
+
+    """
+    start = time.perf_counter()
+    with open(log_file, 'w') as log_fh:
+        proc = subprocess.Popen(command, cwd=cwd, env=env, stdout=log_fh, stderr=log_fh)
+        _, status, usage = wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = WEXITSTATUS(status) if WIFEXITED(status) else -WTERMSIG(status)
+    return proc.returncode, elapsed, usage.ru_maxrss / 1024    #ru_maxrss is KB on linux
+
+def write_e2e_config(work_dir, stock_list, endpoints):
+    """copy vincent_config.cfg, pointed at the fake server and a scratch folder
+
+    Returns:
+        (str): path to benchmark config
+
+    """
+    config = configparser.RawConfigParser()
+    config.read(path.join(ROOT, 'vincent_lexicon', 'vincent_config.cfg'))
+    config.set('LOGGING', 'log_path', path.join(work_dir, 'logs'))
+    config.set('LOGGING', 'discord_webhook', '')
+    config.set('NewsScraper', 'stock_list', stock_list)
+    config.set('NewsScraper', 'cache_path', path.join(work_dir, 'tables'))
+    config.set('NewsScraper', 'tradier_key', 'benchmark')
+    config.set('NewsScraper', 'record_payloads', '')
+    for key, value in endpoints.items():
+        config.set('NewsScraper', key, value)
+
+    config_path = path.join(work_dir, 'vincent_config.cfg')
+    with open(config_path, 'w') as config_fh:
+        config.write(config_fh)
+    return config_path
+
+@Benchmark.subcommand('e2e')
+class BenchEndToEnd(cli.Application):
+    """NewsScraper + tablefy against a local fake news/quote/calendar server"""
+
+    sizes = cli.SwitchAttr(
+        ['-n', '--tickers'],
+        str,
+        default='100,1000,6000',
+        help='Comma separated ticker counts to run'
+    )
+    latency = cli.SwitchAttr(
+        ['--latency'],
+        float,
+        default=20.0,
+        help='Mean fake endpoint latency (ms)'
+    )
+    error_rate = cli.SwitchAttr(
+        ['--error_rate'],
+        float,
+        default=0.01,
+        help='Fraction of requests answered with HTTP 503'
+    )
+    empty_rate = cli.SwitchAttr(
+        ['--empty_rate'],
+        float,
+        default=0.1,
+        help='Fraction of tickers with an empty (HTML) news feed'
+    )
+    workers = cli.SwitchAttr(
+        ['-w', '--workers'],
+        int,
+        default=None,
+        help='NewsScraper fetch workers, DEFAULT: config'
+    )
+    history_file = cli.SwitchAttr(
+        ['-o', '--output'],
+        str,
+        default=path.join(LOG_PATH, 'e2e_history.jsonl'),
+        help='JSON-lines file results are appended to'
+    )
+    keep = cli.Flag(
+        ['--keep'],
+        help='Keep scratch folders for inspection'
+    )
+
+    def run_size(self, server, ticker_count):
+        """one NewsScraper + tablefy round at `ticker_count` tickers
+
+        Returns:
+            (:obj:`dict`): timings for this size
+
+        """
+        work_dir = tempfile.mkdtemp(prefix='vincent_e2e_{0}_'.format(ticker_count))
+        makedirs(path.join(work_dir, 'logs'), exist_ok=True)
+        stock_list = path.join(work_dir, 'ticker_list.csv')
+        with open(stock_list, 'w', newline='') as list_fh:
+            writer = csv.writer(list_fh)
+            writer.writerow(['Symbol', 'Exchange'])
+            for indx in range(ticker_count):
+                writer.writerow(['SYM{0:05d}'.format(indx), 'NYSE'])
+        config_path = write_e2e_config(work_dir, stock_list, server.endpoints())
+        stats_file = path.join(work_dir, 'stats.json')
+
+        command = [
+            sys.executable, 'NewsScraper.py', '--debug',
+            '--config', config_path, '--stats', stats_file
+        ]
+        if self.workers:
+            command += ['-w', str(self.workers)]
+        server.requests.clear()
+        scraper_code, scraper_time, scraper_mb = run_measured(
+            command,
+            path.join(ROOT, 'vincent_lexicon'),
+            path.join(work_dir, 'NewsScraper.out')
+        )
+        result = {
+            'tickers': ticker_count,
+            'newsscraper': {
+                'exit_code': scraper_code,
+                'wall_seconds': scraper_time,
+                'peak_rss_mb': scraper_mb,
+                'requests': dict(server.requests)
+            }
+        }
+        if path.isfile(stats_file):
+            with open(stats_file, 'r') as stats_fh:
+                result['newsscraper'].update(json.load(stats_fh))
+
+        today = datetime.today().strftime('%Y-%m-%d')
+        tables = path.join(work_dir, 'tables')
+        command = [
+            sys.executable, 'tablefy.py', '-s',
+            '-t', path.join(tables, 'debug_news_archive_' + today),
+            '-o', path.join(work_dir, 'news_database_clean.csv')
+        ]
+        article_file = path.join(tables, 'debug_articles.sqlite')
+        if path.isfile(article_file):
+            command += ['-a', article_file]
+        tablefy_code, tablefy_time, tablefy_mb = run_measured(
+            command, HERE, path.join(work_dir, 'tablefy.out'))
+        result['tablefy'] = {
+            'exit_code': tablefy_code,
+            'wall_seconds': tablefy_time,
+            'peak_rss_mb': tablefy_mb
+        }
+
+        if self.keep or scraper_code or tablefy_code:
+            print('--scratch folder kept: ' + work_dir)
+        else:
+            rmtree(work_dir)
+        return result
+
+    def main(self):
+        """Program Main flow"""
+        server = FakeMarketServer(
+            latency=self.latency / 1000,
+            error_rate=self.error_rate,
+            empty_rate=self.empty_rate
+        )
+        server.start()
+        print('--fake market at ' + server.base_url)
+
+        run = {
+            'date': datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+            'latency_ms': self.latency,
+            'error_rate': self.error_rate,
+            'empty_rate': self.empty_rate,
+            'results': []
+        }
+        try:
+            for ticker_count in [int(size) for size in self.sizes.split(',')]:
+                result = self.run_size(server, ticker_count)
+                run['results'].append(result)
+                scraper = result['newsscraper']
+                print('tickers={0:6d}  NewsScraper {1:8.2f}s {2:7.1f}MB (exit {3})  '
+                      'tablefy {4:7.2f}s {5:7.1f}MB (exit {6})'.format(
+                          ticker_count, scraper['wall_seconds'], scraper['peak_rss_mb'],
+                          scraper['exit_code'], result['tablefy']['wall_seconds'],
+                          result['tablefy']['peak_rss_mb'], result['tablefy']['exit_code']))
+                for stage in scraper.get('stages', []):
+                    print('    {stage:6s} x{items_in:<7d} busy={busy_seconds:8.2f}s '
+                          'wall={wall_seconds:8.2f}s {items_per_second:9.1f}/s'.format(**stage))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        with open(self.history_file, 'a') as history_fh:
+            history_fh.write(json.dumps(run) + '\n')
+        print('--results appended to ' + self.history_file)
+        failed = any(
+            result['newsscraper']['exit_code'] or result['tablefy']['exit_code']
+            for result in run['results']
+        )
+        return 1 if failed else 0
+
+if __name__ == '__main__':
+    Benchmark.run()
@@ -0,0 +1,211 @@
+"""Local stand-in for the Google news, Yahoo/Google quote and Tradier calendar endpoints"""
+
+from datetime import date
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+import calendar
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+EMPTY_FEED = '<!DOCTYPE html><html><head><title>Google Finance</title></head><body></body></html>'
+WORDS = ['shares', 'rally', 'slump', 'earnings', 'beat', 'miss', 'guidance',
+         'analyst', 'upgrade', 'downgrade', 'merger', 'lawsuit', 'record']
+
+def synthetic_news_payload(ticker, article_count, rng=random):
+    """build a fake Google news feed, malformations included
+
+    Note:
+        bare keys, \\xNN escapes and single quotes like the real endpoint
+    Args:
+        ticker (str): stock ticker
+        article_count (int): number of stories across clusters
+        rng (:obj:`random.Random`, optional): source of randomness
+
+    Returns:
+        (str): raw payload text
+
+    """
+    clusters = []
+    indx = 0
+    while indx < article_count:
+        stories = []
+        for _ in range(min(rng.randint(1, 4), article_count - indx)):
+            title = ' '.join(rng.choice(WORDS) for _ in range(8))
+            blurb = ' '.join(rng.choice(WORDS) for _ in range(30))
+            stories.append(
+                '{{s:"Source {0}",d:"{1} hours ago",tt:"{2}",'
+                't:"{3} \\x26amp; {4}",u:"http://news.example.com/{4}/{5}",'
+                'sp:\'{6} \\x3cb\\x3e{4}\\x3c/b\\x3e\',usg:"AFQjCN{5:08d}"}}'.format(
+                    rng.randint(0, 50), rng.randint(1, 23), 1500000000 + indx,
+                    title, ticker, rng.randint(0, 10 ** 8), blurb)
+            )
+            indx += 1
+        clusters.append('{{id:"{0}",a:[{1}]}}'.format(len(clusters) + 1, ','.join(stories)))
+    clusters.append('{id:"-1"}')
+    return '{{clusters:[{0}],results_per_page:10,total_number_of_news:{1}}}'.format(
+        ','.join(clusters), article_count)
+
+def _yahoo_field(code, ticker, rng):
+    """one quotes.csv column for a ticker"""
+    if code == 's':
+        return '"{0}"'.format(ticker)
+    if code == 'l1':
+        return '{0:.2f}'.format(rng.uniform(1, 500))
+    if code == 'p2':
+        return '"{0:+.2f}%"'.format(rng.uniform(-5, 5))
+    if code == 'r':
+        return '{0:.2f}'.format(rng.uniform(5, 40))
+    if code == 't1':
+        return '"4:00pm"'
+    if code == 's7':
+        return '{0:.2f}'.format(rng.uniform(0, 10))
+    return 'N/A'
+
+def calendar_month(year, month):
+    """tradier-style calendar month, every weekday open"""
+    days = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        current = date(year, month, day)
+        days.append({
+            'date': current.strftime('%Y-%m-%d'),
+            'status': 'open' if current.weekday() < 5 else 'closed'
+        })
+    return {'calendar': {'month': month, 'year': year, 'days': {'day': days}}}
+
+class FakeMarketHandler(BaseHTTPRequestHandler):
+    """route requests to synthetic payloads"""
+    protocol_version = 'HTTP/1.1'   #keep-alive, like the real endpoints
+
+    def log_message(self, *args):
+        pass    #quiet
+
+    def _send(self, status, body, content_type='application/json'):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        server.count(url.path)
+        if server.latency:
+            time.sleep(server.latency * server.rng().uniform(0.5, 1.5))
+        if server.rng().random() < server.error_rate:
+            self._send(503, '{"error": "synthetic failure"}')
+            return
+
+        if url.path.endswith('_news'):
+            ticker = query.get('q', '')
+            rng = random.Random(zlib.crc32(ticker.encode('utf-8')) ^ server.seed)
+            if rng.random() < server.empty_rate:     #same tickers empty every run
+                self._send(200, EMPTY_FEED, 'text/html')
+                return
+            self._send(200, synthetic_news_payload(
+                ticker, rng.randint(1, 2 * server.articles_per_feed), rng))
+        elif url.path.endswith('quotes.csv'):
+            rng = server.rng()
+            codes = re.findall(r'[a-z]\d?', query.get('f', 'sl1'))
+            lines = [
+                ','.join(_yahoo_field(code, ticker, rng) for code in codes)
+                for ticker in query.get('s', '').split('+') if ticker
+            ]
+            self._send(200, '\r\n'.join(lines) + '\r\n', 'text/csv')
+        elif url.path.endswith('/info'):
+            rng = server.rng()
+            quotes = [{
+                't': ticker,
+                'l': '{0:.2f}'.format(rng.uniform(1, 500)),
+                'cp': '{0:.2f}'.format(rng.uniform(-5, 5)),
+                'lt': 'Jan 3, 4:00PM EST'
+            } for ticker in query.get('q', '').split(',') if ticker]
+            self._send(200, '\n// ' + json.dumps(quotes))
+        elif url.path.endswith('/calendar'):
+            today = date.today()
+            self._send(200, json.dumps(calendar_month(
+                int(query.get('year', today.year)), int(query.get('month', today.month)))))
+        else:
+            self._send(404, '{"error": "unknown endpoint"}')
+
+class FakeMarketServer(ThreadingMixIn, HTTPServer):
+    """threaded HTTP server standing in for every external endpoint
+
+    Args:
+        address (:obj:`tuple`): (host, port), port 0 picks a free one
+        latency (float, optional): mean seconds added to each response
+        error_rate (float, optional): fraction of requests answered 503
+        empty_rate (float, optional): fraction of tickers with an empty (HTML) feed
+        articles_per_feed (int, optional): mean stories per news feed
+        seed (int, optional): base for synthetic payloads
+
+    """
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address=('127.0.0.1', 0),
+            latency=0.0,
+            error_rate=0.0,
+            empty_rate=0.0,
+            articles_per_feed=10,
+            seed=1234
+    ):
+        HTTPServer.__init__(self, address, FakeMarketHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.articles_per_feed = articles_per_feed
+        self.seed = seed
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def rng(self):
+        """per-thread random source"""
+        if not hasattr(self._local, 'rng'):
+            self._local.rng = random.Random(self.seed ^ threading.get_ident())
+        return self._local.rng
+
+    def count(self, endpoint):
+        """tally one request"""
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    @property
+    def base_url(self):
+        """http://host:port of running server"""
+        return 'http://{0}:{1}'.format(*self.server_address[:2])
+
+    def start(self):
+        """serve from a background thread
+
+        Returns:
+            (:obj:`threading.Thread`): server thread (daemon)
+
+        """
+        thread = threading.Thread(target=self.serve_forever, name='fake-market', daemon=True)
+        thread.start()
+        return thread
+
+    def endpoints(self):
+        """config values pointing NewsScraper at this server
+
+        Returns:
+            (:obj:`dict`): [NewsScraper] key: url
+
+        """
+        return {
+            'articles_uri': self.base_url + '/finance/company_news',
+            'meta_articles_uri': self.base_url + '/finance/market_news',
+            'yahoo_quote_uri': self.base_url + '/d/quotes.csv',
+            'google_quote_uri': self.base_url + '/finance/info',
+            'calendar_uri': self.base_url + '/v1/markets/calendar',
+        }
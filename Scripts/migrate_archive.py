@@ -0,0 +1,78 @@
+from os import path, makedirs
+import sys
+
+from plumbum import cli
+
+import prosper.common.prosper_logging as p_logging
+
+HERE = path.abspath(path.dirname(__file__))
+ROOT = path.dirname(HERE)
+if ROOT not in sys.path:    #run from a checkout without installing vincent_lexicon
+    sys.path.insert(0, ROOT)
+
+from vincent_lexicon.library_logging import route_library_logs
+from vincent_lexicon.storage import ShardedStore, migrate_tinydb
+
+ME = 'migrate_archive'
+
+LOGGER = p_logging.DEFAULT_LOGGER   #load with null logger
+LOG_PATH = path.join(HERE, 'logs')
+makedirs(LOG_PATH, exist_ok=True)
+
+class MigrateArchive(cli.Application):
+    """Plumbum CLI application to copy a tinyDB news archive into date shards"""
+
+    _log_builder = p_logging.ProsperLogger(
+        ME,
+        LOG_PATH
+    )
+
+    @cli.switch(
+        ['-v', '--verbose'],
+        help='Enable verbose messaging'
+    )
+    def enable_verbose(self):
+        """toggle verbose logger"""
+        self._log_builder.configure_debug_logger()
+
+    table_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'news_database.json')
+    @cli.switch(
+        ['-t', '--table'],
+        str,
+        help='path to table/tinyDB file'
+    )
+    def override_table_file(self, table):
+        """validate path and update self.table_file"""
+        if path.isfile(table):
+            self.table_file = table
+        else:
+            raise FileNotFoundError
+
+    archive_dir = path.join(ROOT, 'vincent_lexicon', 'tables', 'news_archive')
+    @cli.switch(
+        ['-a', '--archive'],
+        str,
+        help='path to shard folder to write'
+    )
+    def override_archive_dir(self, archive):
+        """set up path to shard folder"""
+        self.archive_dir = path.abspath(archive)
+
+    def main(self):
+        """Program Main flow"""
+        global LOGGER
+        LOGGER = self._log_builder.logger
+        route_library_logs(LOGGER)
+        LOGGER.debug('hello world')
+
+        store = ShardedStore(self.archive_dir)
+        if store.shards():
+            LOGGER.error('archive already has shards, refusing to migrate: ' + self.archive_dir)
+            exit(1)
+
+        LOGGER.info('migrating table file: ' + self.table_file)
+        count = migrate_tinydb(self.table_file, store)
+        LOGGER.info('migrated x{0} records into {1}'.format(count, self.archive_dir))
+
+if __name__ == '__main__':
+    MigrateArchive.run()
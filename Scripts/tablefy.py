@@ -1,23 +1,145 @@
 from datetime import datetime
-from os import path, makedirs, remove
+from os import path, makedirs, remove, replace
+from shutil import copyfileobj
 import csv
 from enum import Enum
+from itertools import chain
+import sys
 
 from tinydb import TinyDB, Query
 import ujson as json
 from plumbum import cli
 import pandas as pd
+import numpy as np
 
 import prosper.common.prosper_logging as p_logging
 
 HERE = path.abspath(path.dirname(__file__))
 ROOT = path.dirname(HERE)
+if ROOT not in sys.path:    #run from a checkout without installing vincent_lexicon
+    sys.path.insert(0, ROOT)
+
+from vincent_lexicon.library_logging import route_library_logs
+from vincent_lexicon.storage import ShardedStore, ArticleStore, iter_tinydb_records, expand_records
+from vincent_lexicon.profiling import StageProfiler, profile_section
+
 ME = 'tablefy'
 
 LOGGER = p_logging.DEFAULT_LOGGER   #load with null logger
 LOG_PATH = path.join(HERE, 'logs')
 makedirs(LOG_PATH, exist_ok=True)
 
+PRICE_COLUMNS = [
+    'change_pct',
+    'close',
+    'datetime',
+    'price_source',
+    'ticker'
+]   #sorted, same as pandas.DataFrame(list_of_dicts)
+NEWS_COLUMNS = [
+    'article_datetime',
+    'best_article_blurb',
+    'best_article_title',
+    'datetime',
+    'source',
+    'ticker',
+    'vader_blurb_compound',
+    'vader_blurb_neg',
+    'vader_blurb_neu',
+    'vader_blurb_pos',
+    'vader_title_compound',
+    'vader_title_neg',
+    'vader_title_neu',
+    'vader_title_pos'
+]
+
+def open_article_store(article_file):
+    """open NewsScraper's article store, if there is one
+
+    Args:
+        article_file (str): path to article store sqlite file
+
+    Returns:
+        (:obj:`ArticleStore`): store handle, None if file is missing
+
+    """
+    if not article_file or not path.isfile(article_file):
+        return None
+    return ArticleStore(article_file)
+
+def load_archive(table_file, article_store=None):
+    """load whole archive into memory as a tinyDB-shaped dict
+
+    Args:
+        table_file (str): path to tinyDB file or shard folder
+        article_store (:obj:`ArticleStore`, optional): expand article refs
+
+    Returns:
+        (:obj:`dict`): json-parsed tinyDB file
+
+    """
+    if path.isdir(table_file):
+        entries = ShardedStore(table_file).iter_records()
+        if article_store is not None:
+            entries = expand_records(entries, article_store)
+        return {'_default': {
+            str(indx): entry
+            for indx, entry in enumerate(entries, start=1)
+        }}
+
+    with open(table_file, 'r') as json_fh:
+        db_file = json.load(json_fh)
+    if article_store is not None:
+        table = db_file.get('_default', {})
+        keys = list(table)
+        for key, entry in zip(keys, expand_records((table[key] for key in keys), article_store)):
+            table[key] = entry
+    return db_file
+
+def iter_archive(table_file, since=None, article_store=None):
+    """stream archive entries one at a time
+
+    Args:
+        table_file (str): path to tinyDB file or shard folder
+        since (:obj:`list`, optional): record key to resume from, lets shard
+            archives skip whole days.  Earlier records may still be yielded
+        article_store (:obj:`ArticleStore`, optional): expand article refs
+
+    Yields:
+        (:obj:`list`): record key, increasing with insert order
+        (:obj:`dict`): single entry from tinyDB
+
+    """
+    if path.isdir(table_file):
+        start_date = since[0] if since else None
+        keyed_entries = ShardedStore(table_file).iter_keyed(start_date=start_date)
+    else:
+        keyed_entries = (
+            ([int(doc_id)], entry)
+            for doc_id, entry in iter_tinydb_records(table_file)
+        )
+    if article_store is not None:
+        keyed_entries = expand_records(keyed_entries, article_store)
+    yield from keyed_entries
+
+def build_price_row(entry):
+    """crunch single entry into price row
+
+    Args:
+        entry (:obj:`dict`): single entry from tinyDB
+
+    Returns:
+        (:obj:`dict`): price row
+
+    """
+    row = {}
+    row['ticker']       = entry['ticker']
+    row['datetime']     = entry['datetime']
+    row['change_pct']   = entry['price']['change_pct']
+    row['close']        = entry['price']['close']
+    row['price_source'] = entry['price']['source']
+    return row
+
 def process_price_data(dataset):
     """crunch down entries into more R-friendly shape
 
@@ -32,13 +154,7 @@ def process_price_data(dataset):
     data_list = []
     for key in cli.terminal.Progress(dataset['_default']):
         entry = dataset['_default'][key]    #Progress iterator only yields `key`
-        row = {}
-        row['ticker']       = entry['ticker']
-        row['datetime']     = entry['datetime']
-        row['change_pct']   = entry['price']['change_pct']
-        row['close']        = entry['price']['close']
-        row['price_source'] = entry['price']['source']
-        data_list.append(row)
+        data_list.append(build_price_row(entry))
     return data_list
 
 class UpOrDown(Enum):
@@ -66,6 +182,146 @@ def check_price(data_entry, neutral_band=0.1):
     else:
         raise ValueError
 
+def build_news_rows(entry):
+    """crunch single entry into article rows, flagging "best" articles
+
+    Args:
+        entry (:obj:`dict`): single entry from tinyDB
+
+    Returns:
+        (:obj:`list`): article rows
+
+    """
+    pre_list = []
+    best_article_title = 0
+    best_article_blurb = 0
+    best_article_title_index = None
+    best_article_blurb_index = None
+    direction = check_price(entry)
+    article_index = 0
+    for article in entry['news']:
+        row = {}
+        row['ticker']   = entry['ticker']
+        row['datetime'] = entry['datetime']
+        row['source']   = article['source']
+        row['article_datetime'] = article['datetime']
+        row['vader_title_neg']      = article['data']['vader_title']['neg']
+        row['vader_title_neu']      = article['data']['vader_title']['neu']
+        row['vader_title_pos']      = article['data']['vader_title']['pos']
+        row['vader_title_compound'] = article['data']['vader_title']['compound']
+        row['vader_blurb_neg']      = article['data']['vader_blurb']['neg']
+        row['vader_blurb_neu']      = article['data']['vader_blurb']['neu']
+        row['vader_blurb_pos']      = article['data']['vader_blurb']['pos']
+        row['vader_blurb_compound'] = article['data']['vader_blurb']['compound']
+        row['best_article_blurb'] = None
+        row['best_article_title'] = None
+        pre_list.append(row)
+
+        #This is dumb, but easy
+        if direction == UpOrDown.POSITIVE:
+            if row['vader_title_compound'] > best_article_title:
+                best_article_title = row['vader_title_compound']
+                best_article_title_index = article_index
+            if row['vader_blurb_compound'] > best_article_blurb:
+                best_article_blurb = row['vader_blurb_compound']
+                best_article_blurb_index = article_index
+        elif direction == UpOrDown.NEGATIVE:
+            if row['vader_title_compound'] < best_article_title:
+                best_article_title = row['vader_title_compound']
+                best_article_title_index = article_index
+            if row['vader_blurb_compound'] < best_article_blurb:
+                best_article_blurb = row['vader_blurb_compound']
+                best_article_blurb_index = article_index
+
+        article_index += 1
+
+    if best_article_title_index is not None:
+        pre_list[best_article_title_index]['best_article_title'] = True
+
+    if best_article_blurb_index is not None:
+        pre_list[best_article_blurb_index]['best_article_blurb'] = True
+
+    return pre_list
+
+def _best_rows(group, compound, direction):
+    """vectorized "best article" pick per group
+
+    Note:
+        same rule as build_news_rows: for POSITIVE groups the first article
+        with the highest compound > 0, for NEGATIVE the first with the
+        lowest compound < 0, NEUTRAL groups have no best article
+    Args:
+        group (:obj:`numpy.ndarray`): group id per article, sorted ascending
+        compound (:obj:`numpy.ndarray`): compound score per article
+        direction (:obj:`numpy.ndarray`): +1/-1/0 per group
+
+    Returns:
+        (:obj:`numpy.ndarray`): row index of best article per qualifying group
+
+    """
+    signed = compound * direction[group]
+    key = np.where(signed > 0, signed, -np.inf)
+    order = np.lexsort((np.arange(len(key)), -key, group))
+    sorted_group = group[order]
+    group_first = np.ones(len(order), dtype=bool)
+    group_first[1:] = sorted_group[1:] != sorted_group[:-1]
+    best = order[group_first]
+    return best[np.isfinite(key[best])]
+
+def build_news_frame(entries, neutral_band=0.1):
+    """columnar version of `build_news_rows` over many entries
+
+    Args:
+        entries (:obj:`iterable` :obj:`dict`): entries from tinyDB
+        neutral_band (float, optional): value to set "neutral" value
+
+    Returns:
+        (:obj:`pandas.DataFrame`): article rows, NEWS_COLUMNS order
+
+    """
+    columns = {column: [] for column in NEWS_COLUMNS}
+    group_ids = []
+    change_pct = []
+    for group_id, entry in enumerate(entries):
+        change_pct.append(entry['price']['change_pct'])
+        for article in entry['news']:
+            vader = article['data']['vader_title']
+            vader_blurb = article['data']['vader_blurb']
+            columns['ticker'].append(entry['ticker'])
+            columns['datetime'].append(entry['datetime'])
+            columns['source'].append(article['source'])
+            columns['article_datetime'].append(article['datetime'])
+            columns['vader_title_neg'].append(vader['neg'])
+            columns['vader_title_neu'].append(vader['neu'])
+            columns['vader_title_pos'].append(vader['pos'])
+            columns['vader_title_compound'].append(vader['compound'])
+            for field in ('neg', 'neu', 'pos', 'compound'):
+                columns['vader_blurb_' + field].append(vader_blurb[field])
+            group_ids.append(group_id)
+
+    for field in ('neg', 'neu', 'pos', 'compound'):
+        columns['vader_title_' + field] = np.array(columns['vader_title_' + field], dtype=float)
+        columns['vader_blurb_' + field] = np.array(columns['vader_blurb_' + field], dtype=float)
+
+    row_count = len(group_ids)
+    group = np.array(group_ids, dtype=np.int64)
+    change_pct = np.array(change_pct, dtype=float)     #None (META) -> nan -> NEUTRAL
+    with np.errstate(invalid='ignore'):
+        direction = np.where(np.abs(change_pct) < neutral_band, 0.0, np.sign(change_pct))
+    direction[np.isnan(direction)] = 0.0
+
+    best_title = _best_rows(group, columns['vader_title_compound'], direction)
+    best_blurb = _best_rows(group, columns['vader_blurb_compound'], direction)
+
+    title_flag = np.full(row_count, None, dtype=object)
+    title_flag[best_title] = True
+    blurb_flag = np.full(row_count, None, dtype=object)
+    blurb_flag[best_blurb] = True
+
+    columns['best_article_title'] = title_flag
+    columns['best_article_blurb'] = blurb_flag
+    return pd.DataFrame(columns, columns=NEWS_COLUMNS)
+
 def process_news_data(dataset):
     """crunch down entries into more R-friendly shape
 
@@ -73,64 +329,213 @@ def process_news_data(dataset):
         dataset (:obj:`dict`): json-parsed tinyDB file
 
     Returns:
-        (:obj:`list`): patterned data ready for pandas
+        (:obj:`pandas.DataFrame`): patterned data ready for pandas
 
     """
-    LOGGER.info('--Processing price data from archive')
-    data_list = []
-    for key in cli.terminal.Progress(dataset['_default']):
-        entry = dataset['_default'][key]    #Progress iterator only yields `key`
-        pre_list = []
-        best_article_title = 0
-        best_article_blurb = 0
-        best_article_title_index = None
-        best_article_blurb_index = None
-        direction = check_price(entry)
-        article_index = 0
-        for article in entry['news']:
-            row = {}
-            row['ticker']   = entry['ticker']
-            row['datetime'] = entry['datetime']
-            row['source']   = article['source']
-            row['article_datetime'] = article['datetime']
-            row['vader_title_neg']      = article['data']['vader_title']['neg']
-            row['vader_title_neu']      = article['data']['vader_title']['neu']
-            row['vader_title_pos']      = article['data']['vader_title']['pos']
-            row['vader_title_compound'] = article['data']['vader_title']['compound']
-            row['vader_blurb_neg']      = article['data']['vader_title']['neg']
-            row['vader_blurb_neu']      = article['data']['vader_title']['neu']
-            row['vader_blurb_pos']      = article['data']['vader_title']['pos']
-            row['vader_blurb_compound'] = article['data']['vader_title']['compound']
-            row['best_article_blurb'] = None
-            row['best_article_title'] = None
-            pre_list.append(row)
-
-            #This is dumb, but easy
-            if direction == UpOrDown.POSITIVE:
-                if row['vader_title_compound'] > best_article_title:
-                    best_article_title = row['vader_title_compound']
-                    best_article_title_index = article_index
-                if row['vader_blurb_compound'] > best_article_blurb:
-                    best_article_blurb = row['vader_blurb_compound']
-                    best_article_blurb_index = article_index
-            elif direction == UpOrDown.NEGATIVE:
-                if row['vader_title_compound'] < best_article_title:
-                    best_article_title = row['vader_title_compound']
-                    best_article_title_index = article_index
-                if row['vader_blurb_compound'] < best_article_blurb:
-                    best_article_blurb = row['vader_blurb_compound']
-                    best_article_blurb_index = article_index
-
-            article_index += 1
-
-        if best_article_title_index:
-            pre_list[best_article_title_index]['best_article_title'] = True
-
-        if best_article_blurb_index:
-            pre_list[best_article_title_index]['best_article_blurb'] = True
-
-        data_list.extend(pre_list)
-    return data_list
+    LOGGER.info('--Processing news data from archive')
+    table = dataset['_default']
+    return build_news_frame(table[key] for key in table)
+
+def stream_tables(
+        entries,
+        price_csv_file,
+        news_csv_file,
+        write_header=True,
+        chunk_size=5000
+):
+    """push archive entries straight into the price/news CSVs
+
+    Note:
+        memory stays flat: at most `chunk_size` entries are held at a time
+    Args:
+        entries (:obj:`iterable` :obj:`dict`): archive entries
+        price_csv_file (str): path to price outfile
+        news_csv_file (str): path to news outfile
+        write_header (bool, optional): start files with CSV header row
+        chunk_size (int, optional): entries per vectorized news batch
+
+    Returns:
+        (:obj:`dict`): entries, price_rows, news_rows written
+
+    """
+    LOGGER.info('--streaming archive into: ' + price_csv_file + ', ' + news_csv_file)
+    counts = {'entries': 0, 'price_rows': 0, 'news_rows': 0}
+    with open(price_csv_file, 'w', newline='') as price_fh, \
+            open(news_csv_file, 'w', newline='') as news_fh:
+        price_writer = csv.DictWriter(price_fh, PRICE_COLUMNS)
+        if write_header:
+            price_writer.writeheader()
+            csv.writer(news_fh).writerow(NEWS_COLUMNS)
+
+        chunk = []
+        for entry in chain(entries, [None]):
+            if entry is not None:
+                price_writer.writerow(build_price_row(entry))
+                chunk.append(entry)
+                if len(chunk) < chunk_size:
+                    continue
+            if not chunk:
+                break
+
+            news_frame = build_news_frame(chunk)
+            news_frame.to_csv(news_fh, header=False, index=False)
+            counts['entries'] += len(chunk)
+            counts['price_rows'] += len(chunk)
+            counts['news_rows'] += len(news_frame)
+            LOGGER.info('----processed x{0} entries'.format(counts['entries']))
+            chunk = []
+
+    return counts
+
+class Watermark(object):
+    """track the newest record key seen while streaming an archive
+
+    Args:
+        previous (:obj:`list`, optional): key processed by the last run
+
+    """
+    def __init__(self, previous=None):
+        self.previous = previous
+        self.latest = previous
+        self.found_previous = previous is None
+
+    def filter(self, keyed_entries):
+        """pass through only entries newer than `previous`
+
+        Args:
+            keyed_entries (:obj:`iterable`): (key, entry) pairs from `iter_archive`
+
+        Yields:
+            (:obj:`dict`): archive entry
+
+        """
+        previous = tuple(self.previous) if self.previous is not None else None
+        for key, entry in keyed_entries:
+            if previous is not None and tuple(key) <= previous:
+                if tuple(key) == previous:
+                    self.found_previous = True
+                continue
+            if self.latest is None or tuple(key) > tuple(self.latest):
+                self.latest = key
+            yield entry
+
+def count_csv_rows(csv_file):
+    """count data rows (minus header) in a CSV file, None if missing
+
+    Note:
+        parsed with `csv.reader`: quoted fields (titles/blurbs) may span lines
+
+    """
+    if not path.isfile(csv_file):
+        return None
+    with open(csv_file, 'r', newline='', encoding='utf-8') as csv_fh:
+        return max(sum(1 for _ in csv.reader(csv_fh)) - 1, 0)
+
+def load_state(state_file):
+    """read tablefy watermark state, None if missing/unreadable"""
+    try:
+        with open(state_file, 'r') as state_fh:
+            return json.load(state_fh)
+    except (IOError, ValueError):
+        return None
+
+def save_state(state_file, state):
+    """atomically write tablefy watermark state"""
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as state_fh:
+        json.dump(state, state_fh)
+    replace(tmp_file, state_file)
+
+def check_state(state, table_file, price_csv_file, news_csv_file):
+    """validate watermark against the outputs it describes
+
+    Returns:
+        (str): reason state can not be trusted, None if consistent
+
+    """
+    if not state:
+        return 'no watermark state'
+    if state.get('source') != path.abspath(table_file):
+        return 'archive changed: {0}'.format(state.get('source'))
+    if state.get('watermark') is None:
+        return 'empty watermark'
+    if count_csv_rows(price_csv_file) != state.get('price_rows'):
+        return 'price table does not match watermark'
+    if count_csv_rows(news_csv_file) != state.get('news_rows'):
+        return 'news table does not match watermark'
+    return None
+
+def build_tables(table_file, price_csv_file, news_csv_file, state_file, article_store=None):
+    """full rebuild of price/news CSVs, records new watermark
+
+    Returns:
+        (:obj:`dict`): new watermark state
+
+    """
+    LOGGER.info('--full rebuild of summary tables')
+    watermark = Watermark()
+    counts = stream_tables(
+        watermark.filter(iter_archive(table_file, article_store=article_store)),
+        price_csv_file,
+        news_csv_file
+    )
+    state = {
+        'source': path.abspath(table_file),
+        'watermark': watermark.latest,
+        'price_rows': counts['price_rows'],
+        'news_rows': counts['news_rows'],
+        'updated': datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    save_state(state_file, state)
+    return state
+
+def update_tables(table_file, price_csv_file, news_csv_file, state_file, article_store=None):
+    """append only records newer than the watermark to price/news CSVs
+
+    Note:
+        falls back to `build_tables` when the watermark is inconsistent
+    Returns:
+        (:obj:`dict`): new watermark state
+
+    """
+    state = load_state(state_file)
+    problem = check_state(state, table_file, price_csv_file, news_csv_file)
+    if problem:
+        LOGGER.warning('--watermark unusable, rebuilding: ' + problem)
+        return build_tables(table_file, price_csv_file, news_csv_file, state_file, article_store)
+
+    LOGGER.info('--appending records after watermark: {0}'.format(state['watermark']))
+    watermark = Watermark(state['watermark'])
+    price_partial = price_csv_file + '.partial'
+    news_partial = news_csv_file + '.partial'
+    counts = stream_tables(
+        watermark.filter(iter_archive(
+            table_file, since=state['watermark'], article_store=article_store)),
+        price_partial,
+        news_partial,
+        write_header=False
+    )
+    if not watermark.found_previous:
+        remove(price_partial)
+        remove(news_partial)
+        LOGGER.warning('--watermark record missing from archive, rebuilding')
+        return build_tables(table_file, price_csv_file, news_csv_file, state_file, article_store)
+
+    for partial_file, csv_file in (
+            (price_partial, price_csv_file),
+            (news_partial, news_csv_file)
+    ):
+        with open(partial_file, 'rb') as partial_fh, open(csv_file, 'ab') as csv_fh:
+            copyfileobj(partial_fh, csv_fh)
+        remove(partial_file)
+
+    state['watermark'] = watermark.latest
+    state['price_rows'] += counts['price_rows']
+    state['news_rows'] += counts['news_rows']
+    state['updated'] = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+    save_state(state_file, state)
+    LOGGER.info('--appended x{0} entries'.format(counts['entries']))
+    return state
 
 def csv_dump(rawdata, filepath):
     """push data out to CSV for processing later
@@ -167,19 +572,32 @@ class Tablefy(cli.Application):
         """toggle verbose logger"""
         self._log_builder.configure_debug_logger()
 
-    table_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'news_database.json')
+    table_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'news_archive')   #default `storage_backend = shards`
     @cli.switch(
         ['-t', '--table'],
         str,
-        help='path to table/tinyDB file'
+        help='path to table/tinyDB file or shard folder'
     )
     def override_table_file(self, table):
         """validate path and update self.table_file"""
-        if path.isfile(table):
+        if path.isfile(table) or path.isdir(table):
             self.table_file = table
         else:
             raise FileNotFoundError
 
+    article_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'articles.sqlite')
+    @cli.switch(
+        ['-a', '--articles'],
+        str,
+        help='path to article store (expands article refs in the archive)'
+    )
+    def override_article_file(self, articles):
+        """validate path and update self.article_file"""
+        if path.isfile(articles):
+            self.article_file = articles
+        else:
+            raise FileNotFoundError
+
     out_file = path.join(HERE, 'news_database_clean.csv')
     @cli.switch(
         ['-o', '--outfile'],
@@ -190,34 +608,103 @@ class Tablefy(cli.Application):
         """set up path to output file"""
         self.out_file = path.abspath(outfile)
 
+    stream = cli.Flag(
+        ['-s', '--stream'],
+        help='Stream records straight to CSV (flat memory use)'
+    )
+    incremental = cli.Flag(
+        ['-i', '--incremental'],
+        help='Only append records newer than the last run (implies --stream)'
+    )
+
+    profile = cli.Flag(
+        ['--profile'],
+        help='cProfile each step, summary written next to the logs'
+    )
+    profile_memory = cli.Flag(
+        ['--profile_memory'],
+        requires=['--profile'],
+        help='Add tracemalloc top allocation sites to the --profile summary'
+    )
+
     def main(self):
         """Program Main flow"""
         global LOGGER
         LOGGER = self._log_builder.logger
+        route_library_logs(LOGGER)
         LOGGER.debug('hello world')
 
+        profiler = None
+        if self.profile:
+            profiler = StageProfiler.for_run(LOG_PATH, ME, trace_memory=self.profile_memory)
+        try:
+            self.tablefy(profiler)
+        finally:
+            if profiler is not None:
+                profiler.dump()
+
+    def tablefy(self, profiler=None):
+        """crunch archive into price/news CSVs
+
+        Args:
+            profiler (:obj:`StageProfiler`, optional): step profiler
+
+        """
+        price_csv_file = self.out_file.replace('.csv', '-price.csv')
+        news_csv_file = self.out_file.replace('.csv', '-news.csv')
+        state_file = self.out_file.replace('.csv', '-state.json')
+        article_store = open_article_store(self.article_file)
+        if self.incremental:
+            LOGGER.info('updating from table file: ' + self.table_file)
+            with profile_section(profiler, 'update_tables'):
+                state = update_tables(
+                    self.table_file,
+                    price_csv_file,
+                    news_csv_file,
+                    state_file,
+                    article_store
+                )
+            LOGGER.info('summary tables at watermark: {0}'.format(state['watermark']))
+            return
+
+        if self.stream:
+            LOGGER.info('streaming table file: ' + self.table_file)
+            with profile_section(profiler, 'build_tables'):
+                state = build_tables(
+                    self.table_file,
+                    price_csv_file,
+                    news_csv_file,
+                    state_file,
+                    article_store
+                )
+            LOGGER.info('wrote summary tables: x{0} price rows'.format(state['price_rows']))
+            return
+
+        if path.isfile(state_file):  #tables no longer match the watermark
+            remove(state_file)
+
         #TODO: change to tinyDB handle?
         LOGGER.info('loading table file: ' + self.table_file)
-        db_file = None
-        with open(self.table_file, 'r') as json_fh:
-            db_file = json.load(json_fh)
+        with profile_section(profiler, 'load_archive'):
+            db_file = load_archive(self.table_file, article_store)
 
         LOGGER.info('processing table file')
-        crunched_price_data = process_price_data(db_file)
-        crunched_news_data = process_news_data(db_file)
+        with profile_section(profiler, 'process_price_data'):
+            crunched_price_data = process_price_data(db_file)
+        with profile_section(profiler, 'process_news_data'):
+            crunched_news_data = process_news_data(db_file)
 
         LOGGER.info('writing summary tables')
-        price_csv_file = self.out_file.replace('.csv', '-price.csv')
-        csv_dump(
-            crunched_price_data,
-            price_csv_file
-        )
-
-        news_csv_file = self.out_file.replace('.csv', '-news.csv')
-        csv_dump(
-            crunched_news_data,
-            news_csv_file
-        )
+        with profile_section(profiler, 'csv_dump'):
+            csv_dump(
+                crunched_price_data,
+                price_csv_file
+            )
+
+            csv_dump(
+                crunched_news_data,
+                news_csv_file
+            )
 
 if __name__ == '__main__':
     Tablefy.run()
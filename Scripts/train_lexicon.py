@@ -0,0 +1,558 @@
+from datetime import datetime
+from os import path, makedirs, replace
+import math
+import sys
+
+import ujson as json
+from plumbum import cli
+import numpy as np
+
+import prosper.common.prosper_logging as p_logging
+
+HERE = path.abspath(path.dirname(__file__))
+ROOT = path.dirname(HERE)
+if ROOT not in sys.path:    #run from a checkout without installing vincent_lexicon
+    sys.path.insert(0, ROOT)
+
+from vincent_lexicon.library_logging import route_library_logs
+from vincent_lexicon.phrase_lexicon import tokenize, ngrams, text_scale, write_phrase_lexicon
+from tablefy import iter_archive, open_article_store, Watermark
+
+ME = 'train_lexicon'
+
+LOGGER = p_logging.DEFAULT_LOGGER   #load with null logger
+LOG_PATH = path.join(HERE, 'logs')
+makedirs(LOG_PATH, exist_ok=True)
+
+STATE_FILE = 'state.json'
+TERMS_FILE = 'terms.txt'
+WEIGHTS_FILE = 'weights.npz'
+
+def document_terms(entry, max_ngram=3):
+    """1..`max_ngram` word n-gram features of a ticker-day's articles
+
+    Note:
+        same rule as `phrase_lexicon.PhraseScorer.score`: every occurrence
+        counts (overlaps included), scaled by `text_scale` of its title/blurb.
+        So `weights . features` equals the summed phrase `score` of the
+        entry's titles and blurbs.  n-grams never span title -> blurb or
+        article -> article
+    Args:
+        entry (:obj:`dict`): archive entry, articles expanded
+        max_ngram (int, optional): longest phrase to learn
+
+    Returns:
+        (:obj:`dict`): space-joined n-gram: feature value
+
+    """
+    terms = {}
+    for article in entry.get('news', []):
+        for text in (article.get('title', ''), article.get('blurb', '')):
+            tokens = tokenize(text)
+            scale = text_scale(tokens)
+            for gram in ngrams(tokens, max_ngram):
+                term = ' '.join(gram)
+                terms[term] = terms.get(term, 0.0) + scale
+    return terms
+
+def entry_target(entry, clip=10.0):
+    """`change_pct` for an entry, clipped to +/-`clip`, None if not a number"""
+    try:
+        change_pct = float((entry.get('price') or {}).get('change_pct'))
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(change_pct):
+        return None
+    return max(-clip, min(clip, change_pct))
+
+class CSRMatrix(object):
+    """compressed sparse row matrix, just the products SGD needs
+
+    Args:
+        indptr (:obj:`numpy.ndarray`): row start offsets into `indices`, len rows+1
+        indices (:obj:`numpy.ndarray`): column per stored value
+        data (:obj:`numpy.ndarray`): stored values
+
+    """
+    def __init__(self, indptr, indices, data):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, rows):
+        """build from per-row (column, value) lists
+
+        Args:
+            rows (:obj:`list` :obj:`list` :obj:`tuple`): (column, value) per
+                distinct column, per row
+
+        Returns:
+            (:obj:`CSRMatrix`)
+
+        """
+        lengths = np.array([len(row) for row in rows], dtype=np.int64)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        count = int(indptr[-1])
+        indices = np.fromiter(
+            (column for row in rows for column, _ in row), dtype=np.int64, count=count)
+        data = np.fromiter(
+            (value for row in rows for _, value in row), dtype=float, count=count)
+        return cls(indptr, indices, data)
+
+    @property
+    def rows(self):
+        return len(self.indptr) - 1
+
+    def row_ids(self):
+        """row number of every stored value"""
+        return np.repeat(np.arange(self.rows), np.diff(self.indptr))
+
+    def dot(self, weights):
+        """X @ weights"""
+        return np.bincount(
+            self.row_ids(), weights=self.data * weights[self.indices], minlength=self.rows)
+
+class LexiconModel(object):
+    """per-term linear model of `change_pct`, trained a day at a time
+
+    Note:
+        AdaGrad steps touch only the columns present in a batch, so a day costs
+        its non-zeros, not the vocabulary size.  The vocabulary stops growing
+        at `max_terms`, which bounds memory over any length of archive
+    Args:
+        max_ngram (int, optional): longest phrase learned
+        max_terms (int, optional): vocabulary cap
+
+    """
+    def __init__(self, max_ngram=3, max_terms=2000000):
+        self.max_ngram = max_ngram
+        self.max_terms = max_terms
+        self.terms = []
+        self.term_index = {}
+        self.weights = np.zeros(1024)
+        self.grad_sq = np.zeros(1024)
+        self.doc_freq = np.zeros(1024, dtype=np.int64)
+        self.bias = 0.0
+        self.bias_grad_sq = 0.0
+        self.state = {'watermark': None, 'samples': 0, 'days': [], 'history': []}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _grow(self, size):
+        """resize per-term arrays to hold at least `size` terms (doubling)"""
+        capacity = len(self.weights)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        extra = capacity - len(self.weights)
+        self.weights = np.concatenate([self.weights, np.zeros(extra)])
+        self.grad_sq = np.concatenate([self.grad_sq, np.zeros(extra)])
+        self.doc_freq = np.concatenate([self.doc_freq, np.zeros(extra, dtype=np.int64)])
+
+    def columns(self, terms):
+        """(column id, value) for a document's terms, adding new ones under the cap"""
+        term_index = self.term_index
+        columns = []
+        for term, value in terms.items():
+            column = term_index.get(term)
+            if column is None:
+                if len(self.terms) >= self.max_terms:
+                    continue
+                column = term_index[term] = len(self.terms)
+                self.terms.append(term)
+            columns.append((column, value))
+        self._grow(len(self.terms))
+        return sorted(columns)
+
+    def vectorize(self, entries):
+        """turn ticker-day entries into a sparse document matrix
+
+        Args:
+            entries (:obj:`list` :obj:`dict`): archive entries with a usable target
+
+        Returns:
+            (:obj:`CSRMatrix`): one row per entry
+
+        """
+        rows = [self.columns(document_terms(entry, self.max_ngram)) for entry in entries]
+        matrix = CSRMatrix.from_rows(rows)
+        np.add.at(self.doc_freq, matrix.indices, 1)
+        return matrix
+
+    def predict(self, matrix):
+        """expected `change_pct` per row: bias + summed phrase scores of its texts"""
+        return matrix.dot(self.weights) + self.bias
+
+    def partial_fit(
+            self,
+            matrix,
+            targets,
+            epochs=2,
+            batch_size=256,
+            learning_rate=0.05,
+            l2=1e-6,
+            seed=0
+    ):
+        """AdaGrad ridge regression over one day's documents
+
+        Args:
+            matrix (:obj:`CSRMatrix`): documents
+            targets (:obj:`numpy.ndarray`): `change_pct` per row
+            epochs (int, optional): passes over the day
+            batch_size (int, optional): rows per step
+            learning_rate (float, optional): AdaGrad base step
+            l2 (float, optional): ridge penalty on touched weights
+            seed (int, optional): row shuffle seed
+
+        Returns:
+            (float): mean squared error before the update (progressive validation)
+
+        """
+        loss = float(np.mean((self.predict(matrix) - targets) ** 2)) if matrix.rows else 0.0
+        rng = np.random.RandomState(seed)
+        for _ in range(epochs):
+            order = rng.permutation(matrix.rows)
+            for start in range(0, matrix.rows, batch_size):
+                rows = np.sort(order[start:start + batch_size])
+                batch = self._take(matrix, rows)
+                residual = self.predict(batch) - targets[rows]
+                columns, inverse = np.unique(batch.indices, return_inverse=True)
+                grad = np.bincount(
+                    inverse,
+                    weights=batch.data * np.repeat(residual, np.diff(batch.indptr)),
+                    minlength=len(columns)
+                ) / len(rows) + l2 * self.weights[columns]
+                self.grad_sq[columns] += grad ** 2
+                self.weights[columns] -= learning_rate * grad / (np.sqrt(self.grad_sq[columns]) + 1e-8)
+
+                bias_grad = float(residual.mean())
+                self.bias_grad_sq += bias_grad ** 2
+                self.bias -= learning_rate * bias_grad / (math.sqrt(self.bias_grad_sq) + 1e-8)
+        self.state['samples'] += matrix.rows
+        return loss
+
+    @staticmethod
+    def _take(matrix, rows):
+        """sub-matrix of (sorted) rows"""
+        starts = matrix.indptr[rows]
+        lengths = matrix.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        picks = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return CSRMatrix(indptr, matrix.indices[picks], matrix.data[picks])
+
+    def lexicon(self, min_df=5, top=100000, min_weight=1e-4):
+        """best-supported terms by weight magnitude
+
+        Args:
+            min_df (int, optional): ticker-days a term must appear in
+            top (int, optional): most phrases kept
+            min_weight (float, optional): drop near-zero weights
+
+        Returns:
+            (:obj:`list` :obj:`tuple`): (phrase, weight), strongest positive first
+
+        """
+        count = len(self.terms)
+        weights = self.weights[:count]
+        keep = np.flatnonzero((self.doc_freq[:count] >= min_df) & (np.abs(weights) >= min_weight))
+        if len(keep) > top:
+            keep = keep[np.argpartition(-np.abs(weights[keep]), top - 1)[:top]]
+        keep = keep[np.argsort(-weights[keep], kind='mergesort')]
+        return [(self.terms[column], float(weights[column])) for column in keep]
+
+    def save(self, model_dir):
+        """atomically write model state (terms, weights, watermark)
+
+        Args:
+            model_dir (str): path to model folder
+
+        """
+        makedirs(model_dir, exist_ok=True)
+        count = len(self.terms)
+        tmp_file = path.join(model_dir, TERMS_FILE + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as terms_fh:
+            for term in self.terms:
+                terms_fh.write(term + '\n')
+        replace(tmp_file, path.join(model_dir, TERMS_FILE))
+
+        tmp_file = path.join(model_dir, WEIGHTS_FILE + '.tmp')
+        with open(tmp_file, 'wb') as weights_fh:
+            np.savez(
+                weights_fh,
+                weights=self.weights[:count],
+                grad_sq=self.grad_sq[:count],
+                doc_freq=self.doc_freq[:count],
+                bias=np.array([self.bias, self.bias_grad_sq])
+            )
+        replace(tmp_file, path.join(model_dir, WEIGHTS_FILE))
+
+        state = dict(self.state)
+        state.update({
+            'terms': count,
+            'max_ngram': self.max_ngram,
+            'max_terms': self.max_terms,
+            'updated': datetime.today().strftime('%Y-%m-%d %H:%M:%S')
+        })
+        tmp_file = path.join(model_dir, STATE_FILE + '.tmp')
+        with open(tmp_file, 'w') as state_fh:
+            json.dump(state, state_fh)
+        replace(tmp_file, path.join(model_dir, STATE_FILE))
+
+    @classmethod
+    def load(cls, model_dir):
+        """read a saved model
+
+        Args:
+            model_dir (str): path to model folder
+
+        Returns:
+            (:obj:`LexiconModel`): None if no (consistent) model is saved there
+
+        """
+        try:
+            with open(path.join(model_dir, STATE_FILE), 'r') as state_fh:
+                state = json.load(state_fh)
+            with open(path.join(model_dir, TERMS_FILE), 'r', encoding='utf-8') as terms_fh:
+                terms = terms_fh.read().split('\n')[:state['terms']]
+            arrays = np.load(path.join(model_dir, WEIGHTS_FILE))
+        except (IOError, ValueError, KeyError):
+            return None
+        if len(terms) != state['terms'] or len(arrays['weights']) != state['terms']:
+            LOGGER.warning('model files disagree on term count, ignoring: ' + model_dir)
+            return None
+
+        model = cls(state['max_ngram'], state['max_terms'])
+        model.terms = terms
+        model.term_index = {term: column for column, term in enumerate(terms)}
+        model._grow(len(terms))
+        model.weights[:len(terms)] = arrays['weights']
+        model.grad_sq[:len(terms)] = arrays['grad_sq']
+        model.doc_freq[:len(terms)] = arrays['doc_freq']
+        model.bias, model.bias_grad_sq = (float(value) for value in arrays['bias'])
+        model.state = {
+            key: state[key] for key in ('watermark', 'samples', 'days', 'history', 'source')
+            if key in state
+        }
+        return model
+
+def iter_days(entries):
+    """group a date-ordered entry stream into (date, entries) per day"""
+    day = None
+    batch = []
+    for entry in entries:
+        date = entry['datetime'][:10]
+        if date != day and batch:
+            yield day, batch
+            batch = []
+        day = date
+        batch.append(entry)
+    if batch:
+        yield day, batch
+
+def train_archive(
+        table_file,
+        model,
+        article_store=None,
+        clip=10.0,
+        **fit_kwargs
+):
+    """fold every archive record past the model's watermark into the model
+
+    Note:
+        one day's documents are held at a time, the model is the only state
+        that grows with the archive
+    Args:
+        table_file (str): path to tinyDB file or shard folder
+        model (:obj:`LexiconModel`): model to update in place
+        article_store (:obj:`ArticleStore`, optional): expand article refs
+        clip (float, optional): clamp `change_pct` to +/-`clip`
+        fit_kwargs: passed to `LexiconModel.partial_fit`
+
+    Returns:
+        (:obj:`dict`): entries, days, skipped (no usable change_pct)
+
+    """
+    watermark = Watermark(model.state.get('watermark'))
+    counts = {'entries': 0, 'days': 0, 'skipped': 0}
+    entries = watermark.filter(iter_archive(
+        table_file, since=model.state.get('watermark'), article_store=article_store))
+    for date, day_entries in iter_days(entries):
+        targets = [entry_target(entry, clip) for entry in day_entries]
+        usable = [entry for entry, target in zip(day_entries, targets) if target is not None]
+        counts['skipped'] += len(day_entries) - len(usable)
+        if not usable:
+            continue
+
+        matrix = model.vectorize(usable)
+        loss = model.partial_fit(
+            matrix,
+            np.array([target for target in targets if target is not None]),
+            **fit_kwargs
+        )
+        if date not in model.state['days']:
+            model.state['days'].append(date)
+        model.state['history'].append({'date': date, 'entries': len(usable), 'mse': loss})
+        counts['entries'] += len(usable)
+        counts['days'] += 1
+        LOGGER.info(
+            '--trained day' +
+            '\n\tdate={0}'.format(date) +
+            '\n\tentries={0}'.format(len(usable)) +
+            '\n\tmse_before={0:.4f}'.format(loss) +
+            '\n\tterms={0}'.format(len(model))
+        )
+
+    if not watermark.found_previous:
+        LOGGER.warning('--watermark record missing from archive, trained on everything after it')
+    model.state['watermark'] = watermark.latest
+    return counts
+
+class TrainLexicon(cli.Application):
+    """Plumbum CLI application to learn a phrase lexicon from archived news + price moves"""
+
+    _log_builder = p_logging.ProsperLogger(
+        ME,
+        LOG_PATH
+    )
+
+    @cli.switch(
+        ['-v', '--verbose'],
+        help='Enable verbose messaging'
+    )
+    def enable_verbose(self):
+        """toggle verbose logger"""
+        self._log_builder.configure_debug_logger()
+
+    table_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'news_archive')
+    @cli.switch(
+        ['-t', '--table'],
+        str,
+        help='path to table/tinyDB file or shard folder'
+    )
+    def override_table_file(self, table):
+        """validate path and update self.table_file"""
+        if path.isfile(table) or path.isdir(table):
+            self.table_file = table
+        else:
+            raise FileNotFoundError
+
+    article_file = path.join(ROOT, 'vincent_lexicon', 'tables', 'articles.sqlite')
+    @cli.switch(
+        ['-a', '--articles'],
+        str,
+        help='path to article store (expands article refs in the archive)'
+    )
+    def override_article_file(self, articles):
+        """validate path and update self.article_file"""
+        if path.isfile(articles):
+            self.article_file = articles
+        else:
+            raise FileNotFoundError
+
+    model_dir = cli.SwitchAttr(
+        ['-m', '--model'],
+        str,
+        default=path.join(ROOT, 'vincent_lexicon', 'tables', 'lexicon_model'),
+        help='Folder holding model state between runs'
+    )
+    lexicon_file = cli.SwitchAttr(
+        ['-o', '--outfile'],
+        str,
+        default=path.join(ROOT, 'vincent_lexicon', 'tables', 'phrase_lexicon.tsv'),
+        help='Phrase lexicon to write (see `phrase_lexicon` in vincent_config.cfg)'
+    )
+    fresh = cli.Flag(
+        ['--fresh'],
+        help='Ignore saved model state and retrain from the whole archive'
+    )
+    max_ngram = cli.SwitchAttr(
+        ['-n', '--ngram'],
+        int,
+        default=3,
+        help='Longest phrase (in words) to learn'
+    )
+    max_terms = cli.SwitchAttr(
+        ['--max_terms'],
+        int,
+        default=2000000,
+        help='Vocabulary cap (bounds model memory)'
+    )
+    epochs = cli.SwitchAttr(
+        ['--epochs'],
+        int,
+        default=2,
+        help='Passes over each new day'
+    )
+    learning_rate = cli.SwitchAttr(
+        ['--learning_rate'],
+        float,
+        default=0.05,
+        help='AdaGrad base step size'
+    )
+    l2 = cli.SwitchAttr(
+        ['--l2'],
+        float,
+        default=1e-6,
+        help='Ridge penalty'
+    )
+    min_df = cli.SwitchAttr(
+        ['--min_df'],
+        int,
+        default=5,
+        help='Ticker-days a phrase must appear in to be written'
+    )
+    top = cli.SwitchAttr(
+        ['--top'],
+        int,
+        default=100000,
+        help='Most phrases written to the lexicon'
+    )
+
+    def main(self):
+        """Program Main flow"""
+        global LOGGER
+        LOGGER = self._log_builder.logger
+        route_library_logs(LOGGER)
+        LOGGER.debug('hello world')
+
+        model = None if self.fresh else LexiconModel.load(self.model_dir)
+        source = path.abspath(self.table_file)
+        if model is not None and (
+                model.state.get('source') != source or model.max_ngram != self.max_ngram
+        ):
+            LOGGER.warning('--saved model is for another archive/ngram size, retraining')
+            model = None
+        if model is None:
+            LOGGER.info('--training new model')
+            model = LexiconModel(self.max_ngram, self.max_terms)
+            model.state['source'] = source
+        else:
+            LOGGER.info('--updating model at watermark: {0}'.format(model.state['watermark']))
+
+        counts = train_archive(
+            self.table_file,
+            model,
+            article_store=open_article_store(self.article_file),
+            epochs=self.epochs,
+            learning_rate=self.learning_rate,
+            l2=self.l2
+        )
+        model.save(self.model_dir)
+        LOGGER.info('trained on x{entries} entries over x{days} days (x{skipped} without price)'.format(
+            **counts))
+
+        phrases = model.lexicon(min_df=self.min_df, top=self.top)
+        written = write_phrase_lexicon(self.lexicon_file, phrases, comments=[
+            'learned by train_lexicon.py {0}'.format(datetime.today().strftime('%Y-%m-%d')),
+            'weight = change_pct contribution, {0} samples over {1} days'.format(
+                model.state['samples'], len(model.state['days'])),
+        ])
+        LOGGER.info('wrote x{0} phrases: {1}'.format(written, self.lexicon_file))
+
+if __name__ == '__main__':
+    TrainLexicon.run()
@@ -0,0 +1,11 @@
+"""conftest.py: shared pytest setup for vincent_lexicon"""
+from os import path
+import sys
+
+HERE = path.abspath(path.dirname(__file__))
+ROOT = path.dirname(HERE)
+
+#Scripts/ are run as scripts, and NewsScraper uses flat imports from its own dir
+for import_path in (ROOT, path.join(ROOT, 'Scripts'), path.join(ROOT, 'vincent_lexicon')):
+    if import_path not in sys.path:
+        sys.path.insert(0, import_path)
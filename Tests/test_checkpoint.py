@@ -0,0 +1,54 @@
+"""test_checkpoint.py: validate run checkpoints and resume/retry ticker selection"""
+from checkpoint import Checkpoint
+import NewsScraper
+
+TICKERS = ['AAA', 'BBB', 'CCC', 'DDD']
+
+def test_checkpoint_statuses(tmpdir):
+    """last outcome per ticker wins, torn lines are skipped"""
+    checkpoint = Checkpoint(str(tmpdir), '2017-03-01')
+    checkpoint.record_many([('AAA', 'success'), ('BBB', 'failed'), ('CCC', 'empty')])
+    with open(checkpoint.checkpoint_file, 'a') as checkpoint_fh:
+        checkpoint_fh.write('{"ticker": "DDD", "sta')     #crashed mid-write
+    checkpoint.record('BBB', 'success')
+
+    assert list(checkpoint.load().items()) == [
+        ('AAA', 'success'), ('BBB', 'success'), ('CCC', 'empty')]
+    assert checkpoint.done() == {'AAA', 'BBB', 'CCC'}
+    assert checkpoint.failed() == []
+
+def test_latest(tmpdir):
+    """newest checkpoint, optionally before a date"""
+    checkpoint_dir = str(tmpdir)
+    assert Checkpoint.latest(checkpoint_dir) is None
+    for date in ('2017-03-01', '2017-03-03', '2017-03-02'):
+        Checkpoint(checkpoint_dir, date).record('AAA', 'success')
+
+    assert Checkpoint.latest(checkpoint_dir).date == '2017-03-03'
+    assert Checkpoint.latest(checkpoint_dir, before='2017-03-03').date == '2017-03-02'
+    assert Checkpoint.latest(checkpoint_dir, before='2017-03-01') is None
+
+def test_select_tickers_resume(tmpdir):
+    """--resume skips tickers already done today, retries today's failures"""
+    checkpoint = Checkpoint(str(tmpdir), '2017-03-02')
+    checkpoint.record_many([('AAA', 'success'), ('BBB', 'failed'), ('CCC', 'empty')])
+
+    assert NewsScraper.select_tickers(TICKERS, checkpoint) == TICKERS
+    assert NewsScraper.select_tickers(TICKERS, checkpoint, resume=True) == ['BBB', 'DDD']
+
+def test_select_tickers_retry_failed(tmpdir):
+    """--retry-failed runs the previous run's failures, not today's"""
+    checkpoint_dir = str(tmpdir)
+    Checkpoint(checkpoint_dir, '2017-03-01').record_many([('AAA', 'failed'), ('BBB', 'failed')])
+    previous = Checkpoint(checkpoint_dir, '2017-03-02')
+    previous.record_many([('AAA', 'success'), ('CCC', 'failed'), ('DDD', 'failed')])
+    today = Checkpoint(checkpoint_dir, '2017-03-03')
+    today.record_many([('DDD', 'success')])
+
+    assert NewsScraper.select_tickers(TICKERS, today, retry_failed=True) == ['CCC', 'DDD']
+    assert NewsScraper.select_tickers(
+        TICKERS, today, resume=True, retry_failed=True) == ['CCC']
+    assert NewsScraper.select_tickers(TICKERS, previous, retry_failed=True) == ['AAA', 'BBB']
+
+    first = Checkpoint(checkpoint_dir, '2017-03-01')
+    assert NewsScraper.select_tickers(TICKERS, first, retry_failed=True) == []
@@ -0,0 +1,104 @@
+"""test_http_client.py: validate retry/backoff, per-host throttling and HTTP metrics"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+import time
+
+import pytest
+
+from http_client import HTTPClient, HostThrottle, JitteredRetry
+from metrics import Metrics
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """503 for the first `server.failures` requests, then 200"""
+    def do_GET(self):
+        self.server.requests += 1
+        code = 503 if self.server.requests <= self.server.failures else 200
+        body = b'ok'
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def flaky_server():
+    """local endpoint failing twice before answering"""
+    server = HTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.requests = 0
+    server.failures = 2
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_jittered_backoff(monkeypatch):
+    """backoff is drawn from [0, exponential value]"""
+    retry = JitteredRetry(total=5, backoff_factor=1.0)
+    for _ in range(3):
+        retry = retry.increment(method='GET', url='/', error=IOError('reset'))
+    ceiling = 4.0   #backoff_factor * 2 ** (3 - 1)
+
+    draws = []
+    monkeypatch.setattr('random.uniform', lambda low, high: draws.append((low, high)) or high / 2)
+    assert retry.get_backoff_time() == ceiling / 2
+    assert draws == [(0, ceiling)]
+    assert JitteredRetry(total=5, backoff_factor=1.0).get_backoff_time() == 0
+
+def test_retry_counted(flaky_server):
+    """503s are retried, and every retried attempt is counted"""
+    metrics = Metrics()
+    client = HTTPClient(max_retries=3, backoff_factor=0, metrics=metrics)
+    url = 'http://127.0.0.1:{0}/finance/company_news'.format(flaky_server.server_port)
+
+    response = client.get(url, params={'q': 'AAPL'})
+
+    assert response.status_code == 200
+    assert flaky_server.requests == 3
+    endpoint = '127.0.0.1:{0}/finance/company_news'.format(flaky_server.server_port)
+    assert metrics.counter('http_retries_total', endpoint=endpoint, reason=503) == 2
+    assert metrics.counter('http_responses_total', endpoint=endpoint, code=200) == 1
+    client.close()
+
+def test_host_throttle():
+    """at most max_per_host requests in flight per host, hosts independent"""
+    throttle = HostThrottle(2)
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+    def request(url, host):
+        with throttle.limit(url):
+            with lock:
+                in_flight[host] = in_flight.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), in_flight[host])
+            time.sleep(0.02)
+            with lock:
+                in_flight[host] -= 1
+    workers = [
+        threading.Thread(target=request, args=('https://{0}/path?q={1}'.format(host, indx), host))
+        for host in ('a.test', 'b.test') for indx in range(6)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert peak == {'a.test': 2, 'b.test': 2}
+
+def test_connection_stats_after_eviction(flaky_server):
+    """retried attempts and evicted pools still count"""
+    client = HTTPClient(pool_connections=1, max_retries=3, backoff_factor=0)
+    port = flaky_server.server_port
+
+    client.get('http://127.0.0.1:{0}/'.format(port))     #2 retries, then 200
+    client.get('http://localhost:{0}/'.format(port))     #new pool evicts the first
+    client.get('http://localhost:{0}/'.format(port))
+
+    stats = client.connection_stats()
+    assert stats['requests'] == flaky_server.requests == 5
+    assert stats['retries'] == 2
+    assert stats['connections'] >= 2
+    assert stats['reused'] == stats['requests'] - stats['connections']
+    client.close()
@@ -0,0 +1,88 @@
+"""test_market_calendar.py: validate MarketCalendar lookups, prefetch and cache dedupe"""
+import calendar
+
+import pytest
+from tinydb import TinyDB
+
+from market_calendar import MarketCalendar, CalendarUnavailable
+
+class FakeResponse(object):
+    """requests.Response stand-in"""
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+class FakeCalendarEndpoint(object):
+    """tradier calendar: weekdays open, weekends closed, requests logged"""
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        year, month = int(params['year']), int(params['month'])
+        self.requests.append((year, month))
+        days = [
+            {
+                'date': '{0}-{1:02d}-{2:02d}'.format(year, month, day),
+                'status': 'open' if calendar.weekday(year, month, day) < 5 else 'closed'
+            }
+            for day in range(1, calendar.monthrange(year, month)[1] + 1)
+        ]
+        return FakeResponse({'calendar': {'days': {'day': days}}})
+
+def build_calendar(tmpdir, endpoint, prefetch_months=1):
+    """MarketCalendar over a cache file in tmpdir"""
+    return MarketCalendar(
+        str(tmpdir.join('calendar.json')),
+        'http://calendar.test',
+        'KEY',
+        endpoint,
+        prefetch_months=prefetch_months
+    )
+
+def test_status(tmpdir):
+    """a cache miss fetches the month once, later lookups are in memory"""
+    endpoint = FakeCalendarEndpoint()
+    market = build_calendar(tmpdir, endpoint)
+
+    assert market.status('2017-03-03') == 'open'
+    assert market.status('2017-03-04') == 'closed'
+    assert market.is_trading_day('2017-03-06')
+    assert endpoint.requests == [(2017, 3)]
+
+def test_next_trading_days(tmpdir):
+    """open days on/after date, fetching the next month as needed"""
+    endpoint = FakeCalendarEndpoint()
+    market = build_calendar(tmpdir, endpoint)
+
+    assert market.next_trading_days('2017-03-25', count=3) == [
+        '2017-03-27', '2017-03-28', '2017-03-29']
+    assert market.next_trading_days('2017-03-30', count=4) == [
+        '2017-03-30', '2017-03-31', '2017-04-03', '2017-04-04']
+    assert endpoint.requests == [(2017, 3), (2017, 4)]
+
+def test_next_trading_days_unavailable(tmpdir):
+    """give up after prefetch_months extra months"""
+    endpoint = FakeCalendarEndpoint()
+    market = build_calendar(tmpdir, endpoint)
+
+    with pytest.raises(CalendarUnavailable):
+        market.next_trading_days('2017-03-01', count=100)
+
+def test_cache_reused_and_deduped(tmpdir):
+    """a new process reads the cache, duplicate days are rewritten once"""
+    endpoint = FakeCalendarEndpoint()
+    build_calendar(tmpdir, endpoint).prefetch('2017-03-01')
+    cache = TinyDB(str(tmpdir.join('calendar.json')))
+    cache.insert({'date': '2017-03-03', 'status': 'open'})
+    assert len(cache.all()) == 32
+    cache.close()
+
+    market = build_calendar(tmpdir, endpoint)
+    assert market.status('2017-03-03') == 'open'
+    assert endpoint.requests == [(2017, 3)]
+
+    cache = TinyDB(str(tmpdir.join('calendar.json')))
+    assert len(cache.all()) == 31
+    cache.close()
@@ -0,0 +1,45 @@
+"""test_metrics.py: validate Metrics JSON/Prometheus export"""
+import ujson as json
+
+from metrics import Metrics, LONG_BUCKETS
+
+def sample_metrics():
+    """a few of each metric kind"""
+    metrics = Metrics()
+    metrics.inc('http_responses_total', endpoint='host/path', code=200)
+    metrics.inc('http_responses_total', 2, endpoint='host/path', code=200)
+    metrics.set('tickers', 5, status='success')
+    metrics.observe('http_request_seconds', 0.02, endpoint='host/path')
+    metrics.observe('http_request_seconds', 3.0, endpoint='host/path')
+    metrics.observe('ticker_seconds', 90.0, buckets=LONG_BUCKETS)
+    return metrics
+
+def test_prometheus_text():
+    """counters, gauges and cumulative histogram buckets in exposition format"""
+    lines = sample_metrics().to_prometheus().splitlines()
+
+    assert '# TYPE vincent_http_responses_total counter' in lines
+    assert 'vincent_http_responses_total{code="200",endpoint="host/path"} 3' in lines
+    assert 'vincent_tickers{status="success"} 5' in lines
+    assert '# TYPE vincent_http_request_seconds histogram' in lines
+    assert 'vincent_http_request_seconds_bucket{endpoint="host/path",le="0.025"} 1' in lines
+    assert 'vincent_http_request_seconds_bucket{endpoint="host/path",le="5.0"} 2' in lines
+    assert 'vincent_http_request_seconds_bucket{endpoint="host/path",le="+Inf"} 2' in lines
+    assert 'vincent_http_request_seconds_count{endpoint="host/path"} 2' in lines
+    assert 'vincent_ticker_seconds_bucket{le="60.0"} 0' in lines
+    assert 'vincent_ticker_seconds_bucket{le="120.0"} 1' in lines
+
+def test_json_file(tmpdir):
+    """json export round-trips, written atomically"""
+    metrics_file = str(tmpdir.join('metrics.json'))
+
+    sample_metrics().write(metrics_file, 'json')
+
+    with open(metrics_file, 'r') as metrics_fh:
+        payload = json.load(metrics_fh)
+    assert payload['counters']['http_responses_total'] == [
+        {'labels': {'code': 200, 'endpoint': 'host/path'}, 'value': 3}]
+    latency = payload['histograms']['http_request_seconds'][0]['value']
+    assert latency['count'] == 2
+    assert latency['buckets'][-1] == ['+Inf', 2]
+    assert not tmpdir.join('metrics.json.tmp').check()
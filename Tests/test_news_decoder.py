@@ -0,0 +1,47 @@
+"""test_news_decoder.py: validate fast-path decoding of the Google news payload"""
+import pytest
+
+from vincent_lexicon import news_decoder
+
+def test_bare_keys_and_trailing_commas():
+    """JS object syntax becomes strict JSON"""
+    payload = '{clusters: [{id: 1, a: [1, 2,],},], $total: 2,}'
+    assert news_decoder.decode_news(payload) == {
+        'clusters': [{'id': 1, 'a': [1, 2]}],
+        '$total': 2
+    }
+
+def test_single_quotes():
+    """single-quoted strings, with bare/escaped quotes inside"""
+    payload = "{'title': 'He said \"up\"', 'blurb': 'it\\'s fine'}"
+    assert news_decoder.decode_news(payload) == {
+        'title': 'He said "up"',
+        'blurb': "it's fine"
+    }
+
+def test_escapes():
+    """\\xNN becomes \\u00NN, JSON escapes pass through"""
+    payload = r'{t: "caf\xe9 é \"q\" \\x41", u: ' + r"'a\x26b'}"
+    assert news_decoder.decode_news(payload) == {
+        't': 'caf\xe9 \xe9 "q" \\x41',
+        'u': 'a&b'
+    }
+
+def test_string_contents_untouched():
+    """key/comma lookalikes inside strings are not rewritten"""
+    payload = '{"t": "key: value,]", "u": \'x: 1,}\'}'
+    assert news_decoder.decode_news(payload) == {'t': 'key: value,]', 'u': 'x: 1,}'}
+
+def test_normalize():
+    """normalize alone emits strict JSON"""
+    assert news_decoder.normalize("{a: 'b', c: [1,],}") == '{"a": "b", "c": [1]}'
+
+def test_empty_feed():
+    """HTML page (no news) raises EmptyNewsFeed"""
+    with pytest.raises(news_decoder.EmptyNewsFeed):
+        news_decoder.decode_news('  <!DOCTYPE html><html></html>')
+
+def test_malformed():
+    """unparseable payload raises the decoder's own error"""
+    with pytest.raises(news_decoder.NewsDecodeError):
+        news_decoder.decode_news('{clusters: [')
@@ -0,0 +1,67 @@
+"""test_nltk_resources.py: validate offline-first NLTK checks and binary lexicons"""
+from os import path, makedirs
+import zipfile
+
+import nltk
+import pytest
+
+import nltk_resources
+from nltk_resources import NLTKResources, load_vader_lexicon, load_opinion_lexicon
+
+def write_nltk_data(data_dir):
+    """minimal vader_lexicon.zip + opinion_lexicon corpus"""
+    makedirs(path.join(data_dir, 'sentiment'))
+    with zipfile.ZipFile(path.join(data_dir, 'sentiment', 'vader_lexicon.zip'), 'w') as vader_zip:
+        vader_zip.writestr(
+            'vader_lexicon/vader_lexicon.txt',
+            'good\t1.9\t0.9\t[2, 2]\nbad\t-2.5\t0.5\t[-3, -2]'
+        )
+    opinion_dir = path.join(data_dir, 'corpora', 'opinion_lexicon')
+    makedirs(opinion_dir)
+    for name, words in (('positive-words.txt', 'good\ngreat\n'), ('negative-words.txt', 'bad\n')):
+        with open(path.join(opinion_dir, name), 'w') as words_fh:
+            words_fh.write(';header comment\n\n' + words)
+
+@pytest.fixture
+def nltk_data(tmpdir, monkeypatch):
+    """local nltk_data folder, nltk search path restored afterwards"""
+    monkeypatch.setattr(nltk.data, 'path', list(nltk.data.path))
+    data_dir = str(tmpdir.join('nltk_data'))
+    write_nltk_data(data_dir)
+    return data_dir
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """record nltk.download calls instead of hitting the network"""
+    calls = []
+    monkeypatch.setattr(nltk, 'download', lambda names, **kwargs: calls.append(list(names)) or False)
+    return calls
+
+def test_found_locally(nltk_data, downloads):
+    """present resources never trigger a download"""
+    resources = NLTKResources(nltk_data)
+
+    assert resources.find('vader_lexicon') == path.join(nltk_data, 'sentiment', 'vader_lexicon.zip')
+    assert resources.ensure(['vader_lexicon', 'opinion_lexicon'])
+    assert downloads == []
+
+def test_download_only_missing(nltk_data, downloads):
+    """only the missing package is requested"""
+    resources = NLTKResources(nltk_data)
+
+    assert not resources.ensure(['vader_lexicon', 'opinion_lexicon', 'subjectivity'])
+    assert downloads == [['subjectivity']]
+
+def test_binary_lexicon_round_trip(nltk_data, tmpdir, monkeypatch):
+    """marshalled lexicons match the nltk sources, rebuilt only when stale"""
+    resources = NLTKResources(nltk_data, str(tmpdir.join('lexicons')))
+
+    lexicon_paths = resources.build_lexicons()
+
+    assert load_vader_lexicon(lexicon_paths['vader_lexicon']) == {'good': 1.9, 'bad': -2.5}
+    assert load_opinion_lexicon(lexicon_paths['opinion_lexicon']) == (['good', 'great'], ['bad'])
+
+    writes = []
+    monkeypatch.setattr(nltk_resources, '_write_binary', lambda *args: writes.append(args))
+    assert resources.build_lexicons() == lexicon_paths
+    assert writes == []
@@ -0,0 +1,104 @@
+"""test_phrase_lexicon.py: validate trie phrase matching and lexicon files"""
+import math
+
+import pytest
+
+from phrase_lexicon import (
+    PhraseScorer, tokenize, ngrams, read_phrase_lexicon, write_phrase_lexicon, lexicon_version
+)
+
+PHRASES = {
+    'missing': -0.5,
+    'projections': 0.1,
+    'missing projections': -1.0,
+    'earnings miss': -1.5,
+    'beat': 1.0,
+    'beat earnings estimates': 2.0,
+    'anti-trust': -0.8,
+}
+
+def brute_force(scorer_phrases, tokens, max_ngram=4):
+    """every (start, end, weight) by checking each ngram against the lexicon"""
+    lexicon = {tuple(tokenize(phrase)): weight for phrase, weight in scorer_phrases.items()}
+    matches = []
+    for start in range(len(tokens)):
+        for end in range(start + 1, min(start + max_ngram, len(tokens)) + 1):
+            run = tuple(tokens[start:end])
+            if run in lexicon:
+                matches.append((start, end, lexicon[run]))
+    return matches
+
+def test_match_overlaps():
+    """nested and overlapping phrases all match"""
+    scorer = PhraseScorer(PHRASES)
+    tokens = tokenize('Missing projections: beat earnings estimates, beat again')
+
+    assert scorer.match(tokens) == [
+        (0, 1, -0.5),   #missing
+        (0, 2, -1.0),   #missing projections
+        (1, 2, 0.1),    #projections
+        (2, 3, 1.0),    #beat
+        (2, 5, 2.0),    #beat earnings estimates
+        (5, 6, 1.0),    #beat
+    ]
+
+@pytest.mark.parametrize('text', [
+    'Earnings miss on anti trust probe, missing projections',
+    'beat beat earnings miss missing missing projections projections',
+    'no lexicon words here at all',
+    '',
+])
+def test_match_brute_force(text):
+    """trie walk finds exactly the ngrams present in the lexicon"""
+    tokens = tokenize(text)
+    assert PhraseScorer(PHRASES).match(tokens) == brute_force(PHRASES, tokens)
+
+def test_score():
+    """summed weights scaled by 1/sqrt(tokens), repeats scored once"""
+    scorer = PhraseScorer(PHRASES)
+    text = 'Anti-trust probe: missing projections'
+
+    result = scorer.score(text)
+
+    assert result['matches'] == 4
+    assert result['score'] == pytest.approx((-0.8 - 0.5 - 1.0 + 0.1) / math.sqrt(5))
+    assert -1 < result['compound'] < 0
+    assert scorer.score('') == {'score': 0.0, 'matches': 0, 'compound': 0.0}
+    assert scorer.score_many([text, '', text]) == [result, scorer.score(''), result]
+
+def test_add_overwrites():
+    """re-adding a phrase replaces its weight, size counts phrases"""
+    scorer = PhraseScorer(PHRASES)
+    scorer.add('Beat', 3.0)
+    scorer.add(('new', 'phrase'), 0.5)
+    scorer.add('', 9.0)
+
+    assert len(scorer) == len(PHRASES) + 1
+    assert scorer.match(tokenize('beat new phrase')) == [(0, 1, 3.0), (1, 3, 0.5)]
+
+def test_ngrams():
+    """every run up to max_ngram, text order"""
+    assert list(ngrams(['a', 'b', 'c'], 2)) == [('a',), ('a', 'b'), ('b',), ('b', 'c'), ('c',)]
+
+def test_lexicon_round_trip(tmpdir):
+    """written lexicons read back as token tuples, version follows content"""
+    lexicon_path = str(tmpdir.join('phrases.tsv'))
+    count = write_phrase_lexicon(lexicon_path, sorted(PHRASES.items()), comments=['trained'])
+    version = lexicon_version(lexicon_path)
+
+    assert count == len(PHRASES)
+    assert read_phrase_lexicon(lexicon_path) == {
+        tuple(tokenize(phrase)): weight for phrase, weight in PHRASES.items()}
+    scorer = PhraseScorer.from_file(lexicon_path)
+    assert (scorer.version, scorer.lexicon_path) == (version, lexicon_path)
+
+    write_phrase_lexicon(lexicon_path, [('beat', 1.5)])
+    assert lexicon_version(lexicon_path) != version
+
+def test_malformed_lexicon(tmpdir):
+    """bad weight lines name the file and line"""
+    lexicon_path = tmpdir.join('phrases.tsv')
+    lexicon_path.write('# header\nbeat\t1.0\nmiss\tlots\n')
+    with pytest.raises(ValueError) as err:
+        read_phrase_lexicon(str(lexicon_path))
+    assert ':3:' in str(err.value)
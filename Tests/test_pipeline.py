@@ -0,0 +1,114 @@
+"""test_pipeline.py: validate NewsScraper pipeline fetching, ordering and outcome bookkeeping"""
+import threading
+import time
+
+import pytest
+
+from checkpoint import Checkpoint
+from storage import ShardedStore
+import NewsScraper
+
+STORY_FEED = '''{clusters: [
+    {id: '1', a: [{s: 'Source', u: 'http://x', t: 'Title &amp; co', sp: 'Blurb', usg: 'u1', tt: '1488384000'}]},
+    {id: '-1'},
+]}'''
+FEEDS = {
+    'WRITTEN': STORY_FEED,
+    'NOPRICE': STORY_FEED,
+    'HTML': '<html>no news</html>',     #empty feed endpoint
+    'NOSTORY': "{clusters: [{id: '-1'}]}",
+    'BROKEN': '{clusters: [',          #undecodable: counted as empty, like the HTML page
+}
+
+def fake_request_news(ticker, news_source):
+    """canned feeds, FAILED raises like a dead endpoint"""
+    if ticker not in FEEDS:
+        raise IOError('connection refused: ' + ticker)
+    return FEEDS[ticker]
+
+def fake_price_table(ticker_list, batch_size=None):
+    """every ticker but NOPRICE has a quote"""
+    return {
+        ticker: {'change_pct': 1.0, 'close': 10.0, 'source': 'Test'}
+        for ticker in ticker_list if ticker != 'NOPRICE'
+    }
+
+@pytest.fixture
+def fake_endpoints(monkeypatch):
+    """no network: canned news feeds and quotes"""
+    monkeypatch.setattr(NewsScraper, 'request_news', fake_request_news)
+    monkeypatch.setattr(NewsScraper, 'fetch_price_table', fake_price_table)
+
+def test_outcome_bookkeeping(tmpdir, fake_endpoints):
+    """every ticker ends up written, empty or failed, in the checkpoint too"""
+    ticker_list = ['WRITTEN', 'HTML', 'NOSTORY', 'BROKEN', 'FAILED', 'NOPRICE']
+    checkpoint = Checkpoint(str(tmpdir.join('checkpoints')), '2017-03-01')
+    outcomes = NewsScraper.TickerOutcomes(ticker_list, checkpoint=checkpoint)
+    store = ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+
+    NewsScraper.run_pipeline(ticker_list, store, outcomes=outcomes)
+
+    assert [entry['ticker'] for entry in store.iter_records()] == ['WRITTEN']
+    assert store.all()[0]['news'][0]['title'] == 'Title & co'
+    assert sorted(outcomes.empty) == ['BROKEN', 'HTML', 'NOSTORY']
+    assert sorted(outcomes.failed) == ['FAILED', 'NOPRICE']
+    assert isinstance(outcomes.last_exception, (IOError, KeyError))
+    assert dict(checkpoint.load()) == {
+        'WRITTEN': 'success',
+        'HTML': 'empty',
+        'NOSTORY': 'empty',
+        'BROKEN': 'empty',
+        'FAILED': 'failed',
+        'NOPRICE': 'failed',
+    }
+
+def test_price_failure_marks_batch(tmpdir, fake_endpoints, monkeypatch):
+    """a failed quote batch fails its tickers, not the run"""
+    def broken_price_table(ticker_list, batch_size=None):
+        raise IOError('quote endpoint down')
+    monkeypatch.setattr(NewsScraper, 'fetch_price_table', broken_price_table)
+    outcomes = NewsScraper.TickerOutcomes(['WRITTEN', 'HTML'])
+    store = ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+
+    NewsScraper.run_pipeline(['WRITTEN', 'HTML'], store, outcomes=outcomes)
+
+    assert list(store.iter_records()) == []
+    assert sorted(outcomes.failed) == ['WRITTEN']
+    assert sorted(outcomes.empty) == ['HTML']
+
+def test_write_batch_in_ticker_order(tmpdir, fake_endpoints, monkeypatch):
+    """entries fetched out of order are written in ticker_list order"""
+    ticker_list = ['A', 'B', 'C', 'D']
+    def slow_request_news(ticker, news_source):
+        time.sleep(0.05 * (len(ticker_list) - ticker_list.index(ticker)))
+        return STORY_FEED   #A finishes last
+    monkeypatch.setattr(NewsScraper, 'request_news', slow_request_news)
+    store = ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+
+    NewsScraper.run_pipeline(ticker_list, store, fetch_workers=len(ticker_list))
+
+    assert [entry['ticker'] for entry in store.iter_records()] == ticker_list
+
+def test_concurrent_fetch(tmpdir, fake_endpoints, monkeypatch):
+    """fetch_workers news requests run at once, each ticker fetched once"""
+    ticker_list = ['T{0}'.format(indx) for indx in range(8)]
+    lock = threading.Lock()
+    fetched = []
+    in_flight = [0, 0]  #now, peak
+    def slow_request_news(ticker, news_source):
+        with lock:
+            fetched.append(ticker)
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return STORY_FEED
+    monkeypatch.setattr(NewsScraper, 'request_news', slow_request_news)
+    store = ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+
+    NewsScraper.run_pipeline(ticker_list, store, fetch_workers=4)
+
+    assert sorted(fetched) == ticker_list
+    assert 1 < in_flight[1] <= 4
+    assert sorted(entry['ticker'] for entry in store.iter_records()) == ticker_list
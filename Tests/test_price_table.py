@@ -0,0 +1,102 @@
+"""test_price_table.py: validate NewsScraper batched quote fetching"""
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+import NewsScraper
+
+YAHOO = {
+    'AAPL': {'last': '140.10', 'change_pct': '+1.25%', 'PE': '16.8', 'short_ratio': '1.9'},
+    'MSFT': {'last': '64.20', 'change_pct': '-0.50%', 'PE': 'N/A', 'short_ratio': '2.1'},
+    'DELISTED': {'last': 'N/A', 'change_pct': 'N/A', 'PE': 'N/A', 'short_ratio': 'N/A'},
+}
+GOOGLE = {
+    'DELISTED': {'last': '3.10', 'change_pct': '2.00'},
+    'GONE': {'last': 'N/A', 'change_pct': 'N/A'},
+}
+
+def fake_reader(quotes, requests):
+    """pandas_datareader-like quote reader over a canned table"""
+    class _Reader(object):
+        def __init__(self, symbols, session=None):
+            self.symbols = symbols
+
+        def read(self):
+            requests.append(list(self.symbols))
+            rows = {
+                ticker: quotes[ticker]
+                for ticker in self.symbols if ticker in quotes
+            }
+            return pd.DataFrame.from_dict(rows, orient='index')
+    return _Reader
+
+@pytest.fixture
+def quote_requests(monkeypatch):
+    """no network: yahoo/google readers serve YAHOO/GOOGLE, requests logged by source"""
+    requests = {'yahoo': [], 'google': []}
+    readers = {
+        'YahooQuotesReader': fake_reader(YAHOO, requests['yahoo']),
+        'GoogleQuotesReader': fake_reader(GOOGLE, requests['google']),
+    }
+    for source, name in (('yahoo', 'YahooQuotesReader'), ('google', 'GoogleQuotesReader')):
+        module = types.ModuleType('pandas_datareader.{0}.quotes'.format(source))
+        setattr(module, name, type(name, (object,), {}))
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    monkeypatch.setattr(
+        NewsScraper, 'quote_reader',
+        lambda reader_class, uri=None: readers[reader_class.__name__]
+    )
+    return requests
+
+def test_price_table_batches(quote_requests):
+    """tickers are deduped and quoted batch_size at a time"""
+    price_table = NewsScraper.fetch_price_table(
+        ['AAPL', 'MSFT', 'AAPL', 'DELISTED'], batch_size=2)
+
+    assert quote_requests['yahoo'] == [['AAPL', 'MSFT'], ['DELISTED']]
+    assert price_table['AAPL'] == {
+        'change_pct': 1.25,
+        'close': 140.10,
+        'PE': 16.8,
+        'short_ratio': 1.9,
+        'source': 'Yahoo'
+    }
+    assert price_table['MSFT']['PE'] is None
+
+def test_price_table_google_fallback(quote_requests):
+    """only tickers yahoo could not quote go to google, 'N/A' rows are skipped"""
+    price_table = NewsScraper.fetch_price_table(
+        ['AAPL', 'DELISTED', 'GONE'], batch_size=10)
+
+    assert quote_requests['google'] == [['DELISTED', 'GONE']]
+    assert price_table['DELISTED'] == {
+        'change_pct': 2.0,
+        'close': 3.10,
+        'PE': None,
+        'short_ratio': None,
+        'source': 'Google'
+    }
+    assert 'GONE' not in price_table
+    assert sorted(price_table) == ['AAPL', 'DELISTED']
+
+def test_throttle_configured_hosts(quote_requests, monkeypatch):
+    """quote requests hold a slot for the configured endpoint's host"""
+    config_value = NewsScraper.config_value
+    uris = {
+        'yahoo_quote_uri': 'http://127.0.0.1:8001/d/quotes.csv',
+        'google_quote_uri': 'http://127.0.0.1:8002/finance/info',
+    }
+    monkeypatch.setattr(
+        NewsScraper, 'config_value',
+        lambda key, *args, **kwargs: uris[key] if key in uris else config_value(key, *args, **kwargs)
+    )
+    throttle = NewsScraper.get_http_client().throttle
+    hosts = []
+    limit = throttle.limit
+    monkeypatch.setattr(throttle, 'limit', lambda url: hosts.append(url) or limit(url))
+
+    NewsScraper.fetch_price_table(['AAPL', 'DELISTED'], batch_size=10)
+
+    assert hosts == ['127.0.0.1:8001', '127.0.0.1:8002']
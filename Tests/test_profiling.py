@@ -0,0 +1,55 @@
+"""test_profiling.py: validate StageProfiler dumps and threaded sections"""
+from os import path
+import threading
+
+from profiling import StageProfiler, profile_section, SUMMARY_FILE
+
+def busy_stage(batch):
+    """stand-in stage function"""
+    return [sum(range(item)) for item in batch]
+
+def test_dump_files(tmpdir):
+    """one .pstats per stage plus a summary naming the stage functions"""
+    profiler = StageProfiler(str(tmpdir.join('profile')), trace_memory=True, top=5)
+    parse = profiler.wrap('parse', busy_stage)
+    assert parse([10, 100]) == [45, 4950]
+    with profile_section(profiler, 'write'):
+        busy_stage([1000])
+
+    summary_file = profiler.dump()
+
+    assert summary_file == path.join(str(tmpdir.join('profile')), SUMMARY_FILE)
+    assert tmpdir.join('profile', 'parse.pstats').check()
+    assert tmpdir.join('profile', 'write.pstats').check()
+    assert tmpdir.join('profile', 'tracemalloc.snapshot').check()
+    summary = tmpdir.join('profile', SUMMARY_FILE).read()
+    assert '==== parse' in summary
+    assert 'busy_stage' in summary
+    assert '==== memory' in summary
+
+def test_threaded_sections(tmpdir):
+    """stage workers profile concurrently without clashing profilers"""
+    profiler = StageProfiler(str(tmpdir.join('profile')))
+    fetch = profiler.wrap('fetch', busy_stage)
+    errors = []
+    def worker():
+        try:
+            for _ in range(20):
+                fetch([5000])
+        except Exception as err_msg:
+            errors.append(err_msg)
+    workers = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    profiler.dump()
+
+    assert errors == []
+    assert tmpdir.join('profile', 'fetch.pstats').check()
+
+def test_profile_section_off():
+    """no profiler: sections are a no-op"""
+    with profile_section(None, 'anything'):
+        assert busy_stage([3]) == [3]
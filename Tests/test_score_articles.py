@@ -0,0 +1,44 @@
+"""test_score_articles.py: validate multi-process scoring matches in-process scoring"""
+import copy
+import marshal
+
+import pytest
+
+import scorers
+import NewsScraper
+
+VADER_LEXICON = {'strong': 2.3, 'gains': 1.6, 'beat': 1.2, 'weak': -1.9, 'losses': -2.0, 'lawsuit': -1.5}
+OPINION_LEXICON = (['strong', 'gains', 'beat'], ['weak', 'losses', 'lawsuit'])
+ARTICLES = [
+    {'title': 'Apple posts strong gains', 'blurb': 'Earnings beat estimates'},
+    {'title': 'Weak guidance', 'blurb': 'Losses widen as lawsuit drags on'},
+    {'title': 'Shares flat', 'blurb': 'Quiet day for the market'},
+    {'title': 'Apple posts strong gains', 'blurb': 'Losses widen as lawsuit drags on'},
+    {'title': 'Strong quarter, weak outlook', 'blurb': 'Analysts split'},
+]
+
+@pytest.fixture
+def lexicon_paths(tmpdir, monkeypatch):
+    """tiny prebuilt binary lexicons, no nltk_data needed"""
+    paths = {
+        'vader_lexicon': str(tmpdir.join('vader_lexicon.marshal')),
+        'opinion_lexicon': str(tmpdir.join('opinion_lexicon.marshal')),
+    }
+    for name, payload in (('vader_lexicon', VADER_LEXICON), ('opinion_lexicon', OPINION_LEXICON)):
+        with open(paths[name], 'wb') as binary_fh:
+            marshal.dump(payload, binary_fh)
+    monkeypatch.setattr(scorers, '_VADER_ANALYZER', None)
+    monkeypatch.setattr(scorers, '_LIU_HU_SCORER', None)
+    return paths
+
+def test_parallel_matches_serial(lexicon_paths):
+    """worker processes produce the same article data as in-process scoring"""
+    serial = NewsScraper.score_article_list(
+        copy.deepcopy(ARTICLES), chunk_size=2, lexicon_paths=lexicon_paths, progress=False)
+    parallel = NewsScraper.score_article_list(
+        copy.deepcopy(ARTICLES), workers=2, chunk_size=2, lexicon_paths=lexicon_paths)
+
+    assert [article['data'] for article in parallel] == [article['data'] for article in serial]
+    assert serial[0]['data']['vader_title']['compound'] > 0
+    assert serial[1]['data']['li-hiu_blurb'] == 'Negative'
+    assert serial[3]['data']['vader_title'] == serial[0]['data']['vader_title']
@@ -0,0 +1,82 @@
+"""test_score_cache.py: validate ScoreCache hits, LRU eviction and row bound"""
+import pytest
+
+import score_cache
+from score_cache import ScoreCache
+
+class FakeClock(object):
+    """time.time stand-in, one tick per call to `tick`"""
+    def __init__(self):
+        self.now = 1000
+
+    def tick(self):
+        self.now += 1
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    """deterministic last_used stamps"""
+    fake = FakeClock()
+    monkeypatch.setattr(score_cache.time, 'time', fake.time)
+    return fake
+
+def test_hits(tmpdir):
+    """memory hits, disk hits from a new handle, keyed by scorer+version+text"""
+    cache_path = str(tmpdir.join('scores.sqlite'))
+    cache = ScoreCache(cache_path)
+    cache.put_many('vader', '1', {'Stocks  rally': {'compound': 0.5}, 'Stocks fall': {'compound': -0.5}})
+
+    assert cache.get_many('vader', '1', ['Stocks rally', 'unseen']) == {
+        'Stocks rally': {'compound': 0.5}}  #whitespace runs normalized
+    assert cache.get_many('vader', '2', ['Stocks fall']) == {}
+    assert cache.stats()['memory_hits'] == 1
+    cache.close()
+
+    cache = ScoreCache(cache_path)
+    assert cache.get_many('vader', '1', ['Stocks fall']) == {
+        'Stocks fall': {'compound': -0.5}}
+    assert cache.stats() == {'hits': 1, 'memory_hits': 0, 'misses': 0, 'hit_rate': 1.0}
+    cache.close()
+
+def test_memory_lru(tmpdir):
+    """least recently used entries fall out of memory, not off disk"""
+    cache = ScoreCache(str(tmpdir.join('scores.sqlite')), memory_entries=2)
+    cache.put_many('s', '1', {'a': 1, 'b': 2})
+    cache.get_many('s', '1', ['a'])     #b is now least recently used
+    cache.put_many('s', '1', {'c': 3})
+
+    assert cache.get_many('s', '1', ['a', 'b', 'c']) == {'a': 1, 'b': 2, 'c': 3}
+    assert cache.memory_hits == 1 + 2   #a, then a + c
+    cache.close()
+
+def test_disk_eviction(tmpdir, clock):
+    """over max_entries, oldest last_used rows go first, down to 90%: text1/text2"""
+    cache = ScoreCache(str(tmpdir.join('scores.sqlite')), max_entries=10, memory_entries=0)
+    for indx in range(10):
+        cache.put_many('s', '1', {'text{0}'.format(indx): indx})
+        clock.tick()
+    cache.get_many('s', '1', ['text0'])     #refresh text0
+    clock.tick()
+    cache.put_many('s', '1', {'text10': 10})
+
+    assert cache._count_rows() == 9
+    assert sorted(cache.get_many('s', '1', ['text{0}'.format(indx) for indx in range(11)])) == [
+        'text0', 'text10', 'text3', 'text4', 'text5', 'text6', 'text7', 'text8', 'text9']
+    cache.close()
+
+def test_row_bound(tmpdir, monkeypatch):
+    """COUNT(*) only runs once the running bound passes max_entries"""
+    cache = ScoreCache(str(tmpdir.join('scores.sqlite')), max_entries=5)
+    counts = []
+    count_rows = cache._count_rows
+    monkeypatch.setattr(cache, '_count_rows', lambda: counts.append(1) or count_rows())
+
+    for _ in range(3):  #rescoring the same texts: bound grows, rows do not
+        cache.put_many('s', '1', {'a': 1, 'b': 2})
+    assert len(counts) == 1
+    assert cache._row_bound == 2
+    cache.put_many('s', '1', {'c': 3})
+    assert len(counts) == 1
+    cache.close()
@@ -0,0 +1,52 @@
+"""test_scorers.py: validate LiuHuScorer against the original hacky_liu_hu rules"""
+from nltk.tokenize import treebank
+
+from scorers import LiuHuScorer, Polarity
+
+POSITIVE = ['gain', 'gains', 'strong', 'beat', 'upgrade', 'good']
+NEGATIVE = ['loss', 'losses', 'weak', 'miss', 'downgrade', 'lawsuit', 'bad']
+SAMPLE_TEXTS = [
+    'Apple posts strong gains after earnings beat',
+    'Analyst downgrade: weak guidance, widening losses',
+    'Strong quarter, but lawsuit weighs on shares',
+    'Shares flat in quiet trading',
+    "Good news and bad news: CEO's upgrade offsets the miss.",
+    'GAIN? Loss? "Strong" and (weak)',
+    '',
+]
+
+def hacky_liu_hu(text, positive_words, negative_words):
+    """original NewsScraper.hacky_liu_hu, opinion_lexicon passed in as lists"""
+    tokenizer = treebank.TreebankWordTokenizer()
+    pos_words = 0
+    neg_words = 0
+    tokenized_sent = [word.lower() for word in tokenizer.tokenize(text)]
+
+    for word in tokenized_sent:
+        if word in positive_words:
+            pos_words += 1
+        elif word in negative_words:
+            neg_words += 1
+
+    if pos_words > neg_words:
+        return Polarity.POSITIVE
+    elif pos_words < neg_words:
+        return Polarity.NEGATIVE
+    return Polarity.NEUTRAL
+
+def test_liu_hu_matches_original():
+    """same polarity as hacky_liu_hu on every sample"""
+    scorer = LiuHuScorer(POSITIVE, NEGATIVE)
+
+    for text in SAMPLE_TEXTS:
+        assert scorer.score(text) == hacky_liu_hu(text, POSITIVE, NEGATIVE), text
+    assert scorer.score(SAMPLE_TEXTS[0]) == Polarity.POSITIVE
+    assert scorer.score(SAMPLE_TEXTS[1]) == Polarity.NEGATIVE
+    assert scorer.score(SAMPLE_TEXTS[2]) == Polarity.NEUTRAL
+
+def test_liu_hu_score_many():
+    """batch results line up with texts, repeats included"""
+    scorer = LiuHuScorer(POSITIVE, NEGATIVE)
+    texts = SAMPLE_TEXTS + SAMPLE_TEXTS[:2]
+
+    assert scorer.score_many(texts) == [scorer.score(text) for text in texts]
@@ -0,0 +1,25 @@
+"""test_scripts.py: validate Scripts/ run from a checkout without extra import paths"""
+from os import path, environ
+import subprocess
+import sys
+
+import pytest
+
+HERE = path.abspath(path.dirname(__file__))
+ROOT = path.dirname(HERE)
+
+@pytest.mark.parametrize('script', ['tablefy.py', 'migrate_archive.py', 'train_lexicon.py'])
+def test_script_help(script, tmpdir):
+    """scripts import vincent_lexicon without PYTHONPATH or the conftest paths"""
+    env = dict(environ)
+    env.pop('PYTHONPATH', None)
+    result = subprocess.run(
+        [sys.executable, path.join(ROOT, 'Scripts', script), '--help'],
+        cwd=str(tmpdir),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+
+    assert result.returncode == 0, result.stderr.decode()
+    assert b'ModuleNotFoundError' not in result.stderr
@@ -0,0 +1,134 @@
+"""test_storage.py: validate vincent_lexicon.storage archive readers/writers"""
+import json
+
+from vincent_lexicon import storage
+import NewsScraper
+
+TINYDB_DOCS = {
+    '1': {'ticker': 'AAA', 'datetime': '2017-03-01', 'title': 'say "hi" {not: json},'},
+    '2': {'ticker': 'BBB', 'datetime': '2017-03-02', 'title': 'back\\slash é \n newline'},
+    '10': {'ticker': 'CCC', 'datetime': '2017-03-02', 'news': [{'a': [1, {}]}]},
+}
+
+def test_iter_tinydb_records(tmpdir):
+    """documents stream back intact, across many tiny refills"""
+    tinydb_path = str(tmpdir.join('news_database.json'))
+    with open(tinydb_path, 'w') as tinydb_fh:
+        json.dump({'other': {'1': {'skip': 'me}'}}, '_default': TINYDB_DOCS}, tinydb_fh, indent=1)
+
+    records = list(storage.iter_tinydb_records(tinydb_path, chunk_size=7))
+    assert records == list(TINYDB_DOCS.items())
+
+def test_iter_tinydb_records_empty(tmpdir):
+    """empty file/db/table yields nothing"""
+    for index, raw in enumerate(['', '{}', '{"_default": {}}', '{"other": {"1": {}}}']):
+        tinydb_path = str(tmpdir.join('empty{0}.json'.format(index)))
+        with open(tinydb_path, 'w') as tinydb_fh:
+            tinydb_fh.write(raw)
+        assert list(storage.iter_tinydb_records(tinydb_path)) == []
+
+def archive_entry(ticker, date):
+    """minimal archive entry"""
+    return {'ticker': ticker, 'datetime': date + ' 16:00:00', 'news': []}
+
+def test_shard_append(tmpdir):
+    """records land in per-date shards, appends keep earlier lines"""
+    store = storage.ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+    store.insert_multiple([archive_entry('AAA', '2017-03-01'), archive_entry('BBB', '2017-03-02')])
+    store.insert(archive_entry('CCC', '2017-03-01'))
+
+    assert store.shards() == ['2017-03-01', '2017-03-02']
+    assert [record['ticker'] for record in store.iter_records()] == ['AAA', 'CCC', 'BBB']
+    assert [key for key, _ in store.iter_keyed()] == [
+        ['2017-03-01', 0], ['2017-03-01', 1], ['2017-03-02', 0]]
+    assert [record['ticker'] for record in store.iter_records('2017-03-02')] == ['BBB']
+    assert len(store) == 3
+
+def test_torn_write_fenced(tmpdir):
+    """a crashed partial line is skipped, the next append starts on a new line"""
+    store = storage.ShardedStore(str(tmpdir.join('news_archive')), index_file=None)
+    store.insert(archive_entry('AAA', '2017-03-01'))
+    with open(store.shard_path('2017-03-01'), 'a') as shard_fh:
+        shard_fh.write('{"ticker": "BAD", "datet')
+    store.insert(archive_entry('CCC', '2017-03-01'))
+
+    assert [record['ticker'] for record in store.iter_records()] == ['AAA', 'CCC']
+
+def test_index_lookup(tmpdir):
+    """get() reads one ticker's records through the index"""
+    store = storage.ShardedStore(str(tmpdir.join('news_archive')))
+    store.insert_multiple([
+        archive_entry('AAA', '2017-03-01'),
+        archive_entry('BBB', '2017-03-01'),
+        archive_entry('AAA', '2017-03-02'),
+        archive_entry('AAA', '2017-03-03'),
+    ])
+
+    assert [record['datetime'][:10] for record in store.get('AAA')] == [
+        '2017-03-01', '2017-03-02', '2017-03-03']
+    assert [record['datetime'][:10] for record in store.get('AAA', ('2017-03-02', None))] == [
+        '2017-03-02', '2017-03-03']
+    assert [record['datetime'][:10] for record in store.get('AAA', (None, '2017-03-01'))] == [
+        '2017-03-01']
+    assert store.get('ZZZ') == []
+    store.close()
+
+def test_index_catch_up_and_rebuild(tmpdir):
+    """records appended without the index are caught up, rebuild matches"""
+    store_dir = str(tmpdir.join('news_archive'))
+    store = storage.ShardedStore(store_dir)
+    store.insert(archive_entry('AAA', '2017-03-01'))
+    store.close()
+
+    unindexed = storage.ShardedStore(store_dir, index_file=None)
+    unindexed.insert(archive_entry('AAA', '2017-03-02'))
+    with open(unindexed.shard_path('2017-03-02'), 'a') as shard_fh:
+        shard_fh.write('{"ticker": "AAA", "datet')     #torn write: never indexed
+
+    store = storage.ShardedStore(store_dir)
+    expected = [record['datetime'] for record in store.get('AAA')]
+    assert expected == ['2017-03-01 16:00:00', '2017-03-02 16:00:00']
+
+    index = store.rebuild_index()
+    assert len(index.lookup('AAA')) == 2
+    assert [record['datetime'] for record in store.get('AAA')] == expected
+    store.close()
+
+def news_article(usg, title, primary=True):
+    """processed article, see stories.normalize_story"""
+    return {'source': 'S', 'url': 'http://' + usg, 'title': title, 'blurb': 'b',
+            'usg': usg, 'datetime': '2017-03-01 09:00:00', 'primary': primary}
+
+def test_article_id():
+    """usg when present, else a hash of the url"""
+    assert storage.article_id(news_article('u1', 'T')) == 'u1'
+    no_usg = dict(news_article('', 'T'), url='http://x')
+    assert storage.article_id(no_usg).startswith('url:')
+    assert storage.article_id(no_usg) == storage.article_id(dict(no_usg, title='other'))
+
+def test_shared_articles_stored_once(tmpdir):
+    """stories shared across tickers/days are scored and stored once"""
+    article_store = storage.ArticleStore(str(tmpdir.join('articles.sqlite')))
+    scored = []
+    def score_func(articles):
+        scored.extend(article['usg'] for article in articles)
+        for article in articles:
+            article['data'] = {'score': len(article['title'])}
+    day_one = [
+        {'ticker': 'AAA', 'news': [news_article('u1', 'Shared'), news_article('u2', 'Only A', False)]},
+        {'ticker': 'BBB', 'news': [news_article('u1', 'Shared', False)]},
+    ]
+    day_two = [{'ticker': 'AAA', 'news': [news_article('u1', 'Shared'), news_article('u3', 'New')]}]
+
+    NewsScraper.reference_articles(day_one, article_store, score_func)
+    NewsScraper.reference_articles(day_two, article_store, score_func)
+
+    assert scored == ['u1', 'u2', 'u3']
+    assert len(article_store) == 3
+    assert day_one[1]['news'] == [{'article_id': 'u1', 'primary': False}]
+
+    expanded = list(storage.expand_records(day_one + day_two, article_store, batch_size=2))
+    assert expanded[0]['news'][0] == dict(news_article('u1', 'Shared'), data={'score': 6})
+    assert expanded[1]['news'][0]['primary'] is False
+    assert [article['usg'] for article in expanded[2]['news']] == ['u1', 'u3']
+    article_store.close()
@@ -0,0 +1,39 @@
+"""test_stories.py: validate batch story normalization"""
+import time
+
+from stories import process_stories
+
+def story(url, title, blurb='Blurb', timestamp='1488384000'):
+    """raw feed story, google `a` entry"""
+    return {
+        's': 'Source', 'u': url, 't': title, 'sp': blurb, 'usg': 'usg-' + url,
+        'tt': timestamp, 'sru': 'ignored', 'd': '2 hours ago'
+    }
+
+def test_process_stories():
+    """primary flags per cluster, html unescaped, sentinel cluster skipped"""
+    clusters = [
+        {'id': '10', 'a': [story('http://a', 'AT&amp;T &quot;beats&quot;'), story('http://b', 'Same story')]},
+        {'id': '11', 'a': [story('http://c', 'Other', blurb='&lt;b&gt;', timestamp='1488470400')]},
+        {'id': '-1'},
+    ]
+
+    news = process_stories(clusters)
+
+    assert [article['url'] for article in news] == ['http://a', 'http://b', 'http://c']
+    assert [article['primary'] for article in news] == [True, False, True]
+    assert news[0] == {
+        'source': 'Source',
+        'url': 'http://a',
+        'title': 'AT&T "beats"',
+        'blurb': 'Blurb',
+        'usg': 'usg-http://a',
+        'datetime': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(1488384000)),
+        'primary': True,
+    }
+    assert news[2]['blurb'] == '<b>'
+
+def test_process_stories_empty():
+    """feed with only the sentinel cluster has no articles"""
+    assert process_stories([{'id': '-1'}]) == []
+    assert process_stories([]) == []
@@ -0,0 +1,148 @@
+"""test_tablefy.py: validate Scripts/tablefy.py table building"""
+import pandas as pd
+
+from vincent_lexicon.storage import ShardedStore
+import tablefy
+
+def vader(compound):
+    """fake VADER score, `neg/neu/pos` only need to be distinguishable"""
+    return {'neg': 0.1, 'neu': 0.2, 'pos': 0.3, 'compound': compound}
+
+def archive_entry(ticker, change_pct, articles, date='2017-03-01'):
+    """archive entry from (title compound, blurb compound) pairs"""
+    return {
+        'ticker': ticker,
+        'datetime': date,
+        'price': {'change_pct': change_pct, 'close': 10.0, 'source': 'Yahoo'},
+        'news': [
+            {
+                'source': 'source{0}'.format(indx),
+                'datetime': '2017-03-01 12:00:00',
+                'data': {'vader_title': vader(title), 'vader_blurb': vader(blurb)}
+            }
+            for indx, (title, blurb) in enumerate(articles)
+        ]
+    }
+
+ENTRIES = [
+    archive_entry('UP', 2.0, [(0.9, 0.1), (0.5, 0.7), (-0.2, 0.3)]),     #article 0 is best title
+    archive_entry('DOWN', -3.0, [(-0.1, -0.8), (-0.6, 0.2)]),           #blurb best != title best
+    archive_entry('FLAT', 0.05, [(0.9, 0.9)]),                          #NEUTRAL: no best article
+]
+EXPECTED = {
+    'vader_title_compound': [0.9, 0.5, -0.2, -0.1, -0.6, 0.9],
+    'vader_blurb_compound': [0.1, 0.7, 0.3, -0.8, 0.2, 0.9],
+    'best_article_title': [True, None, None, None, True, None],
+    'best_article_blurb': [None, True, None, True, None, None],
+}
+
+def test_build_news_rows():
+    """loop version flags the best title/blurb rows independently"""
+    rows = []
+    for entry in ENTRIES:
+        rows.extend(tablefy.build_news_rows(entry))
+
+    for column, expected in EXPECTED.items():
+        assert [row[column] for row in rows] == expected, column
+
+def test_build_news_frame_matches_rows():
+    """vectorized version matches the loop version column for column"""
+    rows = []
+    for entry in ENTRIES:
+        rows.extend(tablefy.build_news_rows(entry))
+    loop_frame = pd.DataFrame(rows, columns=tablefy.NEWS_COLUMNS)
+    vector_frame = tablefy.build_news_frame(ENTRIES)
+
+    for column, expected in EXPECTED.items():
+        assert vector_frame[column].tolist() == expected, column
+    for column in tablefy.NEWS_COLUMNS:
+        assert loop_frame[column].tolist() == vector_frame[column].tolist(), column
+
+class TableFiles(object):
+    """archive + outputs for watermark runs in a tmpdir"""
+    def __init__(self, tmpdir):
+        self.table_file = str(tmpdir.join('news_archive'))
+        self.price_csv_file = str(tmpdir.join('price.csv'))
+        self.news_csv_file = str(tmpdir.join('news.csv'))
+        self.state_file = str(tmpdir.join('tablefy_state.json'))
+        self.store = ShardedStore(self.table_file, index_file=None)
+
+    def update(self):
+        """run `update_tables` over the archive"""
+        return tablefy.update_tables(
+            self.table_file, self.price_csv_file, self.news_csv_file, self.state_file)
+
+    def tables(self):
+        """(price, news) CSVs as frames"""
+        return pd.read_csv(self.price_csv_file), pd.read_csv(self.news_csv_file)
+
+def test_watermark_rebuild_then_append(tmpdir):
+    """first run rebuilds, later runs only append new records"""
+    files = TableFiles(tmpdir)
+    files.store.insert_multiple([
+        archive_entry('UP', 2.0, [(0.9, 0.1), (0.5, 0.7)], date='2017-03-01'),
+        archive_entry('DOWN', -3.0, [(-0.1, -0.8)], date='2017-03-01'),
+    ])
+    state = files.update()
+    assert state['watermark'] == ['2017-03-01', 1]
+    assert (state['price_rows'], state['news_rows']) == (2, 3)
+
+    files.store.insert_multiple([
+        archive_entry('FLAT', 0.05, [(0.9, 0.9)], date='2017-03-01'),
+        archive_entry('UP', 1.0, [(0.2, 0.3), (0.4, 0.1)], date='2017-03-02'),
+    ])
+    state = files.update()
+    assert state['watermark'] == ['2017-03-02', 0]
+    assert (state['price_rows'], state['news_rows']) == (4, 6)
+    assert tablefy.count_csv_rows(files.price_csv_file) == 4
+    assert tablefy.count_csv_rows(files.news_csv_file) == 6
+    appended_price, appended_news = files.tables()
+
+    state = files.update()     #nothing new: nothing appended
+    assert (state['price_rows'], state['news_rows']) == (4, 6)
+
+    rebuilt = tablefy.build_tables(
+        files.table_file, files.price_csv_file, files.news_csv_file, files.state_file)
+    assert rebuilt['watermark'] == state['watermark']
+    rebuilt_price, rebuilt_news = files.tables()
+    assert appended_price.equals(rebuilt_price)
+    assert appended_news.equals(rebuilt_news)
+
+def test_watermark_line_count_mismatch(tmpdir):
+    """a CSV that no longer matches the watermark forces a rebuild"""
+    files = TableFiles(tmpdir)
+    files.store.insert_multiple([
+        archive_entry('UP', 2.0, [(0.9, 0.1), (0.5, 0.7)]),
+        archive_entry('DOWN', -3.0, [(-0.1, -0.8)]),
+    ])
+    state = files.update()
+    assert tablefy.check_state(
+        state, files.table_file, files.price_csv_file, files.news_csv_file) is None
+
+    with open(files.news_csv_file, 'r') as news_fh:
+        lines = news_fh.readlines()
+    with open(files.news_csv_file, 'w') as news_fh:
+        news_fh.writelines(lines[:-1])     #truncated by hand/crash
+    assert tablefy.count_csv_rows(files.news_csv_file) == 2
+    assert tablefy.check_state(
+        state, files.table_file, files.price_csv_file, files.news_csv_file
+    ) == 'news table does not match watermark'
+
+    state = files.update()
+    assert (state['price_rows'], state['news_rows']) == (2, 3)
+    assert tablefy.count_csv_rows(files.news_csv_file) == 3
+
+def test_count_csv_rows(tmpdir):
+    """data rows only, None when missing"""
+    csv_file = str(tmpdir.join('table.csv'))
+    assert tablefy.count_csv_rows(csv_file) is None
+    with open(csv_file, 'w') as csv_fh:
+        csv_fh.write('a,b\n1,2\n3,4\n')
+    assert tablefy.count_csv_rows(csv_file) == 2
+
+def test_count_csv_rows_multiline(tmpdir):
+    """quoted newlines inside a field are one row"""
+    csv_file = str(tmpdir.join('table.csv'))
+    with open(csv_file, 'w', newline='') as csv_fh:
+        csv_fh.write('title,blurb\r\n"Title","line one\nline two"\r\nOther,x\r\n')
+    assert tablefy.count_csv_rows(csv_file) == 2
@@ -0,0 +1,44 @@
+"""test_ticker_health.py: validate cross-run ticker backoff"""
+from ticker_health import TickerHealth
+
+def test_backoff_doubles(tmpdir):
+    """skip 1, 2, 4 ... max_backoff days after `empty_streak` empties"""
+    health = TickerHealth(str(tmpdir.join('ticker_health.json')), empty_streak=2, max_backoff=4)
+    health.record('AAA', 'empty', '2017-03-01')
+    assert health.should_probe('AAA', '2017-03-02')
+
+    health.record('AAA', 'empty', '2017-03-02')
+    assert health.get('AAA')['skip_until'] == '2017-03-03'
+    assert not health.should_probe('AAA', '2017-03-02')
+    assert health.should_probe('AAA', '2017-03-03')
+
+    backoffs = []
+    for date in ('2017-03-03', '2017-03-05', '2017-03-09', '2017-03-13'):
+        health.record('AAA', 'empty', date)
+        backoffs.append(health.get('AAA')['backoff'])
+    assert backoffs == [2, 4, 4, 4]
+    assert health.get('AAA')['skip_until'] == '2017-03-17'
+
+def test_success_resets(tmpdir):
+    """a success clears the streak and backoff, failures never prune"""
+    health = TickerHealth(str(tmpdir.join('ticker_health.json')), empty_streak=1)
+    health.record_many([('AAA', 'empty'), ('BBB', 'failed'), ('BBB', 'failed')], '2017-03-01')
+    assert health.filter(['AAA', 'BBB', 'CCC'], '2017-03-01') == ['BBB', 'CCC']
+    assert health.skipped == ['AAA']
+
+    health.record('AAA', 'success', '2017-03-02')
+    record = health.get('AAA')
+    assert (record['streak'], record['backoff'], record['skip_until']) == (0, 0, None)
+    health.record('AAA', 'empty', '2017-03-03')
+    assert health.get('AAA')['backoff'] == 1    #starts over at 1 day
+
+def test_save_and_reload(tmpdir):
+    """history survives between runs"""
+    health_file = str(tmpdir.join('ticker_health.json'))
+    health = TickerHealth(health_file, empty_streak=1)
+    health.record('AAA', 'empty', '2017-03-01')
+    health.save()
+
+    reloaded = TickerHealth(health_file, empty_streak=1)
+    assert reloaded.get('AAA') == health.get('AAA')
+    assert not reloaded.should_probe('AAA', '2017-03-01')
@@ -0,0 +1,58 @@
+"""test_train_lexicon.py: validate Scripts/train_lexicon.py against the phrase scorer"""
+import numpy as np
+import pytest
+
+from vincent_lexicon.phrase_lexicon import PhraseScorer, write_phrase_lexicon
+import train_lexicon
+
+def archive_entry(ticker, change_pct, articles):
+    """archive entry from (title, blurb) pairs"""
+    return {
+        'ticker': ticker,
+        'datetime': '2017-03-01',
+        'price': {'change_pct': change_pct},
+        'news': [{'title': title, 'blurb': blurb} for title, blurb in articles]
+    }
+
+ENTRIES = [
+    archive_entry('AAA', 2.5, [
+        ('Company hits targets, hits targets again', 'Analysts see record growth'),
+        ('Record growth for Company', ''),
+    ]),
+    archive_entry('BBB', -4.0, [
+        ('Company missing projections', 'Anti-trust probe: company missing projections'),
+    ]),
+    archive_entry('CCC', 0.5, [
+        ('Quiet day', 'Nothing to report, record quiet day'),
+    ]),
+]
+
+def test_document_terms_overlap():
+    """every occurrence counts, scaled per text"""
+    terms = train_lexicon.document_terms(ENTRIES[0], max_ngram=2)
+    title_scale = 1 / np.sqrt(6)    #company hits targets hits targets again
+    assert terms['hits targets'] == pytest.approx(2 * title_scale)
+    assert terms['targets'] == pytest.approx(2 * title_scale)
+    assert terms['record growth'] == pytest.approx(1 / np.sqrt(4) + 1 / np.sqrt(4))
+    assert 'again analysts' not in terms     #no n-grams across title -> blurb
+
+def test_trained_lexicon_scores_like_model(tmpdir):
+    """a document scores the same under the trained model and the written lexicon"""
+    model = train_lexicon.LexiconModel(max_ngram=3)
+    matrix = model.vectorize(ENTRIES)
+    model.partial_fit(matrix, np.array([entry['price']['change_pct'] for entry in ENTRIES]))
+
+    lexicon_path = str(tmpdir.join('phrase_lexicon.tsv'))
+    phrases = model.lexicon(min_df=1, top=len(model), min_weight=0.0)
+    assert len(phrases) == len(model)
+    write_phrase_lexicon(lexicon_path, phrases)
+    scorer = PhraseScorer.from_file(lexicon_path)
+
+    predicted = model.predict(matrix) - model.bias
+    for entry, expected in zip(ENTRIES, predicted):
+        scored = sum(
+            result['score']
+            for article in entry['news']
+            for result in scorer.score_many([article['title'], article['blurb']])
+        )
+        assert scored == pytest.approx(expected, rel=1e-4, abs=1e-6)
@@ -2,25 +2,28 @@
 
 from datetime import datetime
 from os import path, makedirs, remove
+from shutil import rmtree
 import csv
-from enum import Enum
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import logging
+import threading
+import time
+from urllib.parse import urlparse
 
-import requests
-import demjson
-import pandas_datareader.data as web
-from tinydb import TinyDB, Query
 import ujson as json
 from plumbum import cli
-from six.moves.html_parser import HTMLParser
-
-from nltk import download as nltk_download
-import nltk.sentiment as sentiment
-from nltk.corpus import opinion_lexicon
-from nltk.tokenize import treebank
 
 from _version import __version__
-import prosper.common.prosper_logging as p_logging
-import prosper.common.prosper_config as p_config
+from checkpoint import Checkpoint
+from library_logging import route_library_logs
+from ticker_health import TickerHealth
+from stories import process_stories
+
+#heavy imports (prosper logging/config, tinydb, sqlite stores, pandas_datareader,
+#nltk, requests) are deferred to the functions that use them so `--help`/helper
+#imports start fast
 
 NLTK_LIBRARIES = [
     'vader_lexicon',
@@ -32,21 +35,117 @@ HERE = path.abspath(path.dirname(__file__))
 CONFIG_ABSPATH = path.join(HERE, 'vincent_config.cfg')
 ME = 'NewsScraper'
 
-CONFIG = p_config.ProsperConfig(CONFIG_ABSPATH)
-LOGGER = p_logging.DEFAULT_LOGGER
-LOG_PATH = CONFIG.get('LOGGING', 'log_path')
+LOGGER = logging.getLogger('NULL')    #prosper_logging.DEFAULT_LOGGER, without importing prosper
+LOGGER.addHandler(logging.NullHandler())
+
+_CONFIG = None
+def set_config_path(config_path):
+    """point the lazy config at another .cfg file (before first use)
+
+    Args:
+        config_path (str): path to alternate vincent_config.cfg
+
+    """
+    global CONFIG_ABSPATH, _CONFIG
+    CONFIG_ABSPATH = path.abspath(config_path)
+    _CONFIG = None
+
+def get_config():
+    """parse vincent_config.cfg on first use
+
+    Returns:
+        (:obj:`prosper_config.ProsperConfig`)
+
+    """
+    global _CONFIG
+    if _CONFIG is None:
+        import prosper.common.prosper_config as p_config
+        _CONFIG = p_config.ProsperConfig(CONFIG_ABSPATH)
+    return _CONFIG
+
+def config_value(key, cast=str, section=ME):
+    """fetch (and convert) a single config value
+
+    Args:
+        key (str): config key
+        cast (:obj:`callable`, optional): conversion for raw value
+        section (str, optional): config section
+
+    Returns:
+        (any): cast(value)
+
+    """
+    return cast(get_config().get(section, key))
+
+def get_cache_path():
+    """path to cache/tables folder, created on first use
+
+    Returns:
+        (str): abspath to cache folder
+
+    """
+    cache_path = path.join(HERE, config_value('cache_path'))
+    makedirs(cache_path, exist_ok=True)
+    return cache_path
+
+_METRICS = None
+def get_metrics():
+    """shared run metrics registry, built on first use
+
+    Returns:
+        (:obj:`metrics.Metrics`)
+
+    """
+    global _METRICS
+    if _METRICS is None:
+        from metrics import Metrics
+        _METRICS = Metrics(prefix='vincent_newsscraper')
+    return _METRICS
+
+_HTTP = None
+def get_http_client():
+    """shared pooled HTTP client, built on first use
+
+    Returns:
+        (:obj:`http_client.HTTPClient`)
+
+    """
+    global _HTTP
+    if _HTTP is None:
+        from http_client import HTTPClient
+        _HTTP = HTTPClient(
+            pool_connections=config_value('http_pool_connections', int),
+            pool_maxsize=config_value('http_pool_maxsize', int),
+            max_retries=config_value('http_max_retries', int),
+            backoff_factor=config_value('http_backoff_factor', float),
+            max_per_host=config_value('max_host_requests', int),
+            metrics=get_metrics()
+        )
+    return _HTTP
 
-CACHE_PATH = path.join(HERE, CONFIG.get(ME, 'cache_path'))
-makedirs(CACHE_PATH, exist_ok=True)
+_CALENDAR = None
+def get_calendar():
+    """shared market calendar, built on first use (loads on first lookup)
+
+    Returns:
+        (:obj:`market_calendar.MarketCalendar`)
+
+    """
+    global _CALENDAR
+    if _CALENDAR is None:
+        from market_calendar import MarketCalendar
+        _CALENDAR = MarketCalendar(
+            path.join(get_cache_path(), config_value('calendar_cachefile')),
+            config_value('calendar_uri'),
+            config_value('tradier_key'),
+            get_http_client(),
+            prefetch_months=config_value('calendar_prefetch_months', int)
+        )
+    return _CALENDAR
 
-CALENDAR_CACHEFILE = path.join(CACHE_PATH, CONFIG.get(ME, 'calendar_cachefile'))
-CALENDAR_CACHE = TinyDB(CALENDAR_CACHEFILE)
-TRADIER_KEY = CONFIG.get(ME, 'tradier_key')
 def market_open(
         cache_buster=False,
-        calendar_cache=CALENDAR_CACHE,
-        endpoint='https://api.tradier.com/v1/markets/calendar',
-        auth_key=TRADIER_KEY
+        calendar=None
 ):
     """make sure the market is actually open today
 
@@ -54,92 +153,39 @@ def market_open(
         uses https://developer.tradier.com/documentation/markets/get-calendar
     Args:
         cache_buster (bool, optional): ignore cache, DEFAULT: False
-        calendar_cache (:obj:`TinyDB`): cached version of market calendar
-        endpoint (str, optional): address for fetching open days calendar (tradier)
-        auth_key (str, optional): authentication for calendar endpoint
+        calendar (:obj:`MarketCalendar`, optional): market calendar, DEFAULT: shared
 
     Returns:
         (bool): is market open
 
     """
     LOGGER.info('Checking if market is open')
-    today = datetime.today().strftime('%Y-%m-%d')
-    day_query = Query()
-    if not cache_buster:
-        LOGGER.info('--checking cache')
-        value = calendar_cache.search(day_query.date == today)
-        LOGGER.debug(value)
-        if value:
-            LOGGER.info('--FOUND IN CACHE')
-            if value[0]['status'] == 'closed':
-                LOGGER.info('Markets closed today')
-                calendar_cache.close()
-                return False
-            elif value[0]['status'] == 'open':
-                LOGGER.info('Markets open today')
-                calendar_cache.close()
-                return True
-            else:
-                LOGGER.error(
-                    'EXCEPTION: unexpected market status' +
-                    '\n\tvalue={0}'.format(value)
-                )
-                calendar_cache.close()
-                raise Exception #TODO make custom exception
-
-    LOGGER.info('--checking internet for calendar')
+    calendar = calendar or get_calendar()
+    if cache_buster:
+        LOGGER.info('--checking internet for calendar')
+        calendar.prefetch(refresh=True)
+    else:
+        calendar.prefetch()    #keep months ahead warm, no-op when cached
 
-    ## Fetch calendar from internet ##
-    headers = {
-        'Accept': 'application/json',
-        'Authorization': 'Bearer ' + auth_key
-    }
-    try:
-        req = requests.get(
-            endpoint,
-            headers=headers
-        )
-        calendar = req.json()
-    except Exception as err_msg:
-        LOGGER.error(
-            'EXCEPTION: unable to fetch calendar' +
-            '\n\turl={0}'.format(endpoint),
-            exc_info=True
-        )
-        calendar_cache.close()
-        raise err_msg #TODO: no calendar behavior?
-
-    ## update cache ##
-    LOGGER.info('--updating cache')
-    calendar_cache.insert_multiple(calendar['calendar']['days']['day'])
-
-    value = calendar_cache.search(day_query.date == today)
-    LOGGER.debug(value)
-    if value[0]['status'] == 'closed':
-        LOGGER.info('Markets closed today')
-        calendar_cache.close()
-        return False
-    elif value[0]['status'] == 'open':
+    if calendar.is_trading_day():
         LOGGER.info('Markets open today')
-        calendar_cache.close()
         return True
-    else:
-        LOGGER.error(
-            'EXCEPTION: unexpected market status' +
-            '\n\tvalue={0}'.format(value)
-        )
-        calendar_cache.close()
-        raise Exception #TODO make custom exception
+
+    LOGGER.info('Markets closed today')
+    return False
 
 def parse_stock_list(
         stock_list_path,
-        column_keyname='Symbol'
+        column_keyname='Symbol',
+        health_index=None
 ):
     """parse stock list into list of tickers
 
     Args:
         stock_list_path (str): Path to stock_list csv file
         column_keyname (str, optional): csv column keyname
+        health_index (:obj:`ticker_health.TickerHealth`, optional): skip
+            tickers backing off after repeated empty feeds
 
     Returns:
         (:obj:`list` str): list of stock tickers
@@ -169,79 +215,145 @@ def parse_stock_list(
                 meta_list.append(row[column_keyname])
 
     LOGGER.info('Loaded tickers from file: x' + str(len(ticker_list)))
+    if health_index is not None:
+        ticker_list = health_index.filter(ticker_list)
+        kept = set(ticker_list)
+        meta_list = [ticker for ticker in meta_list if ticker in kept]
+        LOGGER.info('--skipping chronically empty tickers: x{0}'.format(
+            len(health_index.skipped)))
+        LOGGER.debug(health_index.skipped)
     LOGGER.debug(ticker_list)
     LOGGER.debug(meta_list)
 
     return ticker_list, meta_list
 
-def fetch_news_info(
+def _quote_float(value):
+    """convert quote field into float, None if not a number"""
+    try:
+        return float(str(value).strip('%').replace(',', ''))
+    except ValueError:
+        return None
+
+def _chunk(items, size):
+    """split list into lists of `size`"""
+    for indx in range(0, len(items), size):
+        yield items[indx:indx + size]
+
+def quote_reader(reader_class, uri=None):
+    """pandas_datareader quote reader, optionally pointed at another endpoint
+
+    Args:
+        reader_class (:obj:`type`): pandas_datareader quotes reader
+        uri (str, optional): replacement endpoint (blank = reader default)
+
+    Returns:
+        (:obj:`type`): reader class to instantiate
+
+    """
+    if not uri:
+        return reader_class
+
+    class _QuoteReader(reader_class):
+        @property
+        def url(self):
+            return uri
+    return _QuoteReader
+
+def fetch_price_table(
         ticker_list,
-        meta_list=[]
+        batch_size=None
 ):
-    """Process ticker_list and save news endpoints
+    """fetch EOD price info for many tickers in as few requests as possible
 
-    NOTE: Step1, needs to run as first step
+    Note:
+        Yahoo is queried in batches, only unresolved tickers retry on Google
     Args:
-        ticker_list (:obj:`list` str): list of tickers to fetch news feeds on
-        meta_list (:obj:`list`, optional): special list of index tickers
+        ticker_list (:obj:`list` str): (non-META) tickers to quote
+        batch_size (int, optional): tickers per quote request,
+            DEFAULT: `quote_batch_size` from config
+
     Returns:
-        (:obj:`dict`): tinyDB-ready list of news info
+        (:obj:`dict`): ticker: `price` block for tinyDB entry
 
     """
-    LOGGER.info('--Fetching news items for tickers')
-    processed_data = []
-    failed_tickers = []
-    empty_tickers = []
-    last_exception = None
-    for ticker in cli.terminal.Progress(ticker_list):
+    from pandas_datareader.yahoo.quotes import YahooQuotesReader
+    from pandas_datareader.google.quotes import GoogleQuotesReader
+    yahoo_uri = config_value('yahoo_quote_uri')
+    google_uri = config_value('google_quote_uri')
+    yahoo_reader = quote_reader(YahooQuotesReader, yahoo_uri)
+    google_reader = quote_reader(GoogleQuotesReader, google_uri)
+    #throttle on the host actually queried, blank uri = pandas_datareader default
+    yahoo_host = urlparse(yahoo_uri).netloc or 'finance.yahoo.com'
+    google_host = urlparse(google_uri).netloc or 'www.google.com'
+    batch_size = batch_size or config_value('quote_batch_size', int)
+    http = get_http_client()
+    LOGGER.info('--Fetching price data: x{0} tickers'.format(len(ticker_list)))
+    price_table = {}
+    ticker_list = list(OrderedDict.fromkeys(ticker_list))   #dedupe, keep order
+
+    for batch in _chunk(ticker_list, batch_size):
         try:
-            if ticker in meta_list:
-                news_data = fetch_news(
-                    ticker,
-                    news_source=CONFIG.get(ME, 'meta_articles_uri'))
-            else:
-                news_data = fetch_news(ticker)
-        except demjson.JSONDecodeError:
-            empty_tickers.append(ticker) #blank news feed is HTML page
-            continue
-        except Exception as err_msg:
-            #LOGGER.warning('WARNING: unable to parse news for ' + ticker)
-            failed_tickers.append(ticker)
-            last_exception = err_msg
+            with http.throttle.limit(yahoo_host):
+                price_df = yahoo_reader(batch, session=http.session).read()
+        except Exception:
+            LOGGER.warning(
+                'WARNING: unable to fetch yahoo quotes' +
+                '\n\tbatch={0}..{1}'.format(batch[0], batch[-1]),
+                exc_info=True
+            )
             continue
 
-        if not news_data:
-            empty_tickers.append(ticker)
-        else:
-            try:
-                data_entry = build_data_entry(ticker, news_data, ticker in meta_list)
-            except Exception as err_msg:
-                LOGGER.warning(
-                    'WARNING: unable to organize data for ' + ticker,
-                    exc_info=True
-                )
-                failed_tickers.append(ticker)
-                last_exception = err_msg
+        for ticker, row in price_df.iterrows():
+            close = _quote_float(row['last'])
+            if close is None:   #'N/A': retry fetch on google
                 continue
-            processed_data.append(data_entry)
-
-    LOGGER.info('empty_tickers={0}'.format(empty_tickers))
-    if failed_tickers:
-        LOGGER.error(
-            'EXCEPTION FOUND: some tickers did not return news:' +
-            '\n\tSEE LOG FOR SPECIFIC ERRORS' +
-            '\n\tlast_exception={0}'.format(repr(last_exception)) +
-            '\n\ttickers={0}'.format(failed_tickers)
-        )
-    return processed_data
+            price_table[ticker] = {
+                'change_pct': _quote_float(row['change_pct']),
+                'close': close,
+                'PE': _quote_float(row['PE']),
+                'short_ratio': _quote_float(row['short_ratio']),
+                'source': 'Yahoo'
+            }
+
+    missing = [ticker for ticker in ticker_list if ticker not in price_table]
+    if missing:
+        LOGGER.info('----Parsing google data feed: x{0} tickers'.format(len(missing)))
+    for batch in _chunk(missing, batch_size):
+        try:
+            with http.throttle.limit(google_host):
+                price_df = google_reader(batch, session=http.session).read()
+        except Exception:
+            LOGGER.warning(
+                'WARNING: unable to fetch google quotes' +
+                '\n\tbatch={0}..{1}'.format(batch[0], batch[-1]),
+                exc_info=True
+            )
+            continue
 
-def build_data_entry(ticker, news_data, meta_bool=False):
+        for ticker, row in price_df.iterrows():
+            close = _quote_float(row['last'])
+            if close is None:   #no quote from either source
+                continue
+            price_table[ticker] = {
+                'change_pct': _quote_float(row['change_pct']),
+                'close': close,
+                'PE': None,
+                'short_ratio': None,
+                'source': 'Google'
+            }   #google feed does not have PE/short_ratio
+
+    LOGGER.info('--Price data resolved: x{0}'.format(len(price_table)))
+    return price_table
+
+def build_data_entry(ticker, news_data, meta_bool=False, price_table=None):
     """build the fundamental entry for tinyDB
 
     Args:
         ticker (str): company ticker
         news_data (:obj:`list`): collection of news data
         meta_bool (bool, optional): if ticker is a META key
+        price_table (:obj:`dict`, optional): results of `fetch_price_table`,
+            will fetch `ticker` on its own if not provided
 
     Returns:
         (:obj:`dict`) tinyDB ready object
@@ -266,46 +378,29 @@ def build_data_entry(ticker, news_data, meta_bool=False):
 
         return db_entry
 
-    price_df = web.get_quote_yahoo(ticker)
-    if price_df['last'].get_value(0) == 'N/A':   #retry fetch on google
-        LOGGER.info('----Parsing google data feed')
-        price_df = web.get_quote_google(ticker)
-        db_entry['price']['change_pct'] = float(price_df['change_pct'].get_value(0))
-        db_entry['price']['close'] = float(price_df['last'].get_value(0))
-        db_entry['price']['PE'] = None
-        db_entry['price']['short_ratio'] = None
-        db_entry['price']['source'] = 'Google'
-        #google feed does not have PE/short_ratio
-    else:
-        LOGGER.info('----Parsing yahoo data feed')
-        db_entry['price']['change_pct'] = float(price_df['change_pct'].get_value(0).strip('%'))
-        db_entry['price']['close'] = float(price_df['last'].get_value(0))
-        try:
-            db_entry['price']['PE'] = float(price_df['PE'].get_value(0))
-        except ValueError:
-            db_entry['price']['PE'] = None
-        try:
-            db_entry['price']['short_ratio'] = float(price_df['short_ratio'].get_value(0))
-        except ValueError:
-            db_entry['price']['short_ratio'] = None
-        db_entry['price']['source'] = 'Yahoo'
+    if price_table is None:
+        price_table = fetch_price_table([ticker])
+
+    try:
+        db_entry['price'] = dict(price_table[ticker])
+    except KeyError:
+        raise KeyError('no price data found for ' + ticker)
 
     return db_entry
 
 
-NEWS_SOURCE = CONFIG.get(ME, 'articles_uri')
-def fetch_news(
+def request_news(
         ticker,
-        news_source=NEWS_SOURCE
+        news_source
 ):
-    """Fetch individual ticker's news feed
+    """GET raw news feed text for a ticker
 
     Args:
         ticker (str): stock ticker
-        news_source (str, optional): news API endpoint
+        news_source (str): news API endpoint
 
     Returns:
-        (:obj:`list`) (adjusted) news JSON result
+        (str): raw response body
 
     """
     LOGGER.info('----Fetching news for ' + ticker)
@@ -314,7 +409,7 @@ def fetch_news(
         'output': 'json'
     }
     try:
-        req = requests.get(
+        req = get_http_client().get(
             news_source,
             params=params
         )
@@ -327,12 +422,30 @@ def fetch_news(
             exc_info=True
         )
         raise err_msg
+    return req.text
+
+def parse_news(
+        ticker,
+        raw_text,
+        news_source
+):
+    """decode raw news feed into processed articles
+
+    Args:
+        ticker (str): stock ticker
+        raw_text (str): response body from `request_news`
+        news_source (str): news API endpoint (for logging)
+
+    Returns:
+        (:obj:`list`) (adjusted) news JSON result
 
+    """
+    from news_decoder import decode_news, EmptyNewsFeed
     try:
-        raw_articles = demjson.decode(req.text)
+        raw_articles = decode_news(raw_text)
     except Exception as err_msg:
-        LOGGER.debug(req.text)
-        if str(err_msg) == 'Can not decode value starting with character \'<\'':
+        LOGGER.debug(raw_text)
+        if isinstance(err_msg, EmptyNewsFeed):
             LOGGER.warning(
                 'WARNING: Empty news endpoint' +
                 '\n\texception={0}'.format(repr(err_msg)) +
@@ -348,168 +461,736 @@ def fetch_news(
                 exc_info=True
             )
         raise err_msg
-    news_list = []
-    for block in raw_articles['clusters']:
-        if int(block['id']) == -1:
-            continue #last entry is weird
-        for indx, story in enumerate(block['a']):
-            story_info = process_story_info(story)
-            if indx==0: #TODO: validate "primary" story is always first
-                story_info['primary'] = True
-            else:
-                story_info['primary'] = False
+    return process_stories(raw_articles['clusters'])
+
+def score_article_list(
+        articles,
+        workers=1,
+        chunk_size=None,
+        score_cache=None,
+        lexicon_paths=None,
+        executor=None,
+        progress=True
+):
+    """apply first-pass NLTK values to a flat list of articles
 
-            news_list.append(story_info)
+    Args:
+        articles (:obj:`list` :obj:`dict`): processed articles, updated in place
+        workers (int, optional): scoring processes (1 = in-process)
+        chunk_size (int, optional): texts sent to a worker at a time,
+            DEFAULT: `score_chunk_size` from config
+        score_cache (:obj:`score_cache.ScoreCache`, optional): memoized scores
+        lexicon_paths (:obj:`dict`, optional): prebuilt binary lexicons, see
+            `configure_nltk_resources`, plus `phrase_lexicon` for phrase scores
+        executor (:obj:`concurrent.futures.Executor`, optional): long-lived
+            scoring pool to reuse across calls (overrides `workers`)
+        progress (bool, optional): draw a progress bar over chunks
 
-    return news_list
+    Returns:
+        (:obj:`list`) articles with "data" segment filled in
 
-class Polarity(Enum):
-    POSITIVE = 'Positive'
-    NEGATIVE = 'Negative'
-    NEUTRAL = 'Neutral'
+    """
+    from scorers import score_texts, FIRST_PASS_SCORER, FIRST_PASS_VERSION
+    chunk_size = chunk_size or config_value('score_chunk_size', int)
+    score_start = time.perf_counter()
+    texts = OrderedDict()   #unique texts, first-seen order
+    for article in articles:
+        texts[article['title']] = None
+        texts[article['blurb']] = None
+
+    scores = {}
+    if score_cache is not None:
+        scores = score_cache.get_many(FIRST_PASS_SCORER, FIRST_PASS_VERSION, list(texts))
+    pending = [text for text in texts if text not in scores]
+
+    chunks = list(_chunk(pending, chunk_size))
+    LOGGER.info(
+        '--scoring x{0} articles: x{1} unique texts, x{2} cached, x{3} chunks'.format(
+            len(articles), len(texts), len(texts) - len(pending), len(chunks))
+    )
+    fresh_scores = []
+    if executor is not None:
+        for chunk_scores in executor.map(score_texts, chunks, repeat(lexicon_paths)):
+            fresh_scores.extend(chunk_scores)
+    elif workers > 1 and len(chunks) > 1:
+        LOGGER.info('--using {0} scoring workers'.format(workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_scores in cli.terminal.Progress(
+                    executor.map(score_texts, chunks, repeat(lexicon_paths)),
+                    length=len(chunks)
+            ):
+                fresh_scores.extend(chunk_scores)
+    else:
+        for chunk in (cli.terminal.Progress(chunks) if progress else chunks):
+            fresh_scores.extend(score_texts(chunk, lexicon_paths))
+
+    fresh_scores = dict(zip(pending, fresh_scores))
+    if score_cache is not None and fresh_scores:
+        score_cache.put_many(FIRST_PASS_SCORER, FIRST_PASS_VERSION, fresh_scores)
+    scores.update(fresh_scores)
+
+    phrase_scores = None
+    phrase_path = (lexicon_paths or {}).get('phrase_lexicon')
+    if phrase_path:
+        phrase_scores = score_phrase_texts(
+            list(texts), phrase_path, chunk_size, score_cache, executor)
+
+    for article in articles:
+        vader_title, liu_hu_title = scores[article['title']]
+        vader_blurb, liu_hu_blurb = scores[article['blurb']]
+        data = {}
+        data['vader_title']  = dict(vader_title)
+        data['vader_blurb']  = dict(vader_blurb)
+        data['li-hiu_title'] = liu_hu_title
+        data['li-hiu_blurb'] = liu_hu_blurb
+        if phrase_scores is not None:
+            data['phrase_title'] = dict(phrase_scores[article['title']])
+            data['phrase_blurb'] = dict(phrase_scores[article['blurb']])
+
+        LOGGER.debug('\t{0}: {1}'.format(
+            '%+.3f' % data['vader_title']['compound'], article['title'])
+        )
+        #TODO: convert demos from nltk.sentiment.utils to return data
+        article['data'] = data
 
-def hacky_liu_hu(text):
-    """NLTK has demo_liu_hu_lexicon, but it doesn't return useful data
+    if score_cache is not None:
+        LOGGER.info(
+            'score cache: {hits} hits ({memory_hits} in memory), {misses} misses, '
+            'hit_rate={hit_rate:.1%}'.format(**score_cache.stats())
+        )
+    metrics = get_metrics()
+    metrics.inc('articles_scored_total', len(articles))
+    metrics.inc('texts_scored_total', len(pending))
+    metrics.inc('score_seconds_total', time.perf_counter() - score_start)
+    return articles
+
+def score_phrase_texts(
+        texts,
+        lexicon_path,
+        chunk_size=None,
+        score_cache=None,
+        executor=None
+):
+    """apply the phrase lexicon to unique texts
 
     Note:
-        http://www.nltk.org/_modules/nltk/sentiment/util.html#demo_liu_hu_lexicon
-        NOT PERFORMANT :(
+        cached under the `phrase` scorer, versioned by the lexicon's content
+        hash, so retraining the lexicon rescores everything once
     Args:
-        (str) text to analyze
+        texts (:obj:`list` str): unique texts
+        lexicon_path (str): path to `phrase<TAB>weight` lexicon
+        chunk_size (int, optional): texts sent to a worker at a time,
+            DEFAULT: `score_chunk_size` from config
+        score_cache (:obj:`score_cache.ScoreCache`, optional): memoized scores
+        executor (:obj:`concurrent.futures.Executor`, optional): scoring pool
 
     Returns:
-        (:enum:`Polarity`) polarity score
+        (:obj:`dict`): text: phrase score
 
     """
-    tokenizer = treebank.TreebankWordTokenizer()
-    pos_words = 0
-    neg_words = 0
-    tokenized_sent = [word.lower() for word in tokenizer.tokenize(text)]
-
-    for word in tokenized_sent:
-        if word in opinion_lexicon.positive():
-            pos_words += 1
-        elif word in opinion_lexicon.negative():
-            neg_words += 1
-        #else: neutral not counted
-
-    if pos_words > neg_words:
-        return Polarity.POSITIVE
-    elif pos_words < neg_words:
-        return Polarity.NEGATIVE
-    elif pos_words == neg_words:
-        return Polarity.NEUTRAL
+    from scorers import phrase_scorer, score_phrases
+    from phrase_lexicon import PHRASE_SCORER
+    chunk_size = chunk_size or config_value('score_chunk_size', int)
+    version = phrase_scorer(lexicon_path).version
+
+    scores = {}
+    if score_cache is not None:
+        scores = score_cache.get_many(PHRASE_SCORER, version, texts)
+    pending = [text for text in texts if text not in scores]
+    LOGGER.info('--phrase scoring: x{0} unique texts, x{1} cached'.format(
+        len(texts), len(texts) - len(pending)))
+
+    fresh_scores = []
+    chunks = list(_chunk(pending, chunk_size))
+    if executor is not None and len(chunks) > 1:
+        for chunk_scores in executor.map(score_phrases, chunks, repeat(lexicon_path)):
+            fresh_scores.extend(chunk_scores)
     else:
-        LOGGER.error(
-            'EXCEPTION: Li Hiu escape' +
-            '\n\tpos_words={0}'.format(pos_words) +
-            '\n\tneg_words={0}'.format(neg_words)
-        )
-
-def score_articles(
-        news_feeds
+        fresh_scores = score_phrases(pending, lexicon_path)
+
+    fresh_scores = dict(zip(pending, fresh_scores))
+    if score_cache is not None and fresh_scores:
+        score_cache.put_many(PHRASE_SCORER, version, fresh_scores)
+    scores.update(fresh_scores)
+    return scores
+
+def reference_articles(
+        news_feeds,
+        article_store,
+        score_func=None
 ):
-    """walk through news feeds and apply first-pass NLTK values
+    """move articles into the article store, leaving refs in each entry
 
+    Note:
+        only articles the store has never seen are handed to `score_func`,
+        stories shared across tickers/days are scored and stored once
     Args:
         news_feeds (:obj:`list`): TinyDB-ready list of news items
+        article_store (:obj:`storage.ArticleStore`): content-addressed store
+        score_func (:obj:`callable`, optional): func(list of new articles),
+            fills in "data" before the articles are stored
 
     Returns:
-        (:obj:`list`) news_feeds with "data" segment filled in
+        (:obj:`list`) news_feeds with `news` as `{article_id, primary}` refs
 
     """
-
-    text_analyzer = sentiment.vader.SentimentIntensityAnalyzer()
-
-    for ticker_element in cli.terminal.Progress(news_feeds):
-        LOGGER.info('Processing: ' + ticker_element['ticker'])
-        for article in ticker_element['news']:
-            title = article['title']
-            blurb = article['blurb']
-            data = {}
-            data['vader_title']  = text_analyzer.polarity_scores(title)
-            data['vader_blurb']  = text_analyzer.polarity_scores(blurb)
-            #data['li-hiu_title'] = hacky_liu_hu(title).value
-            #data['li-hiu_blurb'] = hacky_liu_hu(blurb).value
-
-            LOGGER.debug('\t{0}: {1}'.format(
-                '%+.3f' % data['vader_title']['compound'], title)
-            )
-            #TODO: convert demos from nltk.sentiment.utils to return data
-            article['data'] = data
+    from storage import article_id
+    ids = [
+        article_id(article)
+        for entry in news_feeds for article in entry['news']
+    ]
+    known = article_store.get_many(ids)
+    new_articles = OrderedDict()
+    refs = iter(ids)
+    for entry in news_feeds:
+        news = []
+        for article in entry['news']:
+            key = next(refs)
+            if key not in known:
+                new_articles.setdefault(key, article)
+            news.append({'article_id': key, 'primary': article['primary']})
+        entry['news'] = news
+
+    LOGGER.info('--articles: x{0} refs, x{1} unique, x{2} new'.format(
+        len(ids), len(set(ids)), len(new_articles)))
+    if score_func is not None and new_articles:
+        score_func(list(new_articles.values()))
+    if new_articles:
+        article_store.put_many(new_articles)
     return news_feeds
 
-def process_story_info(story_info):
-    """crunch news into regular format
+def configure_nltk_resources(
+        libraries=NLTK_LIBRARIES,
+        data_dir=None,
+        lexicon_dir=None
+):
+    """find NLTK data locally (download only if missing) and prebuild lexicons
+
+    Args:
+        libraries (:obj:`list` str, optional): nltk packages required
+        data_dir (str, optional): nltk_data folder, DEFAULT: `nltk_data_dir`
+            from config (blank = nltk search path)
+        lexicon_dir (str, optional): binary lexicon folder, DEFAULT: `lexicon_cache`
+
+    Returns:
+        (:obj:`dict`): lexicon name: binary path, None if resources unavailable
+
+    """
+    from nltk_resources import NLTKResources
+    if data_dir is None:
+        data_dir = config_value('nltk_data_dir')
+        data_dir = path.join(HERE, data_dir) if data_dir else None
+    lexicon_dir = lexicon_dir or path.join(get_cache_path(), config_value('lexicon_cache'))
+
+    resources = NLTKResources(data_dir, lexicon_dir)
+    if not resources.ensure(libraries):
+        return None
+    return resources.build_lexicons()
+
+def configure_phrase_lexicon(
+        lexicon_name=None,
+        lexicon_dir=None
+):
+    """find the custom phrase lexicon (if enabled)
 
     Args:
-        story_info (:obj:`dict`): news_feed['clusters'][block_index]['a'] contents
+        lexicon_name (str, optional): TSV lexicon filename, blank to disable,
+            DEFAULT: `phrase_lexicon` from config
+        lexicon_dir (str, optional): path to lexicon folder, DEFAULT: cache_path
 
     Returns:
-        (:obj:`dict`): processed article info
+        (str): path to lexicon, None if disabled or missing
 
     """
-    LOGGER.debug('----Processing story_info: ' + story_info['u'])
-    parser = HTMLParser()   #http://stackoverflow.com/a/2087433
-    info = {}
-    info['source']   = story_info['s']
-    info['url']      = story_info['u']
-    info['title']    = parser.unescape(story_info['t'])
-    info['blurb']    = parser.unescape(story_info['sp'])
-    info['usg']      = story_info['usg'] #not sure if UUID is useful?
-    info['datetime'] = datetime.\
-        fromtimestamp(int(story_info['tt'])).\
-        strftime('%Y-%m-%d %H:%M:%S')
-
-    return info
-    #Unused keys:
-    #story_info['sru']  google reference link
-    #story_info['d']    human-readable "when published" info
+    if lexicon_name is None:
+        lexicon_name = config_value('phrase_lexicon')
+    if not lexicon_name:
+        return None
+    lexicon_path = path.join(lexicon_dir or get_cache_path(), lexicon_name)
+    if not path.isfile(lexicon_path):
+        LOGGER.warning('phrase lexicon not found, skipping phrase scores: ' + lexicon_path)
+        return None
+    return lexicon_path
+
+def configure_score_cache(
+        cache_name=None,
+        cache_dir=None
+):
+    """open the persistent score cache (if enabled)
+
+    Args:
+        cache_name (str, optional): sqlite filename, blank to disable caching,
+            DEFAULT: `score_cache` from config
+        cache_dir (str, optional): path to cache folder, DEFAULT: cache_path
+
+    Returns:
+        (:obj:`score_cache.ScoreCache`) cache handle, None if disabled
+
+    """
+    if cache_name is None:
+        cache_name = config_value('score_cache')
+    if not cache_name:
+        LOGGER.info('--score cache disabled')
+        return None
+    from score_cache import ScoreCache
+    return ScoreCache(
+        path.join(cache_dir or get_cache_path(), cache_name),
+        max_entries=config_value('score_cache_entries', int),
+        memory_entries=config_value('score_cache_memory', int)
+    )
+
+def configure_article_store(
+        store_name=None,
+        store_dir=None,
+        debug=False
+):
+    """open the content-addressed article store (if enabled)
+
+    Args:
+        store_name (str, optional): sqlite filename, blank to keep articles
+            inline in each entry, DEFAULT: `article_store` from config
+        store_dir (str, optional): path to tables folder, DEFAULT: cache_path
+        debug (bool, optional): use a separate "debug" store
+
+    Returns:
+        (:obj:`storage.ArticleStore`) store handle, None if disabled
+
+    """
+    if store_name is None:
+        store_name = config_value('article_store')
+    if not store_name:
+        LOGGER.info('--article store disabled')
+        return None
+    if debug:
+        store_name = 'debug_' + store_name
+    from storage import ArticleStore
+    return ArticleStore(
+        path.join(store_dir or get_cache_path(), store_name),
+        memory_entries=config_value('article_store_memory', int)
+    )
 
 def configure_database_connection(
         table_name,
-        table_dir=CACHE_PATH,
-        debug=False
+        table_dir=None,
+        debug=False,
+        backend=None,
+        fresh=True
 ):
     """connects to database and returns usable handle
 
     Args:
-        table_name (str): path to tinyDB table (abspath > relpath)
+        table_name (str): path to tinyDB table/shard folder (abspath > relpath)
+        table_dir (str, optional): path to tables folder, DEFAULT: cache_path
         debug (bool, optional): create/return "debug" table rather than prod
+        backend (str, optional): `shards` (append-only JSON-lines) or `tinydb`,
+            DEFAULT: `storage_backend` from config
+        fresh (bool, optional): debug only, wipe today's debug table first
 
     Returns:
-        (:obj:`tinydb.TinyDB`) usable handle for database operations
+        (:obj:`tinydb.TinyDB` or :obj:`storage.ShardedStore`) usable handle
+            for database operations
 
     """
     LOGGER.info('getting table connection: ' + table_name)
+    table_dir = table_dir or get_cache_path()
+    backend = backend or config_value('storage_backend')
+    if backend == 'shards':
+        from storage import ShardedStore as store_class
+    elif backend == 'tinydb':
+        from tinydb import TinyDB as store_class
+    else:
+        raise ValueError('unsupported storage_backend: ' + backend)
+
     table_path = path.join(table_dir, table_name)
     if not debug:
-        table_handle = TinyDB(table_path)
+        table_handle = store_class(table_path)
     else:
         LOGGER.info('--DEBUG MODE')
         today = datetime.today().strftime('%Y-%m-%d')
         debug_path = path.join(table_dir, 'debug_' + table_name + '_' + today)
-        try: #remove previous debug version
+        if fresh:
             LOGGER.debug('--removing old debug file: ' + debug_path)
-            remove(debug_path)
-        except FileNotFoundError:
-            pass
-        table_handle = TinyDB(debug_path)
+            if path.isdir(debug_path): #remove previous debug version
+                rmtree(debug_path)
+            elif path.isfile(debug_path):
+                remove(debug_path)
+        table_handle = store_class(debug_path)
 
     return table_handle
 
+def configure_checkpoint(
+        date=None,
+        checkpoint_dir=None,
+        debug=False,
+        fresh=False
+):
+    """open the per-ticker progress log for a run date
+
+    Args:
+        date (str, optional): %Y-%m-%d run date, DEFAULT: today
+        checkpoint_dir (str, optional): path to checkpoint folder,
+            DEFAULT: `checkpoint_path` under cache_path
+        debug (bool, optional): use separate checkpoints for debug runs
+        fresh (bool, optional): discard existing progress for `date`
+
+    Returns:
+        (:obj:`checkpoint.Checkpoint`)
+
+    """
+    date = date or datetime.today().strftime('%Y-%m-%d')
+    checkpoint_dir = checkpoint_dir or path.join(get_cache_path(), config_value('checkpoint_path'))
+    if debug:
+        checkpoint_dir = path.join(checkpoint_dir, 'debug')
+    checkpoint = Checkpoint(checkpoint_dir, date)
+    if fresh and path.isfile(checkpoint.checkpoint_file):
+        LOGGER.debug('--removing old checkpoint: ' + checkpoint.checkpoint_file)
+        remove(checkpoint.checkpoint_file)
+    return checkpoint
+
+def select_tickers(
+        ticker_list,
+        checkpoint,
+        resume=False,
+        retry_failed=False
+):
+    """trim ticker_list down to the work a resume/retry run still needs
+
+    Args:
+        ticker_list (:obj:`list` str): full stock list, in run order
+        checkpoint (:obj:`checkpoint.Checkpoint`): today's progress log
+        resume (bool, optional): skip tickers already done today
+        retry_failed (bool, optional): only run tickers that failed in the
+            previous run (most recent checkpoint before `checkpoint.date`)
+
+    Returns:
+        (:obj:`list` str): tickers to run, in ticker_list order
+
+    """
+    if retry_failed:
+        previous = Checkpoint.latest(checkpoint.checkpoint_dir, before=checkpoint.date)
+        failed = set(previous.failed()) if previous is not None else set()
+        LOGGER.info('--retrying failed tickers from {0}: x{1}'.format(
+            previous.date if previous is not None else None, len(failed)))
+        ticker_list = [ticker for ticker in ticker_list if ticker in failed]
+
+    if resume:
+        done = checkpoint.done()
+        LOGGER.info('--resuming {0}: x{1} tickers already done'.format(
+            checkpoint.date, len(done)))
+        ticker_list = [ticker for ticker in ticker_list if ticker not in done]
+
+    return ticker_list
+
+def configure_ticker_health(
+        health_name=None,
+        health_dir=None
+):
+    """open the cross-run ticker health index (if enabled)
+
+    Args:
+        health_name (str, optional): JSON filename, blank to fetch every ticker,
+            DEFAULT: `ticker_health` from config
+        health_dir (str, optional): path to cache folder, DEFAULT: cache_path
+
+    Returns:
+        (:obj:`ticker_health.TickerHealth`) index handle, None if disabled
+
+    """
+    if health_name is None:
+        health_name = config_value('ticker_health')
+    if not health_name:
+        LOGGER.info('--ticker health index disabled')
+        return None
+    return TickerHealth(
+        path.join(health_dir or get_cache_path(), health_name),
+        empty_streak=config_value('health_empty_streak', int),
+        max_backoff=config_value('health_max_backoff', int)
+    )
+
+class TickerOutcomes(object):
+    """thread-safe record of EMPTY/FAILED tickers for a pipeline run
+
+    Args:
+        ticker_list (:obj:`list` str): tickers in run order (for reporting)
+        checkpoint (:obj:`checkpoint.Checkpoint`, optional): progress log to
+            record outcomes in
+        health_index (:obj:`ticker_health.TickerHealth`, optional): cross-run
+            ticker history to record outcomes in
+
+    """
+    def __init__(self, ticker_list, checkpoint=None, health_index=None):
+        self._order = {ticker: indx for indx, ticker in enumerate(ticker_list)}
+        self._lock = threading.Lock()
+        self.checkpoint = checkpoint
+        self.health_index = health_index
+        self.empty = []
+        self.failed = []
+        self.last_exception = None
+
+    def mark_empty(self, ticker):
+        """ticker returned no news"""
+        with self._lock:
+            self.empty.append(ticker)
+        if self.checkpoint is not None:
+            self.checkpoint.record(ticker, 'empty')
+        if self.health_index is not None:
+            self.health_index.record(ticker, 'empty')
+
+    def mark_failed(self, ticker, err_msg):
+        """ticker raised along the way"""
+        with self._lock:
+            self.failed.append(ticker)
+            self.last_exception = err_msg
+        if self.checkpoint is not None:
+            self.checkpoint.record(ticker, 'failed')
+        if self.health_index is not None:
+            self.health_index.record(ticker, 'failed')
+
+    def mark_written(self, tickers):
+        """tickers' entries are safely in the database"""
+        outcomes = [(ticker, 'success') for ticker in tickers]
+        if self.checkpoint is not None:
+            self.checkpoint.record_many(outcomes)
+        if self.health_index is not None:
+            self.health_index.record_many(outcomes)
+
+    def report(self):
+        """log empty/failed tickers in stock list order"""
+        empty = sorted(self.empty, key=self._order.get)
+        failed = sorted(self.failed, key=self._order.get)
+        LOGGER.info('empty_tickers={0}'.format(empty))
+        if failed:
+            LOGGER.error(
+                'EXCEPTION FOUND: some tickers did not return news:' +
+                '\n\tSEE LOG FOR SPECIFIC ERRORS' +
+                '\n\tlast_exception={0}'.format(repr(self.last_exception)) +
+                '\n\ttickers={0}'.format(failed)
+            )
+
+def run_pipeline(
+        ticker_list,
+        news_database,
+        meta_list=[],
+        fetch_workers=1,
+        score_workers=1,
+        lexicon_paths=None,
+        score_cache=None,
+        article_store=None,
+        outcomes=None,
+        profiler=None
+):
+    """stream tickers through fetch -> parse -> price -> score -> write
+
+    Note:
+        stages are joined by bounded queues, so articles are scored and
+        written while later tickers are still being fetched.  Each write
+        batch is sorted into ticker_list order, batches land in completion order
+    Args:
+        ticker_list (:obj:`list` str): list of tickers to fetch news feeds on
+        news_database (:obj:`ShardedStore` or :obj:`TinyDB`): write handle
+        meta_list (:obj:`list`, optional): special list of index tickers
+        fetch_workers (int, optional): concurrent news fetch threads
+        score_workers (int, optional): sentiment scoring processes (1 = in-process)
+        lexicon_paths (:obj:`dict`, optional): prebuilt lexicons, None skips scoring
+        score_cache (:obj:`score_cache.ScoreCache`, optional): memoized scores
+        article_store (:obj:`storage.ArticleStore`, optional): write entries
+            as article refs, scoring only articles not yet stored
+        outcomes (:obj:`TickerOutcomes`, optional): EMPTY/FAILED bookkeeping
+        profiler (:obj:`profiling.StageProfiler`, optional): cProfile each stage
+
+    Returns:
+        (:obj:`list` :obj:`dict`): per-stage throughput, see `pipeline.StageStats`
+
+    """
+    from metrics import LONG_BUCKETS
+    from news_decoder import NewsDecodeError
+    from pipeline import Pipeline, Stage
+    meta_set = set(meta_list)
+    outcomes = outcomes or TickerOutcomes(ticker_list)
+    metrics = get_metrics()
+    ticker_start = {}   #ticker: perf_counter at fetch, for per-ticker wall time
+    ticker_order = {ticker: indx for indx, ticker in enumerate(ticker_list)}
+    articles_uri = config_value('articles_uri')
+    meta_articles_uri = config_value('meta_articles_uri')
+    record_dir = config_value('record_payloads')
+    if record_dir:  #raw feeds for `Scripts/benchmark.py decode -p`
+        record_dir = path.join(get_cache_path(), record_dir)
+        makedirs(record_dir, exist_ok=True)
+
+    def fetch_stage(tickers):
+        for ticker in tickers:
+            ticker_start[ticker] = time.perf_counter()
+            news_source = meta_articles_uri if ticker in meta_set else articles_uri
+            try:
+                raw_text = request_news(ticker, news_source)
+            except Exception as err_msg:
+                outcomes.mark_failed(ticker, err_msg)
+                continue
+            if record_dir:
+                with open(path.join(record_dir, ticker + '.txt'), 'w') as record_fh:
+                    record_fh.write(raw_text)
+            yield ticker, news_source, raw_text
+
+    def parse_stage(raw_feeds):
+        for ticker, news_source, raw_text in raw_feeds:
+            try:
+                news_data = parse_news(ticker, raw_text, news_source)
+            except NewsDecodeError:
+                outcomes.mark_empty(ticker)  #blank news feed is HTML page
+                continue
+            except Exception as err_msg:
+                outcomes.mark_failed(ticker, err_msg)
+                continue
+            if not news_data:
+                outcomes.mark_empty(ticker)
+                continue
+            yield ticker, news_data
+
+    def price_stage(news_batch):
+        try:
+            price_table = fetch_price_table(
+                [ticker for ticker, _ in news_batch if ticker not in meta_set],
+                batch_size=len(news_batch)
+            )
+        except Exception as err_msg:
+            LOGGER.warning(
+                'WARNING: unable to fetch price batch' +
+                '\n\tbatch={0}..{1}'.format(news_batch[0][0], news_batch[-1][0]),
+                exc_info=True
+            )
+            for ticker, _ in news_batch:
+                outcomes.mark_failed(ticker, err_msg)
+            return
+        for ticker, news_data in news_batch:
+            try:
+                yield build_data_entry(
+                    ticker,
+                    news_data,
+                    ticker in meta_set,
+                    price_table=price_table
+                )
+            except Exception as err_msg:
+                LOGGER.warning(
+                    'WARNING: unable to organize data for ' + ticker,
+                    exc_info=True
+                )
+                outcomes.mark_failed(ticker, err_msg)
+
+    score_pool = None
+    if lexicon_paths is not None and score_workers > 1:
+        LOGGER.info('--using {0} scoring workers'.format(score_workers))
+        score_pool = ProcessPoolExecutor(max_workers=score_workers)
+
+    def score_list(articles):
+        return score_article_list(
+            articles,
+            score_cache=score_cache,
+            lexicon_paths=lexicon_paths,
+            executor=score_pool,
+            progress=False
+        )
+
+    def score_stage(news_feeds):
+        if lexicon_paths is None:
+            return news_feeds   #unscored articles stay inline, out of the store
+        if article_store is not None:
+            return reference_articles(news_feeds, article_store, score_list)
+        score_list([article for entry in news_feeds for article in entry['news']])
+        return news_feeds
+
+    def write_stage(news_feeds):
+        news_feeds.sort(key=lambda entry: ticker_order.get(entry['ticker'], len(ticker_order)))
+        written = news_database.insert_multiple(news_feeds)
+        if isinstance(written, int):    #ShardedStore reports bytes, TinyDB doc ids
+            metrics.inc('bytes_written_total', written)
+        metrics.inc('entries_written_total', len(news_feeds))
+        outcomes.mark_written([entry['ticker'] for entry in news_feeds])
+        now = time.perf_counter()
+        for entry in news_feeds:
+            metrics.observe(
+                'ticker_seconds',
+                now - ticker_start.pop(entry['ticker'], now),
+                buckets=LONG_BUCKETS
+            )
+        return news_feeds
+
+    stages = [
+        Stage('fetch', fetch_stage, workers=max(fetch_workers, 1)),
+        Stage('parse', parse_stage),
+        Stage('price', price_stage, batch_size=config_value('quote_batch_size', int)),
+        Stage('score', score_stage, batch_size=config_value('score_batch_size', int)),
+        Stage('write', write_stage, batch_size=config_value('write_batch_size', int)),
+    ]
+    if profiler is not None:
+        for stage in stages:
+            stage.func = profiler.wrap(stage.name, stage.func)
+    pipeline = Pipeline(stages, queue_depth=config_value('pipeline_queue_depth', int))
+    try:
+        stage_stats = pipeline.run(
+            cli.terminal.Progress(ticker_list, length=len(ticker_list))
+        )   #progress tracks tickers handed to the fetch queue
+    finally:
+        if score_pool is not None:
+            score_pool.shutdown()
+
+    for stats in stage_stats:
+        LOGGER.info(
+            'stage {stage}: x{items_in} in, x{items_out} out, '
+            'busy={busy_seconds:.2f}s wall={wall_seconds:.2f}s '
+            '({items_per_second:.1f}/s)'.format(**stats)
+        )
+        for key in ('items_in', 'items_out', 'busy_seconds', 'wall_seconds', 'items_per_second'):
+            metrics.set('stage_' + key, stats[key], stage=stats['stage'])
+    score_seconds = metrics.counter('score_seconds_total')
+    if score_seconds:
+        metrics.set(
+            'articles_per_second',
+            metrics.counter('articles_scored_total') / score_seconds
+        )
+    return stage_stats
+
 class NewsScraper(cli.Application):
     """Plumbum CLI application to fetch EOD data and news articles"""
-    _log_builder = p_logging.ProsperLogger(
-        ME,
-        LOG_PATH,
-        config_obj=CONFIG
-    )
+    __log_builder = None
+    @property
+    def _log_builder(self):
+        """ProsperLogger, built on first use (keeps `--help` fast)"""
+        if self.__log_builder is None:
+            import prosper.common.prosper_logging as p_logging
+            self.__log_builder = p_logging.ProsperLogger(
+                ME,
+                config_value('log_path', section='LOGGING'),
+                config_obj=get_config()
+            )
+        return self.__log_builder
+
     debug = cli.Flag(
         ['d', '--debug'],
         help='Debug mode, no production db, headless mode'
     )
 
+    @cli.switch(
+        ['--config'],
+        str,
+        help='Path to alternate config file (e.g. benchmark endpoints)'
+    )
+    def override_config(self, config_path):
+        """swap config at runtime"""
+        if path.isfile(config_path):
+            set_config_path(config_path)
+        else:
+            raise FileNotFoundError
+
+    stats_file = None
+    @cli.switch(
+        ['--stats'],
+        str,
+        help='Write run/stage timings as JSON to this path'
+    )
+    def override_stats_file(self, stats_file):
+        """set up path to stats file"""
+        self.stats_file = path.abspath(stats_file)
+
     @cli.switch(
         ['-v', '--verbose'],
         help='Enable verbose messaging'
@@ -518,7 +1199,7 @@ class NewsScraper(cli.Application):
         """toggle verbose logger"""
         self._log_builder.configure_debug_logger()
 
-    stock_list = path.join(HERE, CONFIG.get(ME, 'stock_list'))
+    stock_list = None   #DEFAULT: `stock_list` from config
     @cli.switch(
         ['--stock_list'],
         str,
@@ -531,13 +1212,84 @@ class NewsScraper(cli.Application):
         else:
             raise FileNotFoundError
 
+    workers = None      #DEFAULT: `fetch_workers` from config
+    @cli.switch(
+        ['-w', '--workers'],
+        int,
+        help='Number of concurrent news fetch workers (1 = serial)'
+    )
+    def override_workers(self, workers):
+        """change fetch concurrency at runtime"""
+        if workers < 1:
+            raise ValueError('workers must be >= 1')
+        self.workers = workers
+
+    score_workers = None    #DEFAULT: `score_workers` from config
+    @cli.switch(
+        ['--score_workers'],
+        int,
+        help='Number of sentiment scoring processes (1 = in-process)'
+    )
+    def override_score_workers(self, score_workers):
+        """change scoring concurrency at runtime"""
+        if score_workers < 1:
+            raise ValueError('score_workers must be >= 1')
+        self.score_workers = score_workers
+
+    resume = cli.Flag(
+        ['--resume'],
+        help='Only run tickers not yet finished today (see checkpoint_path)'
+    )
+
+    retry_failed = cli.Flag(
+        ['--retry-failed'],
+        help='Only re-run tickers that failed in the previous run'
+    )
+
+    profile = cli.Flag(
+        ['--profile'],
+        help='cProfile each pipeline stage, summary written next to the logs'
+    )
+
+    profile_memory = cli.Flag(
+        ['--profile_memory'],
+        requires=['--profile'],
+        help='Add tracemalloc top allocation sites to the --profile summary'
+    )
+
     def main(self):
         """Program Main flow"""
         global LOGGER
         if not self.debug:
             self._log_builder.configure_discord_logger()
         LOGGER = self._log_builder.logger
+        route_library_logs(LOGGER)
         LOGGER.debug('Hello world')
+        profiler = None
+        if self.profile:
+            from profiling import StageProfiler
+            profiler = StageProfiler.for_run(
+                config_value('log_path', section='LOGGING'),
+                ME,
+                trace_memory=self.profile_memory
+            )
+        try:
+            self.scrape(profiler)
+        finally:
+            if profiler is not None:
+                profiler.dump()
+
+    def scrape(self, profiler=None):
+        """fetch -> score -> write for today's stock list
+
+        Args:
+            profiler (:obj:`profiling.StageProfiler`, optional): stage profiler
+
+        """
+        run_start = time.perf_counter()
+        self.stock_list = self.stock_list or path.join(HERE, config_value('stock_list'))
+        self.workers = self.workers or config_value('fetch_workers', int)
+        self.score_workers = self.score_workers or config_value('score_workers', int)
 
         if not market_open():
             LOGGER.info('Markets not open today')
@@ -546,25 +1298,112 @@ class NewsScraper(cli.Application):
 
         ## Figure out tickers to query
         print('--Fetching list of stocks--')
-        ticker_list, meta_list = parse_stock_list(self.stock_list)
+        health_index = configure_ticker_health()
+        ticker_list, meta_list = parse_stock_list(
+            self.stock_list,
+            health_index=health_index
+        )
         #LOGGER.debug(ticker_list)
+        checkpoint = configure_checkpoint(
+            debug=self.debug,
+            fresh=self.debug and not self.resume
+        )
+        run_list = select_tickers(
+            ticker_list,
+            checkpoint,
+            resume=self.resume,
+            retry_failed=self.retry_failed
+        )
+        if not run_list:
+            LOGGER.info('Nothing left to fetch')
+            return
 
-        ## Fetch news articles (and configure tinyDB schema)
-        print('--Fetching news articles--')
-        news_feeds = fetch_news_info(ticker_list, meta_list)
-        #LOGGER.debug(news_feeds[0])
-
-        print('--Running NLTK analysis--')
-        if not nltk_download(NLTK_LIBRARIES):
-            LOGGER.error('unable to load NLTK lexicons for text analysis')
+        ## Last Step target: database handle (written to as entries stream in)
+        if config_value('storage_backend') == 'shards':
+            table_name = config_value('news_archive')
         else:
-            news_feeds = score_articles(news_feeds)
-        ## Last Step: write to database
+            table_name = config_value('news_database')
         news_database = configure_database_connection(
-            CONFIG.get(ME, 'news_database'),
-            debug=self.debug
+            table_name,
+            debug=self.debug,
+            fresh=not self.resume
+        )
+
+        lexicon_paths = configure_nltk_resources()
+        if lexicon_paths is None:
+            LOGGER.error('unable to load NLTK lexicons for text analysis')
+        score_cache = configure_score_cache() if lexicon_paths is not None else None
+        phrase_lexicon = configure_phrase_lexicon()
+        if lexicon_paths is not None and phrase_lexicon:
+            lexicon_paths['phrase_lexicon'] = phrase_lexicon
+        article_store = configure_article_store(debug=self.debug)
+
+        ## Fetch news articles -> score -> write, streamed
+        print('--Fetching and scoring news articles--')
+        outcomes = TickerOutcomes(run_list, checkpoint, health_index)
+        pipeline_start = time.perf_counter()
+        try:
+            stage_stats = run_pipeline(
+                run_list,
+                news_database,
+                meta_list,
+                fetch_workers=self.workers,
+                score_workers=self.score_workers,
+                lexicon_paths=lexicon_paths,
+                score_cache=score_cache,
+                article_store=article_store,
+                outcomes=outcomes,
+                profiler=profiler
+            )
+        finally:
+            if score_cache is not None:
+                score_cache.close()
+            if article_store is not None:
+                article_store.close()
+            news_database.close()
+            if health_index is not None and not self.debug:
+                health_index.save()
+        outcomes.report()
+        if health_index is not None:
+            LOGGER.info('ticker health: skipped x{0} tickers (one news request each)'.format(
+                len(health_index.skipped)))
+
+        connection_stats = get_http_client().connection_stats()
+        LOGGER.info(
+            'HTTP connection stats: ' +
+            '{requests} requests, {connections} opened, {reused} reused'.format(
+                **connection_stats)
         )
-        news_database.insert_multiple(news_feeds)
+
+        run_end = time.perf_counter()
+        metrics = get_metrics()
+        metrics.set('run_seconds', run_end - run_start)
+        metrics.set('pipeline_seconds', run_end - pipeline_start)
+        metrics.set('tickers', len(run_list) - len(outcomes.empty) - len(outcomes.failed),
+                    status='success')
+        metrics.set('tickers', len(outcomes.empty), status='empty')
+        metrics.set('tickers', len(outcomes.failed), status='failed')
+        if health_index is not None:
+            metrics.set('tickers', len(health_index.skipped), status='skipped')
+        metrics_file = config_value('metrics_file')
+        if metrics_file:
+            metrics_file = path.join(get_cache_path(), metrics_file)
+            LOGGER.info('writing run metrics: ' + metrics_file)
+            metrics.write(metrics_file, config_value('metrics_format'))
+
+        if self.stats_file:
+            with open(self.stats_file, 'w') as stats_fh:
+                json.dump({
+                    'tickers': len(run_list),
+                    'empty_tickers': len(outcomes.empty),
+                    'failed_tickers': len(outcomes.failed),
+                    'setup_seconds': pipeline_start - run_start,
+                    'pipeline_seconds': run_end - pipeline_start,
+                    'total_seconds': run_end - run_start,
+                    'stages': stage_stats,
+                    'http': connection_stats,
+                    'metrics': metrics.to_dict()
+                }, stats_fh, indent=2)
 
 if __name__ == '__main__':
     NewsScraper.run()
@@ -0,0 +1,128 @@
+"""Per-ticker progress checkpoints so interrupted runs can resume"""
+
+from os import path, makedirs, listdir, fsync
+from collections import OrderedDict
+import logging
+import threading
+
+import ujson as json
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+CHECKPOINT_EXT = '.jsonl'
+DONE_STATUSES = ('success', 'empty')   #statuses that do not need a re-run
+
+class Checkpoint(object):
+    """append-only log of ticker outcomes for one run date
+
+    Note:
+        one JSON line per ticker outcome, last line for a ticker wins.
+        Tickers are marked `success` only after their entry is written, so a
+        crash between write and checkpoint re-runs (and re-writes) that ticker
+    Args:
+        checkpoint_dir (str): path to checkpoint folder
+        date (str): %Y-%m-%d run date
+
+    """
+    def __init__(self, checkpoint_dir, date):
+        self.checkpoint_dir = checkpoint_dir
+        self.date = date
+        self.checkpoint_file = path.join(checkpoint_dir, date + CHECKPOINT_EXT)
+        self._lock = threading.Lock()
+        makedirs(checkpoint_dir, exist_ok=True)
+
+    @classmethod
+    def latest(cls, checkpoint_dir, before=None):
+        """most recent checkpoint in a folder
+
+        Args:
+            checkpoint_dir (str): path to checkpoint folder
+            before (str, optional): only consider dates earlier than this
+
+        Returns:
+            (:obj:`Checkpoint`): newest checkpoint, None if there are none
+
+        """
+        if not path.isdir(checkpoint_dir):
+            return None
+        dates = sorted(
+            name[:-len(CHECKPOINT_EXT)]
+            for name in listdir(checkpoint_dir)
+            if name.endswith(CHECKPOINT_EXT)
+        )
+        if before is not None:
+            dates = [date for date in dates if date < before]
+        if not dates:
+            return None
+        return cls(checkpoint_dir, dates[-1])
+
+    def record_many(self, outcomes):
+        """append ticker outcomes
+
+        Args:
+            outcomes (:obj:`list` :obj:`tuple`): (ticker, status) pairs
+
+        """
+        if not outcomes:
+            return
+        payload = ''.join(
+            json.dumps({'ticker': ticker, 'status': status}) + '\n'
+            for ticker, status in outcomes
+        )
+        payload = payload.encode('utf-8')
+        with self._lock:
+            with open(self.checkpoint_file, 'ab+') as checkpoint_fh:
+                if checkpoint_fh.tell() > 0:    #fence off torn write from a crashed run
+                    checkpoint_fh.seek(-1, 2)
+                    if checkpoint_fh.read(1) != b'\n':
+                        payload = b'\n' + payload
+                checkpoint_fh.write(payload)
+                checkpoint_fh.flush()
+                fsync(checkpoint_fh.fileno())
+
+    def record(self, ticker, status):
+        """append one ticker outcome"""
+        self.record_many([(ticker, status)])
+
+    def load(self):
+        """read back latest status per ticker
+
+        Returns:
+            (:obj:`OrderedDict`): ticker: status, in first-seen order
+
+        """
+        statuses = OrderedDict()
+        if not path.isfile(self.checkpoint_file):
+            return statuses
+        with open(self.checkpoint_file, 'r') as checkpoint_fh:
+            for line in checkpoint_fh:
+                try:
+                    outcome = json.loads(line)
+                except ValueError:
+                    LOGGER.warning('skipping torn checkpoint line: ' + self.checkpoint_file)
+                    continue
+                statuses[outcome['ticker']] = outcome['status']
+        return statuses
+
+    def done(self):
+        """tickers that finished (written or confirmed empty)
+
+        Returns:
+            (set): tickers
+
+        """
+        return {
+            ticker for ticker, status in self.load().items()
+            if status in DONE_STATUSES
+        }
+
+    def failed(self):
+        """tickers whose latest outcome is a failure
+
+        Returns:
+            (:obj:`list` str): tickers, in first-seen order
+
+        """
+        return [
+            ticker for ticker, status in self.load().items()
+            if status not in DONE_STATUSES
+        ]
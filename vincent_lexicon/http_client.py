@@ -0,0 +1,211 @@
+"""Shared HTTP layer: pooled keep-alive sessions with retry/backoff"""
+
+import random
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+class JitteredRetry(Retry):
+    """urllib3 Retry with "full jitter" exponential backoff
+
+    Note:
+        https://www.awsarchitectureblog.com/2015/03/backoff.html
+        Retry-After headers (429/503) still take precedence.  `on_retry` sees
+        every retried attempt, which the session's response hook never does
+
+    """
+    on_retry = None     #callable(url, response, error, pool), set by HTTPClient
+
+    def new(self, **kwargs):
+        """carry `on_retry` over to the next Retry in the chain"""
+        retry = super(JitteredRetry, self).new(**kwargs)
+        retry.on_retry = self.on_retry
+        return retry
+
+    def increment(
+            self,
+            method=None,
+            url=None,
+            response=None,
+            error=None,
+            _pool=None,
+            _stacktrace=None
+    ):
+        """report the failed attempt, then let urllib3 decide retry/raise"""
+        if self.on_retry is not None:
+            self.on_retry(url, response, error, _pool)
+        return super(JitteredRetry, self).increment(
+            method, url, response, error, _pool, _stacktrace)
+
+    def get_backoff_time(self):
+        """pick a random sleep between 0 and the exponential backoff value"""
+        backoff = super(JitteredRetry, self).get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(0, backoff)
+
+class HostThrottle(object):
+    """bound the number of in-flight requests against any one host
+
+    Args:
+        max_per_host (int): concurrent requests allowed per host
+
+    """
+    def __init__(self, max_per_host):
+        self.max_per_host = max_per_host
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _get_slot(self, host):
+        """find/create semaphore for host"""
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[host]
+
+    @contextmanager
+    def limit(self, url):
+        """hold a request slot for the host in `url` until block exits
+
+        Args:
+            url (str): endpoint being requested (or bare host name)
+
+        """
+        host = urlparse(url).netloc or url
+        with self._get_slot(host):
+            yield
+
+class HTTPClient(object):
+    """one pooled `requests.Session` shared by every outbound call
+
+    Args:
+        pool_connections (int, optional): number of per-host pools to keep
+        pool_maxsize (int, optional): keep-alive connections per host pool
+        max_retries (int, optional): retries on connection errors/RETRY_STATUS
+        backoff_factor (float, optional): base for exponential backoff (seconds)
+        max_per_host (int, optional): concurrent requests allowed per host
+        metrics (:obj:`metrics.Metrics`, optional): record per-endpoint latency
+
+    """
+    def __init__(
+            self,
+            pool_connections=10,
+            pool_maxsize=10,
+            max_retries=3,
+            backoff_factor=0.5,
+            max_per_host=4,
+            metrics=None
+    ):
+        self.throttle = HostThrottle(max_per_host)
+        self.metrics = metrics
+        self._stats_lock = threading.Lock()
+        self._responses = 0
+        self._retries = 0
+        self._evicted_connections = 0
+        retry = JitteredRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS
+        )
+        retry.on_retry = self._record_retry
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry
+        )
+        pools = self.adapter.poolmanager.pools
+        close_pool = pools.dispose_func
+        def dispose_pool(pool):
+            with self._stats_lock:  #keep evicted pools in connection_stats
+                self._evicted_connections += pool.num_connections
+            if close_pool is not None:
+                close_pool(pool)
+        pools.dispose_func = dispose_pool
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        #hook sees every request, including pandas_datareader's
+        self.session.hooks['response'].append(self._record_response)
+
+    def _record_response(self, response, *args, **kwargs):
+        """response hook: latency histogram + status counts per endpoint"""
+        with self._stats_lock:
+            self._responses += 1
+        if self.metrics is None:
+            return
+        url = urlparse(response.url)
+        endpoint = url.netloc + url.path
+        self.metrics.observe(
+            'http_request_seconds',
+            response.elapsed.total_seconds(),
+            endpoint=endpoint
+        )
+        self.metrics.inc('http_responses_total', endpoint=endpoint, code=response.status_code)
+
+    def _record_retry(self, url, response, error, pool):
+        """retry hook: count failed attempts per endpoint and reason"""
+        with self._stats_lock:
+            self._retries += 1
+        if self.metrics is None:
+            return
+        endpoint = urlparse(url or '').path
+        if pool is not None:
+            port = '' if pool.port in (None, 80, 443) else ':{0}'.format(pool.port)
+            endpoint = pool.host + port + endpoint
+        reason = response.status if response is not None else type(error).__name__
+        self.metrics.inc('http_retries_total', endpoint=endpoint, reason=reason)
+
+    def get(self, url, **kwargs):
+        """throttled GET through the shared session
+
+        Args:
+            url (str): endpoint address
+            kwargs: passed through to `requests.Session.get`
+
+        Returns:
+            (:obj:`requests.Response`)
+
+        """
+        with self.throttle.limit(url):
+            return self.session.get(url, **kwargs)
+
+    def connection_stats(self):
+        """summarize connection reuse over the client's lifetime
+
+        Note:
+            attempts = responses seen by the hook + retried attempts,
+            connections include pools evicted since
+
+        Returns:
+            (:obj:`dict`): requests, retries, connections opened, connections reused
+
+        """
+        pools = self.adapter.poolmanager.pools
+        connections = 0
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:    #evicted while walking
+                continue
+            connections += pool.num_connections
+
+        with self._stats_lock:
+            requests_made = self._responses + self._retries
+            connections += self._evicted_connections
+            retries = self._retries
+        return {
+            'requests': requests_made,
+            'retries': retries,
+            'connections': connections,
+            'reused': max(requests_made - connections, 0)
+        }
+
+    def close(self):
+        """release pooled connections"""
+        self.session.close()
@@ -0,0 +1,25 @@
+"""Route the library modules' loggers into a script's ProsperLogger"""
+
+import logging
+
+LIBRARY_LOGGER = 'vincent_lexicon'  #parent of every module's `LOGGER`
+
+def route_library_logs(app_logger):
+    """send library log records through the app logger's handlers
+
+    Note:
+        library modules log to `vincent_lexicon.<module>` so the same records
+        land in whichever script (NewsScraper, tablefy, ...) is running.
+        Call after the app logger's handlers are configured (`-v` included)
+    Args:
+        app_logger (:obj:`logging.Logger`): ProsperLogger.logger of the running script
+
+    Returns:
+        (:obj:`logging.Logger`): library parent logger
+
+    """
+    library_logger = logging.getLogger(LIBRARY_LOGGER)
+    library_logger.handlers = list(app_logger.handlers)
+    library_logger.setLevel(app_logger.getEffectiveLevel())
+    library_logger.propagate = False
+    return library_logger
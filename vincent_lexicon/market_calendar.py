@@ -0,0 +1,220 @@
+"""In-memory, date-indexed market calendar backed by a TinyDB cache"""
+
+from bisect import bisect_left
+from datetime import datetime, date as date_type
+import logging
+import threading
+
+from tinydb import TinyDB
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+
+class UnexpectedMarketStatus(Exception):
+    """calendar returned a status other than open/closed"""
+    pass
+
+class CalendarUnavailable(Exception):
+    """unable to find/fetch calendar info for a date"""
+    pass
+
+def _date_str(date):
+    """normalize `date` into %Y-%m-%d"""
+    if isinstance(date, (datetime, date_type)):
+        return date.strftime('%Y-%m-%d')
+    return date
+
+def _add_months(year, month, offset):
+    """step (year, month) by `offset` months"""
+    month_index = year * 12 + (month - 1) + offset
+    return month_index // 12, month_index % 12 + 1
+
+class MarketCalendar(object):
+    """trading-day lookups from a date-keyed dict, loaded once per process
+
+    Note:
+        uses https://developer.tradier.com/documentation/markets/get-calendar
+    Args:
+        cache_file (str): path to TinyDB calendar cache
+        endpoint (str): address for fetching open days calendar (tradier)
+        auth_key (str): authentication for calendar endpoint
+        http_client (:obj:`http_client.HTTPClient`): shared HTTP layer
+        prefetch_months (int, optional): months ahead to keep cached
+
+    """
+    def __init__(
+            self,
+            cache_file,
+            endpoint,
+            auth_key,
+            http_client,
+            prefetch_months=3
+    ):
+        self.cache_file = cache_file
+        self.endpoint = endpoint
+        self.auth_key = auth_key
+        self.http_client = http_client
+        self.prefetch_months = prefetch_months
+
+        self._lock = threading.RLock()
+        self._days = None           #date: tradier day record
+        self._months = set()        #(year, month) loaded
+        self._open_days = []        #sorted open dates
+        self._next_open = {}        #date: index into _open_days of first open day >= date
+
+    def _ensure_loaded(self):
+        """read (and dedupe) the on-disk cache on first use"""
+        if self._days is not None:
+            return
+        with self._lock:
+            if self._days is not None:
+                return
+            cache = TinyDB(self.cache_file)
+            try:
+                records = cache.all()
+            finally:
+                cache.close()
+
+            days = {}
+            for record in records:
+                days[record['date']] = dict(record)
+            LOGGER.info('--loaded market calendar: x{0} days'.format(len(days)))
+            self._install(days)
+            if len(days) != len(records):
+                LOGGER.info('--deduping calendar cache: x{0} -> x{1}'.format(
+                    len(records), len(days)))
+                self._save()
+
+    def _install(self, days):
+        """swap in a new day table and rebuild the lookup indexes"""
+        self._days = days
+        self._months = {(int(day[:4]), int(day[5:7])) for day in days}
+        self._open_days = sorted(
+            day for day, record in days.items() if record['status'] == 'open')
+        self._next_open = {
+            day: bisect_left(self._open_days, day) for day in days
+        }
+
+    def _save(self):
+        """rewrite the on-disk cache, one record per date"""
+        cache = TinyDB(self.cache_file)
+        try:
+            drop_tables = getattr(cache, 'drop_tables', None) or cache.purge_tables
+            drop_tables()   #tinydb>=4 renamed purge_tables
+            cache.insert_multiple([self._days[day] for day in sorted(self._days)])
+        finally:
+            cache.close()
+
+    def fetch_month(self, year, month):
+        """pull one month of calendar from the endpoint into the cache
+
+        Args:
+            year (int): calendar year
+            month (int): calendar month
+
+        """
+        LOGGER.info('--fetching calendar: {0}-{1:02d}'.format(year, month))
+        headers = {
+            'Accept': 'application/json',
+            'Authorization': 'Bearer ' + self.auth_key
+        }
+        try:
+            req = self.http_client.get(
+                self.endpoint,
+                params={'year': year, 'month': '{0:02d}'.format(month)},
+                headers=headers
+            )
+            calendar = req.json()
+            fetched = calendar['calendar']['days']['day']
+        except Exception:
+            LOGGER.error(
+                'EXCEPTION: unable to fetch calendar' +
+                '\n\turl={0}'.format(self.endpoint),
+                exc_info=True
+            )
+            raise
+
+        with self._lock:
+            days = dict(self._days)
+            for record in fetched:
+                days[record['date']] = record
+            self._install(days)
+            self._months.add((year, month))
+            self._save()
+
+    def prefetch(self, start=None, months=None, refresh=False):
+        """make sure `months` of calendar starting at `start` are cached
+
+        Args:
+            start (str or :obj:`datetime`, optional): first day, DEFAULT: today
+            months (int, optional): months to cover, DEFAULT: prefetch_months
+            refresh (bool, optional): re-fetch months already cached
+
+        """
+        self._ensure_loaded()
+        start = _date_str(start or datetime.today())
+        months = self.prefetch_months if months is None else months
+        year, month = int(start[:4]), int(start[5:7])
+        for offset in range(max(months, 1)):
+            key = _add_months(year, month, offset)
+            if refresh or key not in self._months:
+                self.fetch_month(*key)
+
+    def status(self, date=None):
+        """calendar status for a day, fetching around it on a cache miss
+
+        Args:
+            date (str or :obj:`datetime`, optional): day to check, DEFAULT: today
+
+        Returns:
+            (str): `open` or `closed`
+
+        """
+        self._ensure_loaded()
+        date = _date_str(date or datetime.today())
+        record = self._days.get(date)
+        if record is None:
+            self.prefetch(date)
+            record = self._days.get(date)
+        if record is None:
+            raise CalendarUnavailable(date)
+        if record['status'] not in ('open', 'closed'):
+            LOGGER.error(
+                'EXCEPTION: unexpected market status' +
+                '\n\tvalue={0}'.format(record)
+            )
+            raise UnexpectedMarketStatus(record['status'])
+        return record['status']
+
+    def is_trading_day(self, date=None):
+        """is the market open on `date`
+
+        Args:
+            date (str or :obj:`datetime`, optional): day to check, DEFAULT: today
+
+        Returns:
+            (bool)
+
+        """
+        return self.status(date) == 'open'
+
+    def next_trading_days(self, date=None, count=1):
+        """next `count` open days on/after `date`
+
+        Args:
+            date (str or :obj:`datetime`, optional): first day, DEFAULT: today
+            count (int, optional): number of trading days to return
+
+        Returns:
+            (:obj:`list` str): %Y-%m-%d open days
+
+        """
+        date = _date_str(date or datetime.today())
+        self.status(date)   #make sure date itself is cached
+        extra_months = self.prefetch_months
+        while len(self._open_days) - self._next_open[date] < count:
+            if extra_months <= 0:
+                raise CalendarUnavailable('{0} +{1} trading days'.format(date, count))
+            self.fetch_month(*_add_months(*max(self._months), offset=1))
+            extra_months -= 1
+        start = self._next_open[date]
+        return self._open_days[start:start + count]
@@ -0,0 +1,172 @@
+"""Run metrics: counters, gauges and latency histograms, exported as JSON or Prometheus text"""
+
+from os import replace
+import threading
+
+import ujson as json
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LONG_BUCKETS = DEFAULT_BUCKETS + (60.0, 120.0, 300.0, 600.0, 1800.0)  #queued work, e.g. per-ticker wall time
+
+def _label_key(labels):
+    """hashable, ordered form of a label dict"""
+    return tuple(sorted(labels.items()))
+
+def _label_text(label_key, extra=()):
+    """prometheus `{k="v",...}` label block"""
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        '{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in pairs
+    ) + '}'
+
+class Histogram(object):
+    """fixed-bucket histogram
+
+    Args:
+        buckets (:obj:`tuple` float): upper bounds, ascending
+
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """add one sample"""
+        self.count += 1
+        self.sum += value
+        for indx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[indx] += 1
+                break
+
+    def cumulative(self):
+        """(upper bound, samples <= bound) pairs, `+Inf` last"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((bound, total))
+        pairs.append(('+Inf', self.count))
+        return pairs
+
+    def to_dict(self):
+        """JSON-friendly summary"""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'buckets': [[str(bound), count] for bound, count in self.cumulative()]
+        }
+
+class Metrics(object):
+    """thread-safe registry of run metrics
+
+    Args:
+        prefix (str, optional): prepended to every exported metric name
+
+    """
+    def __init__(self, prefix='vincent'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}     #name: {label_key: value}
+        self._gauges = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        """add to a counter"""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """set a gauge"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        """add a sample to a histogram"""
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def counter(self, name, **labels):
+        """current value of a counter (0 if never touched)"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def to_dict(self):
+        """snapshot every metric
+
+        Returns:
+            (:obj:`dict`): counters/gauges/histograms: name: list of series
+
+        """
+        def series_list(metrics, render):
+            return {
+                name: [
+                    {'labels': dict(key), 'value': render(value)}
+                    for key, value in sorted(series.items())
+                ]
+                for name, series in sorted(metrics.items())
+            }
+        with self._lock:
+            return {
+                'counters': series_list(self._counters, lambda value: value),
+                'gauges': series_list(self._gauges, lambda value: value),
+                'histograms': series_list(self._histograms, Histogram.to_dict)
+            }
+
+    def to_prometheus(self):
+        """render metrics in the Prometheus text exposition format
+
+        Returns:
+            (str): textfile-collector ready text
+
+        """
+        lines = []
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    full_name = self.prefix + '_' + name
+                    lines.append('# TYPE {0} {1}'.format(full_name, kind))
+                    for key, value in sorted(series.items()):
+                        lines.append('{0}{1} {2}'.format(full_name, _label_text(key), value))
+            for name, series in sorted(self._histograms.items()):
+                full_name = self.prefix + '_' + name
+                lines.append('# TYPE {0} histogram'.format(full_name))
+                for key, histogram in sorted(series.items()):
+                    for bound, count in histogram.cumulative():
+                        lines.append('{0}_bucket{1} {2}'.format(
+                            full_name, _label_text(key, [('le', bound)]), count))
+                    lines.append('{0}_sum{1} {2}'.format(full_name, _label_text(key), histogram.sum))
+                    lines.append('{0}_count{1} {2}'.format(full_name, _label_text(key), histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, metrics_file, metrics_format='prometheus'):
+        """atomically write metrics for a collector to pick up
+
+        Args:
+            metrics_file (str): destination path
+            metrics_format (str, optional): `prometheus` or `json`
+
+        """
+        if metrics_format == 'prometheus':
+            payload = self.to_prometheus()
+        elif metrics_format == 'json':
+            payload = json.dumps(self.to_dict(), indent=2)
+        else:
+            raise ValueError('unsupported metrics_format: ' + metrics_format)
+
+        tmp_file = metrics_file + '.tmp'
+        with open(tmp_file, 'w') as metrics_fh:
+            metrics_fh.write(payload)
+        replace(tmp_file, metrics_file)
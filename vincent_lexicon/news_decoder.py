@@ -0,0 +1,92 @@
+"""Fast decoding of the (not quite JSON) Google news payload"""
+
+import re
+
+import ujson as json
+
+#one token at a time, so rewrites never reach inside string contents
+_TOKEN = re.compile(r'''
+    (?P<double>"(?:[^"\\]|\\.)*")
+  | (?P<single>'(?:[^'\\]|\\.)*')
+  | (?P<key>[A-Za-z_$][\w$]*)(?=\s*:)
+  | (?P<trailing>,)(?=\s*[}\]])
+''', re.VERBOSE | re.DOTALL)
+_ESCAPE = re.compile(r'\\(x[0-9A-Fa-f]{2}|.)', re.DOTALL)
+
+def _fix_escape(match):
+    """map JS-only string escapes onto JSON ones"""
+    escape = match.group(1)
+    if escape[0] == 'x':
+        return '\\u00' + escape[1:]
+    if escape == "'":
+        return "'"
+    return match.group(0)
+
+def _fix_token(match):
+    """rewrite one malformed token into strict JSON"""
+    kind = match.lastgroup
+    if kind == 'key':
+        return '"' + match.group('key') + '"'
+    if kind == 'trailing':
+        return ''
+    if kind == 'single':
+        body = match.group('single')[1:-1]
+        body = re.sub(r'(?<!\\)((?:\\\\)*)"', r'\1\\"', body)   #bare " needs escaping now
+        return '"' + _ESCAPE.sub(_fix_escape, body) + '"'
+    return _ESCAPE.sub(_fix_escape, match.group('double'))
+
+def normalize(text):
+    """rewrite the payload's known malformations into strict JSON
+
+    Note:
+        handles bare keys, single-quoted strings, \\xNN escapes and trailing commas
+    Args:
+        text (str): raw payload
+
+    Returns:
+        (str): JSON text
+
+    """
+    return _TOKEN.sub(_fix_token, text)
+
+class NewsDecodeError(ValueError):
+    """news payload could not be decoded by either parser"""
+    pass
+
+class EmptyNewsFeed(NewsDecodeError):
+    """endpoint answered with an HTML page: no news for the ticker"""
+    pass
+
+EMPTY_FEED_MESSAGE = 'Can not decode value starting with character \'<\''   #demjson's wording
+
+def decode_news(text):
+    """decode a news payload, strict parser first, demjson (if installed) as fallback
+
+    Note:
+        non-JSON responses (HTML pages for empty feeds) raise `EmptyNewsFeed`
+        without touching demjson
+    Args:
+        text (str): raw payload
+
+    Returns:
+        (:obj:`dict`): same structure as `demjson.decode(text)`
+
+    Raises:
+        EmptyNewsFeed: payload is an HTML page
+        NewsDecodeError: payload is malformed past what either parser accepts
+
+    """
+    if text.lstrip().startswith('<'):
+        raise EmptyNewsFeed(EMPTY_FEED_MESSAGE)
+    try:
+        return json.loads(normalize(text))
+    except ValueError as err_msg:
+        strict_error = err_msg
+    try:
+        import demjson
+    except ImportError:
+        raise NewsDecodeError(str(strict_error))
+    try:
+        return demjson.decode(text)
+    except demjson.JSONDecodeError as err_msg:
+        raise NewsDecodeError(str(err_msg))
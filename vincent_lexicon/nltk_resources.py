@@ -0,0 +1,152 @@
+"""Offline-first NLTK resource checks and prebuilt binary lexicons"""
+
+from os import path, makedirs, replace
+import logging
+import marshal
+
+import nltk
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+
+RESOURCE_PATHS = {
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+    'opinion_lexicon': 'corpora/opinion_lexicon',
+    'subjectivity': 'corpora/subjectivity',
+}
+VADER_BINARY = 'vader_lexicon.marshal'
+OPINION_BINARY = 'opinion_lexicon.marshal'
+
+def _pointer_path(pointer):
+    """filesystem path behind an nltk PathPointer (zip file for zip members)"""
+    zip_file = getattr(pointer, 'zipfile', None)
+    if zip_file is not None:
+        return zip_file.filename
+    return pointer.path
+
+def _write_binary(payload, binary_path):
+    """atomically marshal `payload` to disk"""
+    tmp_path = binary_path + '.tmp'
+    with open(tmp_path, 'wb') as binary_fh:
+        marshal.dump(payload, binary_fh)
+    replace(tmp_path, binary_path)
+
+def load_vader_lexicon(binary_path):
+    """read prebuilt VADER lexicon
+
+    Args:
+        binary_path (str): path to marshalled lexicon
+
+    Returns:
+        (:obj:`dict`): word: valence
+
+    """
+    with open(binary_path, 'rb') as binary_fh:
+        return marshal.load(binary_fh)
+
+def load_opinion_lexicon(binary_path):
+    """read prebuilt Liu-Hu opinion lexicon
+
+    Args:
+        binary_path (str): path to marshalled lexicon
+
+    Returns:
+        (:obj:`list` str): positive words
+        (:obj:`list` str): negative words
+
+    """
+    with open(binary_path, 'rb') as binary_fh:
+        return marshal.load(binary_fh)
+
+class NLTKResources(object):
+    """check for NLTK data locally before touching the network
+
+    Args:
+        data_dir (str, optional): nltk_data folder searched first and used for
+            downloads, DEFAULT: nltk's own search path
+        lexicon_dir (str, optional): where prebuilt binary lexicons are kept
+
+    """
+    def __init__(self, data_dir=None, lexicon_dir=None):
+        self.data_dir = data_dir
+        self.lexicon_dir = lexicon_dir
+        if data_dir:
+            makedirs(data_dir, exist_ok=True)
+            if data_dir not in nltk.data.path:
+                nltk.data.path.insert(0, data_dir)
+        if lexicon_dir:
+            makedirs(lexicon_dir, exist_ok=True)
+
+    def find(self, name):
+        """locate a resource on disk
+
+        Args:
+            name (str): nltk package name (`vader_lexicon`, ...)
+
+        Returns:
+            (str): path to resource, None if missing
+
+        """
+        try:
+            return _pointer_path(nltk.data.find(RESOURCE_PATHS[name]))
+        except LookupError:
+            return None
+
+    def ensure(self, names):
+        """make sure resources are present, downloading only what is missing
+
+        Args:
+            names (:obj:`list` str): nltk package names
+
+        Returns:
+            (bool): all resources available
+
+        """
+        missing = [name for name in names if self.find(name) is None]
+        if not missing:
+            LOGGER.info('--NLTK resources found locally')
+            return True
+
+        LOGGER.info('--downloading missing NLTK resources: {0}'.format(missing))
+        if not nltk.download(missing, download_dir=self.data_dir, quiet=True):
+            LOGGER.error('unable to download NLTK resources: {0}'.format(missing))
+            return False
+        return all(self.find(name) is not None for name in missing)
+
+    def _stale(self, binary_path, source_name):
+        """binary lexicon missing or older than its nltk source"""
+        if not path.isfile(binary_path):
+            return True
+        source_path = self.find(source_name)
+        if source_path is None:
+            return False    #keep using binary if source vanished
+        return path.getmtime(binary_path) < path.getmtime(source_path)
+
+    def build_lexicons(self, force=False):
+        """(re)build compact binary lexicons from the nltk sources
+
+        Args:
+            force (bool, optional): rebuild even if up to date
+
+        Returns:
+            (:obj:`dict`): lexicon name: binary path
+
+        """
+        vader_path = path.join(self.lexicon_dir, VADER_BINARY)
+        if force or self._stale(vader_path, 'vader_lexicon'):
+            LOGGER.info('--building binary lexicon: ' + vader_path)
+            import nltk.sentiment.vader as vader
+            _write_binary(vader.SentimentIntensityAnalyzer().lexicon, vader_path)
+
+        opinion_path = path.join(self.lexicon_dir, OPINION_BINARY)
+        if force or self._stale(opinion_path, 'opinion_lexicon'):
+            LOGGER.info('--building binary lexicon: ' + opinion_path)
+            from nltk.corpus import opinion_lexicon
+            _write_binary(
+                (list(opinion_lexicon.positive()), list(opinion_lexicon.negative())),
+                opinion_path
+            )
+
+        return {
+            'vader_lexicon': vader_path,
+            'opinion_lexicon': opinion_path
+        }
@@ -0,0 +1,236 @@
+"""Multi-word phrase lexicon compiled into a token trie, scored in one pass"""
+
+from os import replace
+import hashlib
+import math
+import re
+
+PHRASE_SCORER = 'phrase:overlap'  #score cache name, changes with the scoring rule
+TERMINAL = ''   #trie key holding a phrase weight, never a token
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def tokenize(text):
+    """lowercase word tokens, shared by lexicon phrases and scored text
+
+    Note:
+        punctuation/hyphens split tokens, so `anti-trust` matches `anti trust`
+    Args:
+        text (str): text to split
+
+    Returns:
+        (:obj:`list` str): tokens
+
+    """
+    return _WORD.findall(text.lower())
+
+def ngrams(tokens, max_ngram):
+    """every 1..`max_ngram` token run, overlapping, in text order
+
+    Args:
+        tokens (:obj:`list` str): output of `tokenize`
+        max_ngram (int): longest run
+
+    Returns:
+        (:obj:`iterator` :obj:`tuple` str): token runs
+
+    """
+    count = len(tokens)
+    for indx in range(count):
+        for end in range(indx + 1, min(indx + max_ngram, count) + 1):
+            yield tuple(tokens[indx:end])
+
+def text_scale(tokens):
+    """per-text factor on summed phrase weights: 1/sqrt(token count)
+
+    Note:
+        shared with `Scripts/train_lexicon.py`, so a learned weight means the
+        same thing in training and scoring.  Long blurbs do not swamp titles
+    Args:
+        tokens (:obj:`list` str): output of `tokenize`
+
+    Returns:
+        (float): scale, 0.0 for empty text
+
+    """
+    return 1.0 / math.sqrt(len(tokens)) if tokens else 0.0
+
+def normalize_score(score, alpha=15):
+    """squash a summed weight into (-1, 1), same curve as VADER's compound"""
+    return score / math.sqrt(score * score + alpha)
+
+def read_phrase_lexicon(lexicon_path):
+    """parse a `phrase<TAB>weight` lexicon file
+
+    Note:
+        blank lines and `#` comments are skipped, a repeated phrase keeps its last weight
+    Args:
+        lexicon_path (str): path to TSV lexicon
+
+    Returns:
+        (:obj:`dict`): phrase token tuple: weight
+
+    """
+    phrases = {}
+    with open(lexicon_path, 'r', encoding='utf-8') as lexicon_fh:
+        for line_no, line in enumerate(lexicon_fh, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                phrase, weight = line.rsplit('\t', 1)
+                weight = float(weight)
+            except ValueError:
+                raise ValueError('malformed phrase lexicon line {0}:{1}: {2!r}'.format(
+                    lexicon_path, line_no, line))
+            tokens = tuple(tokenize(phrase))
+            if tokens:
+                phrases[tokens] = weight
+    return phrases
+
+def write_phrase_lexicon(lexicon_path, phrases, comments=()):
+    """atomically write a lexicon `read_phrase_lexicon` can load
+
+    Args:
+        lexicon_path (str): path to TSV lexicon
+        phrases (:obj:`iterable` :obj:`tuple`): (phrase, weight) rows, written in order
+        comments (:obj:`iterable` str, optional): `#` header lines
+
+    Returns:
+        (int): phrases written
+
+    """
+    count = 0
+    tmp_path = lexicon_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as lexicon_fh:
+        for comment in comments:
+            lexicon_fh.write('# ' + comment + '\n')
+        for phrase, weight in phrases:
+            lexicon_fh.write('{0}\t{1:.6g}\n'.format(phrase, weight))
+            count += 1
+    replace(tmp_path, lexicon_path)
+    return count
+
+def lexicon_version(lexicon_path):
+    """content hash of a lexicon file, for score cache keys"""
+    digest = hashlib.sha1()
+    with open(lexicon_path, 'rb') as lexicon_fh:
+        for block in iter(lambda: lexicon_fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class PhraseScorer(object):
+    """overlapping phrase scorer over a token trie
+
+    Note:
+        scanning is left to right, one trie walk per token, so cost grows with
+        text length times longest phrase, not with lexicon size.  Every phrase
+        occurrence counts, overlaps included: `missing projections` scores
+        `missing` + `projections` + `missing projections`.  This is the linear
+        model `Scripts/train_lexicon.py` fits, so hand-written lexicons should
+        weigh a phrase as its extra valence over its words
+    Args:
+        phrases (:obj:`dict`): phrase (str or token tuple): weight
+        version (str, optional): lexicon version for score cache keys
+        lexicon_path (str, optional): file the lexicon was read from
+
+    """
+    def __init__(self, phrases, version='', lexicon_path=None):
+        self.version = version
+        self.lexicon_path = lexicon_path
+        self.size = 0
+        self._root = {}
+        for phrase, weight in phrases.items():
+            self.add(phrase, weight)
+
+    @classmethod
+    def from_file(cls, lexicon_path):
+        """compile a TSV lexicon (see `read_phrase_lexicon`)"""
+        return cls(
+            read_phrase_lexicon(lexicon_path),
+            lexicon_version(lexicon_path),
+            lexicon_path
+        )
+
+    def add(self, phrase, weight):
+        """insert/overwrite one phrase
+
+        Args:
+            phrase (str or :obj:`tuple` str): phrase text or tokens
+            weight (float): valence added per match
+
+        """
+        tokens = tokenize(phrase) if isinstance(phrase, str) else phrase
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if TERMINAL not in node:
+            self.size += 1
+        node[TERMINAL] = weight
+
+    def __len__(self):
+        return self.size
+
+    def match(self, tokens):
+        """find every phrase occurrence in a token list, overlaps included
+
+        Args:
+            tokens (:obj:`list` str): output of `tokenize`
+
+        Returns:
+            (:obj:`list` :obj:`tuple`): (start, end, weight) per match
+
+        """
+        root = self._root
+        matches = []
+        count = len(tokens)
+        for indx in [indx for indx, token in enumerate(tokens) if token in root]:
+            node = root[tokens[indx]]
+            end = indx + 1
+            if TERMINAL in node:
+                matches.append((indx, end, node[TERMINAL]))
+            while end < count:
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                end += 1
+                if TERMINAL in node:
+                    matches.append((indx, end, node[TERMINAL]))
+        return matches
+
+    def score(self, text):
+        """score a single block of text
+
+        Args:
+            text (str): text to analyze
+
+        Returns:
+            (:obj:`dict`): `score` (summed weights * `text_scale`), `matches`,
+                `compound` (-1..1)
+
+        """
+        tokens = tokenize(text)
+        matches = self.match(tokens)
+        total = sum(weight for _, _, weight in matches) * text_scale(tokens)
+        return {
+            'score': total,
+            'matches': len(matches),
+            'compound': normalize_score(total)
+        }
+
+    def score_many(self, texts):
+        """score a batch of texts, repeated texts are only scored once
+
+        Args:
+            texts (:obj:`list` str): texts to analyze
+
+        Returns:
+            (:obj:`list` :obj:`dict`): scores, in `texts` order
+
+        """
+        results = {}
+        for text in texts:
+            if text not in results:
+                results[text] = self.score(text)
+        return [results[text] for text in texts]
@@ -0,0 +1,162 @@
+"""Bounded-queue streaming pipeline: each stage runs in its own thread(s)"""
+
+import logging
+import queue
+import threading
+import time
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+_DONE = object()    #end-of-stream marker
+
+class StageStats(object):
+    """throughput counters for one pipeline stage"""
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, items_in, items_out, busy_seconds):
+        """add one batch worth of work"""
+        with self._lock:
+            now = time.perf_counter()
+            if self.started is None:
+                self.started = now - busy_seconds
+            self.finished = now
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += busy_seconds
+
+    def summary(self):
+        """report stage counters
+
+        Returns:
+            (:obj:`dict`): items in/out, busy/wall seconds, items per second
+
+        """
+        wall_seconds = (self.finished - self.started) if self.started is not None else 0.0
+        return {
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': self.busy_seconds,
+            'wall_seconds': wall_seconds,
+            'items_per_second': self.items_in / wall_seconds if wall_seconds else 0.0
+        }
+
+class Stage(object):
+    """one step of a Pipeline
+
+    Args:
+        name (str): stage name for reporting
+        func (:obj:`callable`): func(list of items) -> iterable of output items
+        workers (int, optional): threads running `func`
+        batch_size (int, optional): items handed to `func` per call
+
+    """
+    def __init__(self, name, func, workers=1, batch_size=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stats = StageStats(name)
+
+class Pipeline(object):
+    """chain of Stages joined by bounded queues
+
+    Note:
+        memory is bounded by `queue_depth` x stages x batch sizes, not the input.
+        Output order is completion order, not input order
+    Args:
+        stages (:obj:`list` :obj:`Stage`): steps, in order
+        queue_depth (int, optional): max items waiting between two stages
+
+    """
+    def __init__(self, stages, queue_depth=100):
+        self.stages = stages
+        self.queue_depth = queue_depth
+        self._error = None
+        self._abort = threading.Event()
+
+    def _run_stage(self, stage, inbox, outbox, remaining):
+        """worker loop: batch up inbox, run func, push results to outbox"""
+        batch = []
+        finished = False
+        while not finished:
+            item = inbox.get()
+            if item is _DONE:
+                inbox.put(_DONE)    #let sibling workers see it too
+                finished = True
+            else:
+                batch.append(item)
+            if not batch or (len(batch) < stage.batch_size and not finished):
+                continue
+
+            if self._abort.is_set():    #drain without working so upstream never blocks
+                batch = []
+                continue
+            start = time.perf_counter()
+            try:
+                results = list(stage.func(batch))
+            except Exception as err_msg:
+                LOGGER.error(
+                    'EXCEPTION: pipeline stage failed' +
+                    '\n\tstage={0}'.format(stage.name),
+                    exc_info=True
+                )
+                self._error = self._error or err_msg
+                self._abort.set()
+                batch = []
+                continue
+            stage.stats.record(len(batch), len(results), time.perf_counter() - start)
+            batch = []
+            if outbox is not None:
+                for result in results:
+                    outbox.put(result)
+
+        with remaining[1]:
+            remaining[0] -= 1
+            last_worker = remaining[0] == 0
+        if last_worker and outbox is not None:
+            outbox.put(_DONE)
+
+    def run(self, source):
+        """push every item of `source` through the stages
+
+        Args:
+            source (:obj:`iterable`): input items for the first stage
+
+        Returns:
+            (:obj:`list` :obj:`dict`): StageStats.summary() per stage
+
+        """
+        queues = [queue.Queue(maxsize=self.queue_depth) for _ in self.stages]
+        threads = []
+        for indx, stage in enumerate(self.stages):
+            outbox = queues[indx + 1] if indx + 1 < len(queues) else None
+            remaining = [stage.workers, threading.Lock()]
+            for worker in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(stage, queues[indx], outbox, remaining),
+                    name='{0}-{1}'.format(stage.name, worker),
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        for item in source:
+            if self._abort.is_set():
+                break
+            queues[0].put(item)
+        queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return [stage.stats.summary() for stage in self.stages]
@@ -0,0 +1,167 @@
+"""Opt-in cProfile/tracemalloc instrumentation for pipeline stages and code sections"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from os import path, makedirs
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import tracemalloc
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+SUMMARY_FILE = 'summary.txt'
+SHARED_PROFILER = sys.version_info >= (3, 12)   #cProfile is one process-wide sys.monitoring tool
+
+class StageProfiler(object):
+    """collect one cProfile per stage (merged across its threads)
+
+    Note:
+        profilers are per-thread, so multi-worker stages are merged at dump time.
+        On python>=3.12 only one profiler can be active and it sees every
+        thread: the first section to start profiles all overlapping sections
+    Args:
+        profile_dir (str): folder for .pstats dumps + summary
+        trace_memory (bool, optional): also record tracemalloc allocation sites
+        top (int, optional): functions/allocation sites listed in the summary
+
+    """
+    def __init__(self, profile_dir, trace_memory=False, top=25):
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.top = top
+        self._profiles = {}     #stage name: [cProfile.Profile per thread]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = None     #SHARED_PROFILER: stage whose profile is enabled
+        self._active_count = 0  #SHARED_PROFILER: sections currently running
+        self._covers = {}       #SHARED_PROFILER: stage name: stages profiled with it
+        makedirs(profile_dir, exist_ok=True)
+        if trace_memory:
+            tracemalloc.start()
+
+    @classmethod
+    def for_run(cls, log_path, app_name, **kwargs):
+        """profiler writing to `<log_path>/profile_<app>_<timestamp>`"""
+        stamp = datetime.today().strftime('%Y%m%d_%H%M%S')
+        return cls(path.join(log_path, 'profile_{0}_{1}'.format(app_name, stamp)), **kwargs)
+
+    def _thread_profile(self, name):
+        """this thread's profiler for stage `name`"""
+        profiles = getattr(self._local, 'profiles', None)
+        if profiles is None:
+            profiles = self._local.profiles = {}
+        if name not in profiles:
+            profiles[name] = cProfile.Profile()
+            with self._lock:
+                self._profiles.setdefault(name, []).append(profiles[name])
+        return profiles[name]
+
+    @contextmanager
+    def section(self, name):
+        """profile the enclosed block as stage `name`"""
+        if SHARED_PROFILER:
+            with self._shared_section(name):
+                yield
+            return
+        profile = self._thread_profile(name)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    @contextmanager
+    def _shared_section(self, name):
+        """one profiler for all threads, enabled while any section runs"""
+        with self._lock:
+            if self._active is None:
+                self._active = name
+                self._profiles.setdefault(name, [cProfile.Profile()])[0].enable()
+            self._active_count += 1
+            self._covers.setdefault(self._active, set()).add(name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_count -= 1
+                if not self._active_count:
+                    self._profiles[self._active][0].disable()
+                    self._active = None
+
+    def wrap(self, name, func):
+        """profile every call of a (batch) stage function
+
+        Args:
+            name (str): stage name
+            func (:obj:`callable`): func(batch) -> iterable
+
+        Returns:
+            (:obj:`callable`): func(batch) -> list, profiled
+
+        """
+        def profiled(batch):
+            with self.section(name):
+                return list(func(batch))    #drain generators inside the profile
+        return profiled
+
+    def _stats(self, name):
+        """merged pstats for one stage"""
+        profiles = self._profiles[name]
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def dump(self):
+        """write per-stage .pstats files and a top-functions summary
+
+        Returns:
+            (str): path to summary file
+
+        """
+        summary = io.StringIO()
+        for name in sorted(self._profiles):
+            stats = self._stats(name)
+            stats.dump_stats(path.join(self.profile_dir, name + '.pstats'))
+            if SHARED_PROFILER:
+                summary.write('==== {0} (all threads, covers: {1}) ====\n'.format(
+                    name, ', '.join(sorted(self._covers.get(name, [name])))))
+            else:
+                summary.write('==== {0} ({1} thread(s)) ====\n'.format(
+                    name, len(self._profiles[name])))
+            stats.stream = summary
+            stats.sort_stats('cumulative').print_stats(self.top)
+
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(path.join(self.profile_dir, 'tracemalloc.snapshot'))
+            current, peak = tracemalloc.get_traced_memory()
+            summary.write('==== memory: current={0:.1f}MB peak={1:.1f}MB ====\n'.format(
+                current / 2 ** 20, peak / 2 ** 20))
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                summary.write(str(stat) + '\n')
+            tracemalloc.stop()
+
+        summary_file = path.join(self.profile_dir, SUMMARY_FILE)
+        with open(summary_file, 'w') as summary_fh:
+            summary_fh.write(summary.getvalue())
+        LOGGER.info('wrote profile summary: ' + summary_file)
+        return summary_file
+
+@contextmanager
+def profile_section(profiler, name):
+    """`profiler.section(name)`, or a no-op when profiling is off
+
+    Args:
+        profiler (:obj:`StageProfiler`): active profiler, None to skip
+        name (str): section name
+
+    """
+    if profiler is None:
+        yield
+        return
+    with profiler.section(name):
+        yield
@@ -0,0 +1,197 @@
+"""Persistent memoization of sentiment scores, keyed by text"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+import time
+
+def normalize_text(text):
+    """collapse whitespace runs
+
+    Note:
+        VADER and the treebank tokenizer both split on whitespace, so this
+        can not change a score.  Case/punctuation are left alone (VADER uses them)
+    Args:
+        text (str): raw text
+
+    Returns:
+        (str): normalized text
+
+    """
+    return ' '.join(text.split())
+
+def cache_key(scorer, version, text):
+    """build lookup key for a scored text
+
+    Args:
+        scorer (str): name of scoring engine
+        version (str): version of scoring engine/lexicon
+        text (str): text that was scored
+
+    Returns:
+        (str): hex digest
+
+    """
+    raw = '\0'.join([scorer, version, normalize_text(text)])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+class ScoreCache(object):
+    """sqlite-backed score store with an in-memory LRU in front
+
+    Args:
+        cache_path (str): path to sqlite file
+        max_entries (int, optional): rows kept on disk before evicting
+        memory_entries (int, optional): rows kept in the in-memory LRU
+
+    """
+    def __init__(
+            self,
+            cache_path,
+            max_entries=2000000,
+            memory_entries=100000
+    ):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)  #one thread at a time, any thread
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS scores ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used INTEGER NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)'
+        )
+        self._conn.commit()
+        self._row_bound = self._count_rows()   #upper bound: puts may replace rows
+
+    def _count_rows(self):
+        """exact row count, a full scan: only run when `_row_bound` is over budget"""
+        return self._conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+
+    def _remember(self, key, value):
+        """push value onto the in-memory LRU"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, scorer, version, texts):
+        """look up previously scored texts
+
+        Args:
+            scorer (str): name of scoring engine
+            version (str): version of scoring engine/lexicon
+            texts (:obj:`list` str): texts to look up
+
+        Returns:
+            (:obj:`dict`): text: cached value, for every hit
+
+        """
+        found = {}
+        pending = {}
+        for text in texts:
+            key = cache_key(scorer, version, text)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[text] = self._memory[key]
+                self.memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(text)
+
+        keys = list(pending)
+        now = int(time.time())
+        for indx in range(0, len(keys), 500):  #stay under SQLITE_MAX_VARIABLE_NUMBER
+            batch = keys[indx:indx + 500]
+            rows = self._conn.execute(
+                'SELECT key, value FROM scores WHERE key IN ({0})'.format(
+                    ','.join('?' * len(batch))),
+                batch
+            ).fetchall()
+            for key, raw_value in rows:
+                value = json.loads(raw_value)
+                self._remember(key, value)
+                for text in pending[key]:
+                    found[text] = value
+            self._conn.executemany(
+                'UPDATE scores SET last_used = ? WHERE key = ?',
+                [(now, key) for key, _ in rows]
+            )
+        self._conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, scorer, version, scores):
+        """save freshly scored texts
+
+        Args:
+            scorer (str): name of scoring engine
+            version (str): version of scoring engine/lexicon
+            scores (:obj:`dict`): text: JSON-serializable score
+
+        """
+        now = int(time.time())
+        rows = []
+        for text, value in scores.items():
+            key = cache_key(scorer, version, text)
+            self._remember(key, value)
+            rows.append((key, json.dumps(value), now))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO scores (key, value, last_used) VALUES (?, ?, ?)',
+            rows
+        )
+        self._conn.commit()
+        self._row_bound += len(rows)
+        if self._row_bound > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """drop least-recently-used rows once over `max_entries`
+
+        Note:
+            `put_many` only calls this once its running row bound passes
+            `max_entries`, so the COUNT(*) scan is not paid per insert
+        Returns:
+            (int): rows removed
+
+        """
+        count = self._count_rows()
+        self._row_bound = count
+        if count <= self.max_entries:
+            return 0
+
+        overflow = count - int(self.max_entries * 0.9)  #evict in bulk, not per-insert
+        self._conn.execute(
+            'DELETE FROM scores WHERE key IN ('
+            'SELECT key FROM scores ORDER BY last_used ASC LIMIT ?)',
+            (overflow,)
+        )
+        self._conn.commit()
+        self._row_bound = count - overflow
+        return overflow
+
+    def stats(self):
+        """report cache effectiveness
+
+        Returns:
+            (:obj:`dict`): hits, memory_hits, misses, hit_rate
+
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        """close sqlite handle"""
+        self._conn.close()
@@ -0,0 +1,191 @@
+"""Text scoring engines used by NewsScraper.score_article_list"""
+
+from enum import Enum
+
+import nltk
+from nltk.tokenize import treebank
+import nltk.sentiment as sentiment
+
+FIRST_PASS_SCORER = 'vader+liu-hu'
+FIRST_PASS_VERSION = nltk.__version__   #lexicons ship with nltk_data, bump on upgrade
+
+class Polarity(Enum):
+    POSITIVE = 'Positive'
+    NEGATIVE = 'Negative'
+    NEUTRAL = 'Neutral'
+
+class LiuHuScorer(object):
+    """Liu-Hu opinion lexicon scorer, lexicon loaded once into hashed sets
+
+    Note:
+        same rules as nltk.sentiment.util.demo_liu_hu_lexicon
+    Args:
+        positive_words (:obj:`iterable` str, optional): positive lexicon
+        negative_words (:obj:`iterable` str, optional): negative lexicon
+            both default to nltk `opinion_lexicon`
+
+    """
+    def __init__(self, positive_words=None, negative_words=None):
+        if positive_words is None or negative_words is None:
+            from nltk.corpus import opinion_lexicon
+            positive_words = opinion_lexicon.positive()
+            negative_words = opinion_lexicon.negative()
+        self.positive = frozenset(positive_words)
+        self.negative = frozenset(negative_words)
+        self._tokenize = treebank.TreebankWordTokenizer().tokenize
+
+    def score(self, text):
+        """score a single block of text
+
+        Args:
+            text (str): text to analyze
+
+        Returns:
+            (:enum:`Polarity`) polarity score
+
+        """
+        positive = self.positive
+        negative = self.negative
+        pos_words = 0
+        neg_words = 0
+        for word in self._tokenize(text):
+            word = word.lower()
+            if word in positive:
+                pos_words += 1
+            elif word in negative:
+                neg_words += 1
+            #else: neutral not counted
+
+        if pos_words > neg_words:
+            return Polarity.POSITIVE
+        elif pos_words < neg_words:
+            return Polarity.NEGATIVE
+        return Polarity.NEUTRAL
+
+    def score_many(self, texts):
+        """score a batch of texts, repeated texts are only scored once
+
+        Args:
+            texts (:obj:`list` str): texts to analyze
+
+        Returns:
+            (:obj:`list` :enum:`Polarity`) polarity scores, in `texts` order
+
+        """
+        results = {}
+        for text in texts:
+            if text not in results:
+                results[text] = self.score(text)
+        return [results[text] for text in texts]
+
+class PrebuiltVaderAnalyzer(sentiment.vader.SentimentIntensityAnalyzer):
+    """VADER analyzer fed an already-parsed lexicon dict
+
+    Note:
+        skips nltk.data.load + make_lex_dict, scoring is unchanged
+    Args:
+        lexicon (:obj:`dict`): word: valence (see nltk_resources.build_lexicons)
+
+    """
+    def __init__(self, lexicon):
+        self.lexicon_file = None
+        self.lexicon = lexicon
+        constants = getattr(sentiment.vader, 'VaderConstants', None)
+        if constants is not None:   #nltk>=3.3
+            self.constants = constants()
+
+_LIU_HU_SCORER = None
+def liu_hu_scorer(lexicon_path=None):
+    """shared LiuHuScorer, built on first use
+
+    Args:
+        lexicon_path (str, optional): prebuilt binary opinion lexicon,
+            DEFAULT: load from nltk corpus
+
+    Returns:
+        (:obj:`LiuHuScorer`)
+
+    """
+    global _LIU_HU_SCORER
+    if _LIU_HU_SCORER is None:
+        if lexicon_path:
+            from nltk_resources import load_opinion_lexicon
+            _LIU_HU_SCORER = LiuHuScorer(*load_opinion_lexicon(lexicon_path))
+        else:
+            _LIU_HU_SCORER = LiuHuScorer()
+    return _LIU_HU_SCORER
+
+_VADER_ANALYZER = None
+def vader_analyzer(lexicon_path=None):
+    """shared VADER SentimentIntensityAnalyzer, built once per process
+
+    Args:
+        lexicon_path (str, optional): prebuilt binary VADER lexicon,
+            DEFAULT: load from nltk_data zip
+
+    Returns:
+        (:obj:`nltk.sentiment.vader.SentimentIntensityAnalyzer`)
+
+    """
+    global _VADER_ANALYZER
+    if _VADER_ANALYZER is None:
+        if lexicon_path:
+            from nltk_resources import load_vader_lexicon
+            _VADER_ANALYZER = PrebuiltVaderAnalyzer(load_vader_lexicon(lexicon_path))
+        else:
+            _VADER_ANALYZER = sentiment.vader.SentimentIntensityAnalyzer()
+    return _VADER_ANALYZER
+
+def score_texts(texts, lexicon_paths=None):
+    """apply every first-pass scorer to a chunk of texts
+
+    Note:
+        module-level so it can be shipped to ProcessPoolExecutor workers
+    Args:
+        texts (:obj:`list` str): texts to analyze
+        lexicon_paths (:obj:`dict`, optional): prebuilt binary lexicons
+            (`vader_lexicon`, `opinion_lexicon`), see nltk_resources
+
+    Returns:
+        (:obj:`list` :obj:`tuple`): (vader scores, liu-hu polarity value) per text
+
+    """
+    lexicon_paths = lexicon_paths or {}
+    text_analyzer = vader_analyzer(lexicon_paths.get('vader_lexicon'))
+    liu_hu = liu_hu_scorer(lexicon_paths.get('opinion_lexicon')).score_many(texts)
+    return [
+        (text_analyzer.polarity_scores(text), polarity.value)
+        for text, polarity in zip(texts, liu_hu)
+    ]
+
+_PHRASE_SCORER = None
+def phrase_scorer(lexicon_path):
+    """shared PhraseScorer for a TSV phrase lexicon, compiled once per process
+
+    Args:
+        lexicon_path (str): path to `phrase<TAB>weight` lexicon
+
+    Returns:
+        (:obj:`phrase_lexicon.PhraseScorer`)
+
+    """
+    global _PHRASE_SCORER
+    if _PHRASE_SCORER is None or _PHRASE_SCORER.lexicon_path != lexicon_path:
+        from phrase_lexicon import PhraseScorer
+        _PHRASE_SCORER = PhraseScorer.from_file(lexicon_path)
+    return _PHRASE_SCORER
+
+def score_phrases(texts, lexicon_path):
+    """apply the phrase lexicon to a chunk of texts
+
+    Note:
+        module-level so it can be shipped to ProcessPoolExecutor workers
+    Args:
+        texts (:obj:`list` str): texts to analyze
+        lexicon_path (str): path to phrase lexicon
+
+    Returns:
+        (:obj:`list` :obj:`dict`): phrase scores per text
+
+    """
+    return phrase_scorer(lexicon_path).score_many(texts)
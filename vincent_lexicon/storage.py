@@ -0,0 +1,626 @@
+"""Append-only, date-sharded storage for the news archive"""
+
+from os import path, makedirs, listdir, fsync, stat
+from json import JSONDecoder
+from collections import OrderedDict
+import hashlib
+import logging
+import sqlite3
+
+import ujson as json
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+SHARD_EXT = '.jsonl'
+INDEX_FILE = 'index.sqlite'
+
+class ArchiveIndex(object):
+    """sqlite secondary index: (ticker, date) -> byte range in a shard
+
+    Note:
+        `shards.indexed_bytes` records how much of each shard is indexed, so
+        records appended outside the index (crash, older archives) are caught up
+    Args:
+        index_path (str): path to sqlite file
+
+    """
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)  #one thread at a time, any thread
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'ticker TEXT NOT NULL, date TEXT NOT NULL, '
+            'offset INTEGER NOT NULL, length INTEGER NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS entries_ticker_date ON entries (ticker, date)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS shards ('
+            'date TEXT PRIMARY KEY, indexed_bytes INTEGER NOT NULL)'
+        )
+        self._conn.commit()
+
+    def indexed_bytes(self):
+        """bytes already indexed per shard
+
+        Returns:
+            (:obj:`dict`): shard date: indexed bytes
+
+        """
+        return dict(self._conn.execute('SELECT date, indexed_bytes FROM shards'))
+
+    def add(self, date, rows, indexed_bytes):
+        """record new shard locations in one transaction
+
+        Args:
+            date (str): shard date (%Y-%m-%d)
+            rows (:obj:`list` :obj:`tuple`): (ticker, offset, length) per record
+            indexed_bytes (int): shard size covered once `rows` are in
+
+        """
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO entries (ticker, date, offset, length) VALUES (?, ?, ?, ?)',
+                [(ticker, date, offset, length) for ticker, offset, length in rows]
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO shards (date, indexed_bytes) VALUES (?, ?)',
+                (date, indexed_bytes)
+            )
+
+    def lookup(self, ticker, start_date=None, end_date=None):
+        """locations of a ticker's records
+
+        Args:
+            ticker (str): stock ticker
+            start_date (str, optional): first date (%Y-%m-%d, inclusive)
+            end_date (str, optional): last date (%Y-%m-%d, inclusive)
+
+        Returns:
+            (:obj:`list` :obj:`tuple`): (date, offset, length), date/insert order
+
+        """
+        return self._conn.execute(
+            'SELECT date, offset, length FROM entries '
+            'WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date, offset',
+            (ticker, start_date or '', end_date or '\uffff')
+        ).fetchall()
+
+    def clear(self):
+        """drop every entry (before a rebuild)"""
+        with self._conn:
+            self._conn.execute('DELETE FROM entries')
+            self._conn.execute('DELETE FROM shards')
+
+    def close(self):
+        """close sqlite handle"""
+        self._conn.close()
+
+class ShardedStore(object):
+    """JSON-lines archive, one append-only shard per date
+
+    Note:
+        mirrors the TinyDB calls NewsScraper uses (insert/insert_multiple/all/close).
+        The ticker/date index is opened on first insert/get, so read-only
+        streaming (tablefy) never touches it
+    Args:
+        store_dir (str): path to archive folder (abspath > relpath)
+        date_key (str, optional): record key holding `%Y-%m-%d...` date
+        index_file (str, optional): ticker/date index inside `store_dir`,
+            None to skip indexing
+
+    """
+    def __init__(self, store_dir, date_key='datetime', index_file=INDEX_FILE):
+        self.store_dir = store_dir
+        self.date_key = date_key
+        self.index_file = index_file
+        self._index = None
+        makedirs(store_dir, exist_ok=True)
+
+    @property
+    def index(self):
+        """caught-up :obj:`ArchiveIndex` (None if indexing is off)"""
+        if self._index is None and self.index_file:
+            self._index = ArchiveIndex(path.join(self.store_dir, self.index_file))
+            self._catch_up_index()
+        return self._index
+
+    def _catch_up_index(self):
+        """index whatever shard bytes were appended without an index update"""
+        indexed = self._index.indexed_bytes()
+        for date in self.shards():
+            start = indexed.get(date, 0)
+            end = stat(self.shard_path(date)).st_size
+            if end <= start:
+                continue
+            LOGGER.info(
+                'indexing archive shard' +
+                '\n\tdate={0}'.format(date) +
+                '\n\tbytes={0}-{1}'.format(start, end)
+            )
+            rows = []
+            with open(self.shard_path(date), 'rb') as shard_fh:
+                shard_fh.seek(start)
+                offset = start
+                for line in shard_fh:
+                    if offset + len(line) > end:
+                        break
+                    if line.endswith(b'\n') and line.strip():
+                        try:
+                            ticker = json.loads(line.decode('utf-8')).get('ticker')
+                        except ValueError:  #torn write from a crashed run
+                            ticker = None
+                        if ticker:
+                            rows.append((ticker, offset, len(line)))
+                    offset += len(line)
+            self._index.add(date, rows, end)
+
+    def rebuild_index(self):
+        """re-index every shard from scratch
+
+        Returns:
+            (:obj:`ArchiveIndex`): rebuilt index
+
+        """
+        index = self.index
+        if index is not None:
+            index.clear()
+            self._catch_up_index()
+        return index
+
+    def shard_path(self, date):
+        """path to shard file for `date` (%Y-%m-%d)"""
+        return path.join(self.store_dir, date + SHARD_EXT)
+
+    def shards(self):
+        """list available shard dates
+
+        Returns:
+            (:obj:`list` str): sorted %Y-%m-%d shard names
+
+        """
+        return sorted(
+            name[:-len(SHARD_EXT)]
+            for name in listdir(self.store_dir)
+            if name.endswith(SHARD_EXT)
+        )
+
+    def insert(self, record):
+        """append one record
+
+        Args:
+            record (:obj:`dict`): archive entry
+
+        Returns:
+            (int): bytes written
+
+        """
+        return self.insert_multiple([record])
+
+    def insert_multiple(self, records):
+        """append records to their date shards
+
+        Args:
+            records (:obj:`list` :obj:`dict`): archive entries
+
+        Returns:
+            (int): bytes written
+
+        """
+        index = self.index
+        by_shard = {}
+        for record in records:
+            date = record[self.date_key][:10]
+            by_shard.setdefault(date, []).append(
+                (record.get('ticker'), (json.dumps(record) + '\n').encode('utf-8')))
+
+        bytes_written = 0
+        for date, lines in by_shard.items():
+            payload = b''.join(line for _, line in lines)
+            with open(self.shard_path(date), 'ab+') as shard_fh:
+                offset = shard_fh.tell()
+                if offset > 0:     #fence off torn write from a crashed run
+                    shard_fh.seek(-1, 2)
+                    if shard_fh.read(1) != b'\n':
+                        payload = b'\n' + payload
+                        offset += 1
+                shard_fh.write(payload)
+                shard_fh.flush()
+                fsync(shard_fh.fileno())
+                end = shard_fh.tell()
+            bytes_written += len(payload)
+
+            if index is not None:   #after fsync: index never points past the shard
+                rows = []
+                for ticker, line in lines:
+                    if ticker:
+                        rows.append((ticker, offset, len(line)))
+                    offset += len(line)
+                index.add(date, rows, end)
+        return bytes_written
+
+    def get(self, ticker, date_range=None):
+        """read one ticker's records through the index, not a full scan
+
+        Args:
+            ticker (str): stock ticker
+            date_range (:obj:`tuple`, optional): (start, end) %Y-%m-%d, inclusive,
+                either end may be None
+
+        Returns:
+            (:obj:`list` :obj:`dict`): archive entries, date/insert order
+
+        """
+        start_date, end_date = date_range or (None, None)
+        if self.index is None:
+            return [
+                record for record in self.iter_records(start_date, end_date)
+                if record.get('ticker') == ticker
+            ]
+
+        records = []
+        shard_fh = None
+        shard_date = None
+        try:
+            for date, offset, length in self.index.lookup(ticker, start_date, end_date):
+                if date != shard_date:
+                    if shard_fh is not None:
+                        shard_fh.close()
+                    shard_fh = open(self.shard_path(date), 'rb')
+                    shard_date = date
+                shard_fh.seek(offset)
+                records.append(json.loads(shard_fh.read(length).decode('utf-8')))
+        finally:
+            if shard_fh is not None:
+                shard_fh.close()
+        return records
+
+    def iter_keyed(self, start_date=None, end_date=None):
+        """stream records shard by shard, with their location
+
+        Note:
+            shards are append-only, so keys are stable and increasing
+        Args:
+            start_date (str, optional): first shard to read (%Y-%m-%d, inclusive)
+            end_date (str, optional): last shard to read (%Y-%m-%d, inclusive)
+
+        Yields:
+            (:obj:`list`): record key [shard date, line number]
+            (:obj:`dict`): archive entry
+
+        """
+        for date in self.shards():
+            if start_date and date < start_date:
+                continue
+            if end_date and date > end_date:
+                break
+            with open(self.shard_path(date), 'r') as shard_fh:
+                for line_no, line in enumerate(shard_fh):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  #torn write from a crashed run
+                        LOGGER.warning('skipping partial record in shard ' + date)
+                        continue
+                    yield [date, line_no], record
+
+    def iter_records(self, start_date=None, end_date=None):
+        """stream records shard by shard
+
+        Args:
+            start_date (str, optional): first shard to read (%Y-%m-%d, inclusive)
+            end_date (str, optional): last shard to read (%Y-%m-%d, inclusive)
+
+        Yields:
+            (:obj:`dict`): archive entry
+
+        """
+        for _, record in self.iter_keyed(start_date, end_date):
+            yield record
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def __len__(self):
+        count = 0
+        for date in self.shards():
+            with open(self.shard_path(date), 'rb') as shard_fh:
+                count += sum(1 for line in shard_fh if line.strip())
+        return count
+
+    def all(self):
+        """load every record (TinyDB compatibility, prefer iter_records)
+
+        Returns:
+            (:obj:`list` :obj:`dict`)
+
+        """
+        return list(self.iter_records())
+
+    def close(self):
+        """close the index, shards are not held open between calls"""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+def article_id(article):
+    """content address for a news article
+
+    Args:
+        article (:obj:`dict`): processed article (see `stories.normalize_story`)
+
+    Returns:
+        (str): `usg` if the feed provided one, else `url:` + sha1(url)
+
+    """
+    if article.get('usg'):
+        return article['usg']
+    return 'url:' + hashlib.sha1(article['url'].encode('utf-8')).hexdigest()
+
+class ArticleStore(object):
+    """sqlite-backed, content-addressed store of unique news articles
+
+    Note:
+        ticker-day records hold `{article_id, primary}` refs into this store,
+        so a story shared by many tickers/days is kept (and scored) once
+    Args:
+        store_path (str): path to sqlite file
+        memory_entries (int, optional): articles kept in the in-memory LRU
+
+    """
+    def __init__(self, store_path, memory_entries=100000):
+        self.store_path = store_path
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)  #one thread at a time, any thread
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS articles ('
+            'article_id TEXT PRIMARY KEY, body TEXT NOT NULL)'
+        )
+        self._conn.commit()
+
+    def _remember(self, key, article):
+        """push article onto the in-memory LRU"""
+        self._memory[key] = article
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, article_ids):
+        """look up stored articles
+
+        Args:
+            article_ids (:obj:`list` str): ids to look up
+
+        Returns:
+            (:obj:`dict`): article_id: article, for every id found
+
+        """
+        found = {}
+        pending = []
+        for key in set(article_ids):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                pending.append(key)
+
+        for indx in range(0, len(pending), 500):  #stay under SQLITE_MAX_VARIABLE_NUMBER
+            batch = pending[indx:indx + 500]
+            rows = self._conn.execute(
+                'SELECT article_id, body FROM articles WHERE article_id IN ({0})'.format(
+                    ','.join('?' * len(batch))),
+                batch
+            ).fetchall()
+            for key, body in rows:
+                article = json.loads(body)
+                self._remember(key, article)
+                found[key] = article
+        return found
+
+    def put_many(self, articles):
+        """save articles (ticker-specific `primary` flag is not stored)
+
+        Args:
+            articles (:obj:`dict`): article_id: article
+
+        """
+        rows = []
+        for key, article in articles.items():
+            article = {
+                field: value for field, value in article.items() if field != 'primary'
+            }
+            self._remember(key, article)
+            rows.append((key, json.dumps(article)))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO articles (article_id, body) VALUES (?, ?)',
+            rows
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def close(self):
+        """close sqlite handle"""
+        self._conn.close()
+
+def expand_records(records, article_store, batch_size=1000):
+    """swap article refs back into full articles (pre-article-store shape)
+
+    Note:
+        records already holding full articles pass through untouched
+    Args:
+        records (:obj:`iterable`): archive entries, or (key, entry) pairs
+        article_store (:obj:`ArticleStore`): store refs point into
+        batch_size (int, optional): records resolved per lookup
+
+    Yields:
+        same shape as `records`, with `news` expanded
+
+    """
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            for expanded in _expand_batch(batch, article_store):
+                yield expanded
+            batch = []
+    for expanded in _expand_batch(batch, article_store):
+        yield expanded
+
+def _expand_batch(batch, article_store):
+    """resolve one batch of records for `expand_records`"""
+    entries = [item[1] if isinstance(item, tuple) else item for item in batch]
+    articles = article_store.get_many([
+        ref['article_id']
+        for entry in entries for ref in entry.get('news', [])
+        if 'article_id' in ref and 'title' not in ref
+    ])
+    for item, entry in zip(batch, entries):
+        news = []
+        for ref in entry.get('news', []):
+            if 'article_id' not in ref or 'title' in ref:
+                news.append(ref)
+            elif ref['article_id'] in articles:
+                article = dict(articles[ref['article_id']])
+                article['primary'] = ref['primary']
+                news.append(article)
+            else:
+                LOGGER.warning('missing article in store: ' + ref['article_id'])
+        entry = dict(entry)
+        entry['news'] = news
+        yield (item[0], entry) if isinstance(item, tuple) else entry
+
+class _StreamBuffer(object):
+    """sliding read window over a JSON file for incremental decoding
+
+    Args:
+        file_handle (:obj:`io.TextIOBase`): open text handle
+        chunk_size (int): characters read per refill
+
+    """
+    _decoder = JSONDecoder()
+
+    def __init__(self, file_handle, chunk_size):
+        self.file_handle = file_handle
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _refill(self, size):
+        """drop consumed text and read more, False at EOF"""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        more = self.file_handle.read(size)
+        if not more:
+            self.eof = True
+            return False
+        self.buf += more
+        return True
+
+    def peek(self):
+        """next non-whitespace character ('' at EOF)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._refill(self.chunk_size):
+                return ''
+
+    def expect(self, chars):
+        """consume next non-whitespace character, must be in `chars`"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                'malformed TinyDB file: expected {0!r} got {1!r}'.format(chars, char))
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """decode the next complete JSON string/object"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self._refill(size):
+                    raise
+                size *= 2   #large value: grow reads to stay linear
+                continue
+            self.pos = end
+            return value
+
+def iter_tinydb_records(tinydb_path, table='_default', chunk_size=1 << 20):
+    """stream a TinyDB JSON file one document at a time
+
+    Note:
+        Memory is bounded by the largest single document, not the file.
+        Documents come back in file order, not document-id order
+    Args:
+        tinydb_path (str): path to TinyDB file
+        table (str, optional): TinyDB table name
+        chunk_size (int, optional): characters read per refill
+
+    Yields:
+        (str): TinyDB document id
+        (:obj:`dict`): archive entry
+
+    """
+    with open(tinydb_path, 'r') as tinydb_fh:
+        stream = _StreamBuffer(tinydb_fh, chunk_size)
+        if not stream.peek():   #empty file: empty db
+            return
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        while True:
+            table_name = stream.decode()
+            stream.expect(':')
+            if table_name != table:
+                stream.decode()     #skip other tables whole
+            else:
+                stream.expect('{')
+                if stream.peek() != '}':
+                    while True:
+                        doc_id = stream.decode()
+                        stream.expect(':')
+                        yield doc_id, stream.decode()
+                        if stream.expect(',}') == '}':
+                            break
+                else:
+                    stream.expect('}')
+            if stream.expect(',}') == '}':
+                return
+
+def migrate_tinydb(tinydb_path, store, table='_default', batch_size=1000):
+    """copy a TinyDB archive into a ShardedStore
+
+    Args:
+        tinydb_path (str): path to TinyDB file
+        store (:obj:`ShardedStore`): destination store
+        table (str, optional): TinyDB table name
+        batch_size (int, optional): records appended per write
+
+    Returns:
+        (int): records migrated
+
+    """
+    count = 0
+    batch = []
+    for _, record in iter_tinydb_records(tinydb_path, table):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            store.insert_multiple(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        store.insert_multiple(batch)
+        count += len(batch)
+    return count
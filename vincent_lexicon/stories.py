@@ -0,0 +1,65 @@
+"""Batch normalization of Google news clusters into archive articles"""
+
+from functools import lru_cache
+from html import unescape
+import logging
+import time
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+@lru_cache(maxsize=1 << 16)
+def unescape_text(text):
+    """HTML-unescape title/blurb text (stories repeat across tickers)"""
+    return unescape(text)
+
+@lru_cache(maxsize=1 << 16)
+def format_timestamp(timestamp):
+    """local %Y-%m-%d %H:%M:%S for a feed `tt` value"""
+    return time.strftime(DATETIME_FORMAT, time.localtime(int(timestamp)))
+
+def normalize_story(story_info, primary=False):
+    """crunch one story into archive format
+
+    Args:
+        story_info (:obj:`dict`): news_feed['clusters'][block_index]['a'] contents
+        primary (bool, optional): first story of its cluster
+
+    Returns:
+        (:obj:`dict`): processed article info
+
+    """
+    return {
+        'source': story_info['s'],
+        'url': story_info['u'],
+        'title': unescape_text(story_info['t']),
+        'blurb': unescape_text(story_info['sp']),
+        'usg': story_info['usg'],   #not sure if UUID is useful?
+        'datetime': format_timestamp(story_info['tt']),
+        'primary': primary,
+    }
+    #Unused keys:
+    #story_info['sru']  google reference link
+    #story_info['d']    human-readable "when published" info
+
+def process_stories(clusters):
+    """crunch a whole cluster list into archive articles
+
+    Args:
+        clusters (:obj:`list`): news_feed['clusters']
+
+    Returns:
+        (:obj:`list` :obj:`dict`): processed articles, cluster order
+
+    """
+    debug = LOGGER.isEnabledFor(logging.DEBUG)  #app level once routed, so `-v` turns this on
+    news_list = []
+    for block in clusters:
+        if int(block['id']) == -1:
+            continue #last entry is weird
+        for indx, story in enumerate(block['a']):
+            if debug:
+                LOGGER.debug('----Processing story_info: %s', story['u'])
+            #TODO: validate "primary" story is always first
+            news_list.append(normalize_story(story, primary=indx == 0))
+    return news_list
@@ -0,0 +1,124 @@
+"""Cross-run ticker health index: skip chronically empty feeds, re-probe with backoff"""
+
+from datetime import datetime, timedelta
+from os import path, replace
+import logging
+import threading
+
+import ujson as json
+
+LOGGER = logging.getLogger('vincent_lexicon.' + __name__.rpartition('.')[2])
+
+def _add_days(date, days):
+    """step %Y-%m-%d `date` by `days`"""
+    return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=days)).strftime('%Y-%m-%d')
+
+class TickerHealth(object):
+    """per-ticker success/empty/failed history, kept across runs
+
+    Note:
+        after `empty_streak` empty feeds in a row a ticker is skipped for
+        1, 2, 4 ... `max_backoff` days, then re-probed.  Any success resets it.
+        Failures are recorded but never prune a ticker (usually transient)
+    Args:
+        health_file (str): path to JSON index
+        empty_streak (int, optional): consecutive empties before skipping
+        max_backoff (int, optional): longest skip, in days
+
+    """
+    def __init__(self, health_file, empty_streak=3, max_backoff=32):
+        self.health_file = health_file
+        self.empty_streak = empty_streak
+        self.max_backoff = max_backoff
+        self.skipped = []
+        self._lock = threading.Lock()
+        self._tickers = {}
+        if path.isfile(health_file):
+            with open(health_file, 'r') as health_fh:
+                self._tickers = json.load(health_fh)
+            LOGGER.info('--loaded ticker health: x{0} tickers'.format(len(self._tickers)))
+
+    def get(self, ticker):
+        """health record for a ticker (None if never seen)"""
+        return self._tickers.get(ticker)
+
+    def should_probe(self, ticker, date=None):
+        """is `ticker` due for a request today
+
+        Args:
+            ticker (str): stock ticker
+            date (str, optional): %Y-%m-%d run date, DEFAULT: today
+
+        Returns:
+            (bool): False while the ticker is backing off
+
+        """
+        date = date or datetime.today().strftime('%Y-%m-%d')
+        record = self._tickers.get(ticker)
+        if record is None or not record.get('skip_until'):
+            return True
+        return date >= record['skip_until']
+
+    def filter(self, ticker_list, date=None):
+        """drop tickers that are backing off, remembering what was skipped
+
+        Args:
+            ticker_list (:obj:`list` str): tickers to check
+            date (str, optional): %Y-%m-%d run date, DEFAULT: today
+
+        Returns:
+            (:obj:`list` str): tickers due for a request, same order
+
+        """
+        keep = []
+        for ticker in ticker_list:
+            if self.should_probe(ticker, date):
+                keep.append(ticker)
+            else:
+                self.skipped.append(ticker)
+        return keep
+
+    def record(self, ticker, status, date=None):
+        """update a ticker's history with one run outcome
+
+        Args:
+            ticker (str): stock ticker
+            status (str): `success`, `empty` or `failed`
+            date (str, optional): %Y-%m-%d run date, DEFAULT: today
+
+        """
+        date = date or datetime.today().strftime('%Y-%m-%d')
+        with self._lock:
+            record = self._tickers.setdefault(ticker, {
+                'success': 0,
+                'empty': 0,
+                'failed': 0,
+                'streak': 0,
+                'backoff': 0,
+                'skip_until': None,
+            })
+            record[status] += 1
+            record['last_status'] = status
+            record['last_date'] = date
+            if status == 'success':
+                record['streak'] = 0
+                record['backoff'] = 0
+                record['skip_until'] = None
+            elif status == 'empty':
+                record['streak'] += 1
+                if record['streak'] >= self.empty_streak:
+                    record['backoff'] = min(max(record['backoff'] * 2, 1), self.max_backoff)
+                    record['skip_until'] = _add_days(date, record['backoff'])
+
+    def record_many(self, outcomes, date=None):
+        """update history for (ticker, status) pairs"""
+        for ticker, status in outcomes:
+            self.record(ticker, status, date)
+
+    def save(self):
+        """atomically write the index back to disk"""
+        with self._lock:
+            tmp_file = self.health_file + '.tmp'
+            with open(tmp_file, 'w') as health_fh:
+                json.dump(self._tickers, health_fh)
+            replace(tmp_file, self.health_file)